@@ -0,0 +1,62 @@
+import argparse
+import time
+
+from tqec.templates.qubit import QubitTemplate
+from tqec.templates.subtemplates import get_spatially_distinct_subtemplates
+
+
+def time_spatially_distinct_subtemplates(k: int, radius: int, repetitions: int) -> float:
+    """Return the best time (in seconds) to compute the sub-templates of a logical qubit."""
+    instantiation = QubitTemplate().instantiate(k)
+    best = float("inf")
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        get_spatially_distinct_subtemplates(instantiation, radius)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def print_timings(ks: list[int], radii: list[int], repetitions: int) -> None:
+    """Print the timing table found in the docstring of get_spatially_distinct_subtemplates."""
+    separator = "-" * (11 + 12 * len(radii) - 1)
+    for k in ks:
+        timings = [time_spatially_distinct_subtemplates(k, r, repetitions) for r in radii]
+        print(f"k = {k}")
+        print(separator)
+        print("radius   = " + " | ".join(f"{r:>9}" for r in radii))
+        print("time (s) = " + " | ".join(f"{t:>9.3g}" for t in timings))
+        print(separator)
+
+
+def main() -> None:
+    """Parse the CLI arguments and start the benchmark."""
+    parser = argparse.ArgumentParser(
+        description="Time get_spatially_distinct_subtemplates on a logical qubit template."
+    )
+    parser.add_argument(
+        "-k",
+        help="The scale factors applied to the template.",
+        nargs="+",
+        type=int,
+        default=[10, 20, 40, 80, 160, 320, 500],
+    )
+    parser.add_argument(
+        "-r",
+        "--radius",
+        help="The Manhattan radiuses of the computed sub-templates.",
+        nargs="+",
+        type=int,
+        default=[0, 1, 2, 3, 4],
+    )
+    parser.add_argument(
+        "--repetitions",
+        help="Number of timed repetitions. The best time is reported.",
+        type=int,
+        default=3,
+    )
+    args = parser.parse_args()
+    print_timings(args.k, args.radius, args.repetitions)
+
+
+if __name__ == "__main__":
+    main()
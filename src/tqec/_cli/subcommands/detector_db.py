@@ -0,0 +1,314 @@
+from __future__ import annotations
+
+import argparse
+import logging
+from collections import defaultdict
+from collections.abc import Callable, Hashable, Iterator, MutableMapping
+from pathlib import Path
+from typing import Generic, TypeVar
+
+from typing_extensions import override
+
+from tqec._cli.subcommands.base import TQECSubCommand
+from tqec.compile.compile import compile_block_graph
+from tqec.compile.convention import ALL_CONVENTIONS
+from tqec.compile.detectors.database import CURRENT_DATABASE_VERSION, DetectorDatabase
+from tqec.computation.block_graph import BlockGraph
+from tqec.gallery import cnot, cz, memory, move_rotation, stability, steane_encoding, three_cnots
+from tqec.utils.enums import Basis
+from tqec.utils.exceptions import TQECError
+
+GALLERY_COMPUTATIONS: dict[str, Callable[[Basis], BlockGraph]] = {
+    "cnot": cnot,
+    "cz": lambda basis: cz("XI -> XZ" if basis == Basis.X else "ZI -> ZI"),
+    "memory": memory,
+    "move_rotation": move_rotation,
+    "stability": stability,
+    "steane_encoding": steane_encoding,
+    "three_cnots": three_cnots,
+}
+
+_K = TypeVar("_K", bound=Hashable)
+_V = TypeVar("_V")
+
+
+class _UsageRecordingMapping(MutableMapping[_K, _V], Generic[_K, _V]):
+    def __init__(self, mapping: MutableMapping[_K, _V]) -> None:
+        """Read-through view on ``mapping`` recording the keys that are accessed.
+
+        Entries added to the view are kept in memory and never written to the
+        underlying ``mapping``.
+        """
+        self._mapping = mapping
+        self._added: dict[_K, _V] = {}
+        self.used_keys: set[_K] = set()
+
+    def __getitem__(self, key: _K) -> _V:
+        self.used_keys.add(key)
+        if key in self._added:
+            return self._added[key]
+        return self._mapping[key]
+
+    def __setitem__(self, key: _K, value: _V) -> None:
+        self.used_keys.add(key)
+        self._added[key] = value
+
+    def __delitem__(self, key: _K) -> None:
+        del self._added[key]
+
+    def __iter__(self) -> Iterator[_K]:
+        yield from self._added
+        yield from (key for key in self._mapping if key not in self._added)
+
+    def __len__(self) -> int:
+        return len(self._mapping) + sum(1 for key in self._added if key not in self._mapping)
+
+
+class DetectorDbTQECSubCommand(TQECSubCommand):
+    @staticmethod
+    @override
+    def add_subcommand(
+        main_parser: argparse._SubParsersAction[argparse.ArgumentParser],
+    ) -> None:
+        parser: argparse.ArgumentParser = main_parser.add_parser(
+            "detector-db",
+            description="Build, merge, inspect and prune detector databases.",
+        )
+        actions = parser.add_subparsers(title="actions", dest="action", required=True)
+
+        prebuild = actions.add_parser(
+            "prebuild",
+            description=(
+                "Compute the detectors of computations from the gallery and store "
+                "them in a detector database."
+            ),
+        )
+        prebuild.add_argument(
+            "database",
+            help="Database to update. Created if it does not exist.",
+            type=Path,
+        )
+        DetectorDbTQECSubCommand._add_computation_arguments(prebuild)
+        prebuild.add_argument(
+            "--adaptive-radius",
+            help=(
+                "Whether to compute situations with the smallest sufficient radius, up to "
+                "--manhattan-radius, in a new database."
+            ),
+            action="store_true",
+        )
+
+        merge = actions.add_parser(
+            "merge",
+            description="Merge several detector databases, e.g. built on different hosts.",
+        )
+        merge.add_argument(
+            "databases",
+            help="Databases to merge.",
+            nargs="+",
+            type=Path,
+        )
+        merge.add_argument(
+            "--out",
+            help="Database the situations are merged into. Created if it does not exist.",
+            type=Path,
+            required=True,
+        )
+
+        stats = actions.add_parser(
+            "stats",
+            description="Print statistics about detector databases.",
+        )
+        stats.add_argument(
+            "databases",
+            help="Databases to inspect.",
+            nargs="+",
+            type=Path,
+        )
+
+        prune = actions.add_parser(
+            "prune",
+            description=(
+                "Remove from a detector database the situations that are not used "
+                "to generate the provided computations."
+            ),
+        )
+        prune.add_argument(
+            "database",
+            help="Database to prune.",
+            type=Path,
+        )
+        DetectorDbTQECSubCommand._add_computation_arguments(prune)
+
+        parser.set_defaults(func=DetectorDbTQECSubCommand.execute)
+
+    @staticmethod
+    def _add_computation_arguments(parser: argparse.ArgumentParser) -> None:
+        parser.add_argument(
+            "--computations",
+            help="Computations from the gallery to generate, in both observable bases.",
+            nargs="+",
+            choices=GALLERY_COMPUTATIONS.keys(),
+            default=list(GALLERY_COMPUTATIONS.keys()),
+        )
+        parser.add_argument(
+            "-k",
+            help="The scale factors applied to the circuits.",
+            nargs="+",
+            type=int,
+            default=[1, 2, 3],
+        )
+        parser.add_argument(
+            "--conventions",
+            help="Conventions to use.",
+            nargs="+",
+            choices=ALL_CONVENTIONS.keys(),
+            default=list(ALL_CONVENTIONS.keys()),
+        )
+        parser.add_argument(
+            "--manhattan-radius",
+            help="Radius considered to compute detectors.",
+            type=int,
+            default=2,
+        )
+        parser.add_argument(
+            "--processes",
+            help="Number of processes computing detectors. Default to all the available cores.",
+            type=int,
+            default=-1,
+        )
+
+    @staticmethod
+    @override
+    def execute(args: argparse.Namespace) -> None:
+        {
+            "prebuild": DetectorDbTQECSubCommand._prebuild,
+            "merge": DetectorDbTQECSubCommand._merge,
+            "stats": DetectorDbTQECSubCommand._stats,
+            "prune": DetectorDbTQECSubCommand._prune,
+        }[args.action](args)
+
+    @staticmethod
+    def _read_current_database(filepath: Path) -> DetectorDatabase:
+        database = DetectorDatabase.from_file(filepath)
+        if database.version != CURRENT_DATABASE_VERSION:
+            raise TQECError(
+                f"The detector database '{filepath}' has version {database.version} that cannot "
+                f"be used with the version in the TQEC code you are running "
+                f"({CURRENT_DATABASE_VERSION})."
+            )
+        return database
+
+    @staticmethod
+    def _generate_computations(args: argparse.Namespace, database: DetectorDatabase) -> None:
+        for convention_name in args.conventions:
+            convention = ALL_CONVENTIONS[convention_name]
+            for computation in args.computations:
+                for basis in Basis:
+                    block_graph = GALLERY_COMPUTATIONS[computation](basis)
+                    try:
+                        compiled_graph = compile_block_graph(
+                            block_graph, convention, observables=None
+                        )
+                    except NotImplementedError:
+                        logging.warning(
+                            "Skipping %s in the %s basis: not supported by the %s convention.",
+                            computation,
+                            basis.value,
+                            convention_name,
+                        )
+                        continue
+                    logging.info(
+                        "Generating %s in the %s basis with %s convention and k in %s.",
+                        computation,
+                        basis.value,
+                        convention_name,
+                        args.k,
+                    )
+                    compiled_graph.generate_stim_circuits(
+                        args.k,
+                        manhattan_radius=args.manhattan_radius,
+                        detector_database=database,
+                        database_path=None,
+                        parallel_process_count=args.processes,
+                    )
+
+    @staticmethod
+    def _prebuild(args: argparse.Namespace) -> None:
+        database_path: Path = args.database.resolve()
+        if database_path.exists():
+            database = DetectorDbTQECSubCommand._read_current_database(database_path)
+        else:
+            database = DetectorDatabase(adaptive_radius=args.adaptive_radius)
+            database.version = CURRENT_DATABASE_VERSION
+        situation_count = len(database)
+        DetectorDbTQECSubCommand._generate_computations(args, database)
+        database.to_file(database_path)
+        print(
+            f"Added {len(database) - situation_count} situations to {database_path} "
+            f"({len(database)} situations)."
+        )
+        statistics = database.statistics
+        print(
+            f"{statistics.hits} hits, {statistics.misses} misses, "
+            f"{statistics.miss_computation_time:.1f}s spent computing detectors."
+        )
+
+    @staticmethod
+    def _merge(args: argparse.Namespace) -> None:
+        out_path: Path = args.out.resolve()
+        databases = [
+            DetectorDbTQECSubCommand._read_current_database(filepath.resolve())
+            for filepath in args.databases
+        ]
+        adaptive_radius = all(database.adaptive_radius for database in databases)
+        if out_path.exists():
+            existing = DetectorDbTQECSubCommand._read_current_database(out_path)
+            # The situations already stored in out_path are kept when saving.
+            adaptive_radius = adaptive_radius and existing.adaptive_radius
+        # A database that does not use adaptive radii may store situations
+        # computed with a small radius that has never been checked to be
+        # sufficient, so the merged database only looks situations up with a
+        # smaller radius if all the merged databases do.
+        merged = DetectorDatabase(adaptive_radius=adaptive_radius)
+        merged.version = CURRENT_DATABASE_VERSION
+        for database in databases:
+            merged.mapping.update(database.mapping.items())
+        merged.to_file(out_path)
+        print(f"Merged {len(merged)} situations into {out_path}.")
+
+    @staticmethod
+    def _stats(args: argparse.Namespace) -> None:
+        sizes_by_version: dict[str, list[int]] = defaultdict(lambda: [0, 0, 0])
+        for path in args.databases:
+            filepath: Path = path.resolve()
+            database = DetectorDatabase.from_file(filepath)
+            size = filepath.stat().st_size
+            print(
+                f"{filepath}: version {database.version}, {len(database)} situations, "
+                f"{size} bytes, "
+                f"adaptive_radius={database.adaptive_radius}, frozen={database.frozen}"
+            )
+            totals = sizes_by_version[str(database.version)]
+            totals[0] += 1
+            totals[1] += len(database)
+            totals[2] += size
+        for version, (file_count, situation_count, size) in sorted(sizes_by_version.items()):
+            print(
+                f"version {version}: {file_count} files, {situation_count} situations, {size} bytes"
+            )
+
+    @staticmethod
+    def _prune(args: argparse.Namespace) -> None:
+        database_path: Path = args.database.resolve()
+        database = DetectorDbTQECSubCommand._read_current_database(database_path)
+        recorder = _UsageRecordingMapping(database.mapping)
+        view = DetectorDatabase(recorder, adaptive_radius=database.adaptive_radius)
+        view.version = database.version
+        DetectorDbTQECSubCommand._generate_computations(args, view)
+        removed_count = database.prune(recorder.used_keys)
+        database.to_file(database_path)
+        print(
+            f"Removed {removed_count} unused situations from {database_path} "
+            f"({len(database)} situations)."
+        )
@@ -4,6 +4,7 @@ import sys
 from tqec._cli.subcommands.check_dae import CheckDaeTQECSubCommand
 from tqec._cli.subcommands.dae2circuits import Dae2CircuitsTQECSubCommand
 from tqec._cli.subcommands.dae2observables import Dae2ObservablesTQECSubCommand
+from tqec._cli.subcommands.detector_db import DetectorDbTQECSubCommand
 from tqec._cli.subcommands.run_example import RunExampleTQECSubCommand
 from tqec._cli.subcommands.viz import VisualisationTQECSubCommand
 
@@ -20,6 +21,7 @@ def main() -> None:
     CheckDaeTQECSubCommand.add_subcommand(subparser)
     Dae2CircuitsTQECSubCommand.add_subcommand(subparser)
     RunExampleTQECSubCommand.add_subcommand(subparser)
+    DetectorDbTQECSubCommand.add_subcommand(subparser)
     VisualisationTQECSubCommand.add_subcommand(subparser)
 
     args = parser.parse_args(args=None if sys.argv[1:] else ["--help"])
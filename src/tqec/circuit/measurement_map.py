@@ -8,10 +8,10 @@ necessary interface to register, modify and query measurement offsets from a
 
 from __future__ import annotations
 
-from collections.abc import Sequence
-from dataclasses import dataclass, field
+from collections.abc import Mapping, Sequence
 
 import numpy
+import numpy.typing as npt
 import stim
 
 from tqec.circuit.qubit import GridQubit
@@ -24,7 +24,6 @@ from tqec.utils.instructions import (
 )
 
 
-@dataclass(frozen=True)
 class MeasurementRecordsMap:
     """A mapping from measurements appearing in a circuit and their record offsets.
 
@@ -34,20 +33,31 @@ class MeasurementRecordsMap:
     represented measurements and the position(s) in the circuit at which the
     instance at hand is valid.
 
-    Raises:
-        TQECError: if at least one of the provided measurement record offsets
-            is non-negative (``>=0``).
-        TQECError: if, for any of the provided qubits, the provided offsets
-            are not sorted.
-        TQECError: if any measurement offset is duplicated.
+    Internally, measurements are stored in two flat arrays sorted by record
+    offset: one with the index of the measured qubit in ``self.qubits`` and one
+    with the record offsets. Concatenating and repeating records is therefore
+    performed with vectorized array operations, and the mapping from qubits to
+    offsets is only built when a qubit is looked up.
 
     """
 
-    mapping: dict[GridQubit, list[int]] = field(default_factory=dict)
+    def __init__(self, mapping: Mapping[GridQubit, Sequence[int]] | None = None) -> None:
+        """Initialize a :class:`MeasurementRecordsMap` instance.
 
-    def __post_init__(self) -> None:
-        all_measurement_records_indices: list[int] = []
-        for qubit, measurement_record_offsets in self.mapping.items():
+        Args:
+            mapping: mapping from qubits to the record offsets of their
+                measurements. Default to ``None``, representing no measurements.
+
+        Raises:
+            TQECError: if at least one of the provided measurement record offsets
+                is non-negative (``>=0``).
+            TQECError: if, for any of the provided qubits, the provided offsets
+                are not sorted.
+            TQECError: if any measurement offset is duplicated.
+
+        """
+        mapping = mapping if mapping is not None else {}
+        for qubit, measurement_record_offsets in mapping.items():
             # Check that the provided measurement record offsets are negative.
             nonnegative_offsets = [offset for offset in measurement_record_offsets if offset >= 0]
             if nonnegative_offsets:
@@ -57,20 +67,84 @@ class MeasurementRecordsMap:
                     f"qubit {qubit}."
                 )
             # Check that measurement record offsets are sorted
-            if measurement_record_offsets != sorted(measurement_record_offsets):
+            if list(measurement_record_offsets) != sorted(measurement_record_offsets):
                 raise TQECError(
                     "Got measurement record offsets that are not in sorted "
                     f"order: {measurement_record_offsets}. This is not supported."
                 )
-            all_measurement_records_indices.extend(measurement_record_offsets)
+        qubit_indices = numpy.repeat(
+            numpy.arange(len(mapping), dtype=numpy.int64),
+            [len(offsets) for offsets in mapping.values()],
+        )
+        offsets = numpy.fromiter(
+            (offset for offsets in mapping.values() for offset in offsets), dtype=numpy.int64
+        )
+        order = numpy.argsort(offsets, kind="stable")
+        self._set_records(tuple(mapping.keys()), qubit_indices[order], offsets[order])
         # Check that a given measurement record offset only appears once.
-        deduplicated_indices = numpy.unique(all_measurement_records_indices)
-        if len(deduplicated_indices) != len(all_measurement_records_indices):
+        if _has_duplicates(self._offsets):
             raise TQECError(
                 "At least one measurement record offset has been found "
                 "twice in the provided offsets."
             )
 
+    def _set_records(
+        self,
+        qubits: tuple[GridQubit, ...],
+        qubit_indices: npt.NDArray[numpy.int64],
+        offsets: npt.NDArray[numpy.int64],
+    ) -> None:
+        self._qubits = qubits
+        self._qubit_indices = qubit_indices
+        self._offsets = offsets
+        self._mapping: dict[GridQubit, list[int]] | None = None
+
+    @staticmethod
+    def _from_records(
+        qubits: tuple[GridQubit, ...],
+        qubit_indices: npt.NDArray[numpy.int64],
+        offsets: npt.NDArray[numpy.int64],
+    ) -> MeasurementRecordsMap:
+        """Build an instance from its internal arrays, without any check.
+
+        Args:
+            qubits: the measured qubits.
+            qubit_indices: for each measurement, the index in ``qubits`` of the
+                measured qubit.
+            offsets: for each measurement, its record offset. Should be sorted
+                in increasing order, negative and without duplicates.
+
+        """
+        ret = MeasurementRecordsMap.__new__(MeasurementRecordsMap)
+        ret._set_records(qubits, qubit_indices, offsets)
+        return ret
+
+    @property
+    def qubits(self) -> tuple[GridQubit, ...]:
+        """Qubits with an entry in ``self``."""
+        return self._qubits
+
+    @property
+    def num_measurements(self) -> int:
+        """Number of measurements represented by ``self``."""
+        return int(self._offsets.size)
+
+    @property
+    def mapping(self) -> dict[GridQubit, list[int]]:
+        """Mapping from each qubit to the sorted record offsets of its measurements.
+
+        The returned dictionary is built on first access and cached. It should
+        not be modified.
+        """
+        if self._mapping is None:
+            order = numpy.argsort(self._qubit_indices, kind="stable")
+            counts = numpy.bincount(self._qubit_indices, minlength=len(self._qubits))
+            offsets_by_qubit = numpy.split(self._offsets[order], numpy.cumsum(counts)[:-1])
+            self._mapping = {
+                qubit: offsets.tolist() for qubit, offsets in zip(self._qubits, offsets_by_qubit)
+            }
+        return self._mapping
+
     @staticmethod
     def from_scheduled_circuit(circuit: ScheduledCircuit) -> MeasurementRecordsMap:
         """Build a :class:`MeasurementRecordsMap` from a scheduled circuit.
@@ -126,32 +200,33 @@ class MeasurementRecordsMap:
             ``circuit`` to their offset.
 
         """
-        # We iterate the circuit in forward order, which means that the first
-        # measurement we will encounter will have a record offset of
-        # `-circuit.num_measurements`. Iterating in this order also allows to
-        # ensure by construction that the measurement record offsets will be in
-        # sorted order.
-        current_measurement_record = -circuit.num_measurements
         if qubit_map is None:
             qubit_map = QubitMap.from_circuit(circuit)
-        measurement_records: dict[GridQubit, list[int]] = {}
+        # Measured qubit indices, in the order of the measurements.
+        measured_qubits: list[int] = []
         for instruction in circuit:
             if isinstance(instruction, stim.CircuitRepeatBlock):
                 raise TQECError("Found a REPEAT instruction. This is not supported for the moment.")
             if is_multi_qubit_measurement_instruction(instruction):
                 raise TQECError(f"Found a non-supported measurement instruction: {instruction}")
             if is_single_qubit_measurement_instruction(instruction):
-                for (qi,) in instruction.target_groups():
-                    qubit = qubit_map.i2q[qi.value]
-                    measurement_records.setdefault(qubit, []).append(current_measurement_record)
-                    current_measurement_record += 1
-        if current_measurement_record != 0:
+                measured_qubits.extend(t.value for t in instruction.targets_copy())
+        if len(measured_qubits) != circuit.num_measurements:
             raise TQECError(
-                "Failed post-condition check. Expected a final measurement record of "
-                f"-1 but got {current_measurement_record - 1}. Did we miss a "
+                f"Failed post-condition check. Expected {circuit.num_measurements} "
+                f"measurements but found {len(measured_qubits)}. Did we miss a "
                 f"measurement? Circuit:\n{circuit}"
             )
-        return MeasurementRecordsMap(measurement_records)
+        # Measurements are listed in forward order, which means that the first
+        # measurement has a record offset of `-circuit.num_measurements`.
+        qubit_ids, qubit_indices = numpy.unique(
+            numpy.asarray(measured_qubits, dtype=numpy.int64), return_inverse=True
+        )
+        return MeasurementRecordsMap._from_records(
+            tuple(qubit_map.i2q[qi] for qi in qubit_ids.tolist()),
+            qubit_indices.astype(numpy.int64),
+            numpy.arange(-len(measured_qubits), 0, dtype=numpy.int64),
+        )
 
     # Explicitly returns a Sequence to show that the returned value is read-only.
     def __getitem__(self, qubit: GridQubit) -> Sequence[int]:
@@ -160,6 +235,15 @@ class MeasurementRecordsMap:
     def __contains__(self, qubit: GridQubit) -> bool:
         return qubit in self.mapping
 
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, MeasurementRecordsMap) and self.mapping == other.mapping
+
+    def __hash__(self) -> int:
+        raise NotImplementedError(f"Cannot hash efficiently a {type(self).__name__}.")
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.mapping!r})"
+
     def with_added_measurements(
         self, mrecords_map: MeasurementRecordsMap, repetitions: int = 1
     ) -> MeasurementRecordsMap:
@@ -173,20 +257,54 @@ class MeasurementRecordsMap:
             repetitions: number of time the measurements from ``mrecords_map`` are
                 repeated. Default to 1.
 
+        Raises:
+            TQECError: if the resulting instance would contain the same
+                measurement record offset twice.
+
         Returns:
             a new instance containing valid offsets for each measurement in ``self``
             and ``mrecords_map``.
 
         """
-        num_measurements_without_repetition = sum(
-            len(offsets) for offsets in mrecords_map.mapping.values()
-        )
+        num_measurements_without_repetition = mrecords_map.num_measurements
         num_added_measurements = repetitions * num_measurements_without_repetition
-        records = {
-            q: [o - num_added_measurements for o in offsets] for q, offsets in self.mapping.items()
-        }
-        for q, offsets in mrecords_map.mapping.items():
-            record = records.setdefault(q, [])
-            for i in range(repetitions - 1, -1, -1):
-                record.extend([o - i * num_measurements_without_repetition for o in offsets])
-        return MeasurementRecordsMap(records)
+        # Index of each qubit of mrecords_map in the qubits of the returned instance.
+        qubit_positions = {q: i for i, q in enumerate(self._qubits)}
+        for q in mrecords_map.qubits:
+            qubit_positions.setdefault(q, len(qubit_positions))
+        reindex = numpy.fromiter(
+            (qubit_positions[q] for q in mrecords_map.qubits),
+            dtype=numpy.int64,
+            count=len(mrecords_map.qubits),
+        )
+        shifts = num_measurements_without_repetition * numpy.arange(
+            repetitions - 1, -1, -1, dtype=numpy.int64
+        )
+        offsets = numpy.concatenate(
+            (
+                self._offsets - num_added_measurements,
+                (mrecords_map._offsets[numpy.newaxis, :] - shifts[:, numpy.newaxis]).ravel(),
+            )
+        )
+        qubit_indices = numpy.concatenate(
+            (self._qubit_indices, numpy.tile(reindex[mrecords_map._qubit_indices], repetitions))
+        )
+        # The offsets are sorted, unless the offsets of mrecords_map span more
+        # than its number of measurements, in which case they might overlap.
+        if (
+            num_measurements_without_repetition > 0
+            and mrecords_map._offsets[0] < -num_measurements_without_repetition
+        ):
+            order = numpy.argsort(offsets, kind="stable")
+            offsets, qubit_indices = offsets[order], qubit_indices[order]
+            if _has_duplicates(offsets):
+                raise TQECError(
+                    "At least one measurement record offset has been found "
+                    "twice in the provided offsets."
+                )
+        return MeasurementRecordsMap._from_records(tuple(qubit_positions), qubit_indices, offsets)
+
+
+def _has_duplicates(sorted_array: npt.NDArray[numpy.int64]) -> bool:
+    """Return ``True`` if the provided sorted array contains the same value twice."""
+    return bool(numpy.any(sorted_array[1:] == sorted_array[:-1]))
@@ -14,9 +14,11 @@ from __future__ import annotations
 import re
 from collections.abc import Callable, Iterable, Iterator, Sequence
 from copy import deepcopy
-from functools import cache
+from functools import cache, lru_cache
 from typing import Any, cast
 
+import numpy
+import numpy.typing as npt
 import stim
 
 from tqec.circuit.qubit import count_qubit_accesses, get_used_qubit_indices
@@ -376,30 +378,70 @@ class Moment:
             re.IGNORECASE,
         )
 
-    def with_mapped_qubit_indices(self, qubit_index_map: dict[int, int]) -> Moment:
+    @staticmethod
+    def qubit_index_lookup_table(qubit_index_map: dict[int, int]) -> npt.NDArray[numpy.int64]:
+        """Return a lookup table representing ``qubit_index_map``.
+
+        The returned array ``table`` is such that ``table[q]`` is
+        ``qubit_index_map.get(q, q)`` for any ``q`` in ``range(len(table))``.
+        It can be provided to :meth:`with_mapped_qubit_indices` to avoid building
+        it again when mapping several moments with the same ``qubit_index_map``.
+
+        Args:
+            qubit_index_map: the map represented by the returned table.
+
+        Returns:
+            a 1-dimensional array mapping qubit indices.
+
+        """
+        table = numpy.arange(max(qubit_index_map, default=-1) + 1, dtype=numpy.int64)
+        table[numpy.fromiter(qubit_index_map.keys(), numpy.int64, len(qubit_index_map))] = (
+            numpy.fromiter(qubit_index_map.values(), numpy.int64, len(qubit_index_map))
+        )
+        return table
+
+    def with_mapped_qubit_indices(
+        self,
+        qubit_index_map: dict[int, int],
+        _lookup_table: npt.NDArray[numpy.int64] | None = None,
+    ) -> Moment:
         """Map the qubit **indices** on whom the :class:`Moment` instance is applied.
 
         Note:
-            For performance, this method performs a regex matching to find and map qubit targets in
-            the circuit string of ``self`` instead of iterating over the instructions.
+            For performance, this method does not iterate over the instructions.
+            The circuit string of ``self`` is split around its qubit targets
+            once (the split is cached, as moments of plaquette circuits are
+            mapped many times), qubit targets are then mapped all at once with
+            a lookup table and the resulting string is parsed by ``stim``.
 
         Args:
             qubit_index_map: the map used to modify the qubit targets.
+            _lookup_table: the result of :meth:`qubit_index_lookup_table` called
+                on ``qubit_index_map``. Built from ``qubit_index_map`` if not
+                provided.
 
         Returns:
             a modified copy of ``self`` with the qubit gate targets mapped according
             to the provided ``qubit_index_map``.
 
         """
-
-        def replace_match(match):
-            if (matched := match[1]) is not None:
-                qubit = int(matched)
-                return str(qubit_index_map.get(qubit, qubit))
-            return match[0]
-
+        texts, qubits = _split_qubit_targets(str(self._circuit))
+        if qubits.size > 0:
+            if _lookup_table is None:
+                _lookup_table = Moment.qubit_index_lookup_table(qubit_index_map)
+            if (max_qubit := int(qubits.max())) >= _lookup_table.size:
+                _lookup_table = numpy.concatenate(
+                    [_lookup_table, numpy.arange(_lookup_table.size, max_qubit + 1)]
+                )
+            parts = [texts[0]]
+            for qubit, text in zip(_lookup_table[qubits].tolist(), texts[1:]):
+                parts.append(str(qubit))
+                parts.append(text)
+            circuit = stim.Circuit("".join(parts))
+        else:
+            circuit = self._circuit.copy()
         return Moment(
-            stim.Circuit(self._qubit_target_regex().sub(replace_match, str(self._circuit))),
+            circuit,
             used_qubits={qubit_index_map[q] for q in self._used_qubits},
             _avoid_checks=True,
         )
@@ -484,3 +526,33 @@ def iter_stim_circuit_without_repeat_by_moments(
             cur_moment.append(inst)
     # No need to copy the last moment
     yield Moment(cur_moment)
+
+
+@lru_cache(maxsize=4096)
+def _split_qubit_targets(
+    circuit: str,
+) -> tuple[tuple[str, ...], npt.NDArray[numpy.int64]]:
+    """Split the string representation of a moment around its qubit targets.
+
+    Args:
+        circuit: string representation of a ``stim.Circuit`` without ``REPEAT``
+            blocks.
+
+    Returns:
+        ``(texts, qubits)`` such that ``circuit`` is the concatenation of
+        ``texts[0], qubits[0], texts[1], qubits[1], ..., texts[-1]``. The
+        returned array is read-only as it is shared between calls.
+
+    """
+    texts: list[str] = []
+    qubits: list[int] = []
+    start = 0
+    for match in Moment._qubit_target_regex().finditer(circuit):
+        if match[1] is not None:
+            texts.append(circuit[start : match.start()])
+            qubits.append(int(match[1]))
+            start = match.end()
+    texts.append(circuit[start:])
+    qubit_array = numpy.array(qubits, dtype=numpy.int64)
+    qubit_array.flags.writeable = False
+    return tuple(texts), qubit_array
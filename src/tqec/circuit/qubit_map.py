@@ -17,6 +17,7 @@ from dataclasses import dataclass, field
 from typing import Any
 
 import numpy
+import numpy.typing as npt
 import stim
 
 from tqec.circuit.qubit import GridQubit
@@ -55,6 +56,34 @@ class QubitMap:
         """
         return QubitMap(dict(enumerate(qubits)))
 
+    @staticmethod
+    def from_qubit_coordinates(coordinates: npt.NDArray[numpy.int64]) -> QubitMap:
+        """Create a qubit map from an array of qubit coordinates.
+
+        Qubits are associated indices in sorted order, which makes the returned
+        instance equal to ``QubitMap.from_qubits(sorted(qubits))``, ``qubits``
+        being the set of qubits with the provided coordinates.
+
+        Args:
+            coordinates: array of shape ``(n, 2)`` with the ``(x, y)``
+                coordinates of the qubits. It may contain duplicates.
+
+        Returns:
+            a qubit map with one index per distinct qubit in ``coordinates``.
+
+        """
+        if coordinates.size == 0:
+            return QubitMap()
+        # Pack each (x, y) pair in a single integer preserving the lexicographic
+        # order to sort and deduplicate qubits in one pass.
+        xmin, ymin = coordinates.min(axis=0).tolist()
+        height = int(coordinates[:, 1].max()) - ymin + 1
+        packed = numpy.unique((coordinates[:, 0] - xmin) * height + (coordinates[:, 1] - ymin))
+        xs, ys = numpy.divmod(packed, height)
+        return QubitMap.from_qubits(
+            GridQubit(x, y) for x, y in zip((xs + xmin).tolist(), (ys + ymin).tolist())
+        )
+
     @staticmethod
     def from_circuit(circuit: stim.Circuit) -> QubitMap:
         """Return a qubit map from the qubit coordinates at the end of the provided ``circuit``.
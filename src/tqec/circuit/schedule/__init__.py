@@ -13,9 +13,14 @@ instances:
   instructions when they are duplicated in a :class:`~tqec.circuit.moment.Moment`
   instance.
 
+It also defines :class:`~.columnar.ColumnarScheduledCircuit`, a columnar
+representation of :class:`~.circuit.ScheduledCircuit` that is efficient to
+translate and merge.
+
 """
 
 from .circuit import ScheduledCircuit as ScheduledCircuit
+from .columnar import ColumnarScheduledCircuit as ColumnarScheduledCircuit
 from .exception import ScheduleError as ScheduleError
 from .manipulation import merge_scheduled_circuits as merge_scheduled_circuits
 from .manipulation import (
@@ -247,8 +247,10 @@ class ScheduledCircuit:
         mapped_final_qubits = QubitMap(
             {qubit_index_map[qi]: q for qi, q in self._qubit_map.items()}
         )
+        lookup_table = Moment.qubit_index_lookup_table(qubit_index_map)
         mapped_moments: list[Moment] = [
-            moment.with_mapped_qubit_indices(qubit_index_map) for moment in self._moments
+            moment.with_mapped_qubit_indices(qubit_index_map, _lookup_table=lookup_table)
+            for moment in self._moments
         ]
 
         if inplace:
@@ -0,0 +1,301 @@
+"""Defines :class:`.ColumnarScheduledCircuit`, a columnar form of :class:`.ScheduledCircuit`.
+
+A :class:`~.circuit.ScheduledCircuit` stores one ``stim.Circuit`` per moment,
+which makes it costly to translate and merge thousands of small circuits, as
+done when tiling plaquettes over a template.
+
+:class:`ColumnarScheduledCircuit` stores the same information as arrays with
+one entry per target group: its schedule, the instruction it belongs to and the
+coordinates of its qubits. Translating a circuit is then an array addition,
+merging several circuits an array concatenation, and the ``stim.Circuit``
+instances are only built once, when converting back to a
+:class:`~.circuit.ScheduledCircuit`.
+
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Sequence
+
+import numpy
+import numpy.typing as npt
+import stim
+
+from tqec.circuit.moment import Moment, MultipleOperationsOnSameQubitError
+from tqec.circuit.qubit import GridQubit
+from tqec.circuit.qubit_map import QubitMap
+from tqec.circuit.schedule.circuit import ScheduledCircuit
+from tqec.circuit.schedule.schedule import Schedule
+from tqec.utils.exceptions import TQECError
+from tqec.utils.instructions import is_annotation_instruction
+
+
+class ColumnarScheduledCircuit:
+    def __init__(
+        self,
+        instructions: Sequence[tuple[str, tuple[float, ...]]],
+        schedules: npt.NDArray[numpy.int64],
+        instances: npt.NDArray[numpy.int64],
+        positions: npt.NDArray[numpy.int64],
+        instruction_indices: npt.NDArray[numpy.int64],
+        xs: npt.NDArray[numpy.int64],
+        ys: npt.NDArray[numpy.int64],
+        inverted: npt.NDArray[numpy.bool_],
+        qubits: npt.NDArray[numpy.int64],
+    ) -> None:
+        """Represent a scheduled circuit with one array entry per target group.
+
+        Only instructions with target groups made of one or two qubit targets
+        (possibly inverted) and without tag are supported, which covers the
+        gates used by plaquettes.
+
+        Args:
+            instructions: ``(name, args)`` of each instruction of the circuit.
+            schedules: schedule of each target group.
+            instances: index of the circuit each target group comes from. Used
+                with ``positions`` to order instructions when merging circuits.
+            positions: index, in its moment, of the instruction each target
+                group belongs to.
+            instruction_indices: index in ``instructions`` of the instruction
+                each target group belongs to.
+            xs: array of shape ``(n, 2)`` with the ``x`` coordinate of the
+                qubits of each target group. The second column is not used for
+                target groups of size 1.
+            ys: same as ``xs`` for the ``y`` coordinate.
+            inverted: same as ``xs`` for the inversion of measurement results.
+            qubits: array of shape ``(m, 2)`` with the coordinates of the qubits
+                of the circuit, including the ones that are not targeted.
+
+        """
+        self.instructions = tuple(instructions)
+        self.arities = numpy.array(
+            [2 if stim.gate_data(name).is_two_qubit_gate else 1 for name, _ in instructions],
+            dtype=numpy.int64,
+        )
+        self.schedules = schedules
+        self.instances = instances
+        self.positions = positions
+        self.instruction_indices = instruction_indices
+        self.xs = xs
+        self.ys = ys
+        self.inverted = inverted
+        self.qubits = qubits
+
+    @staticmethod
+    def from_scheduled_circuit(circuit: ScheduledCircuit) -> ColumnarScheduledCircuit:
+        """Build the columnar representation of ``circuit``.
+
+        Raises:
+            TQECError: if ``circuit`` contains an annotation, a tagged
+                instruction or a target group that is not made of one or two
+                qubit targets.
+            KeyError: if ``circuit`` targets a qubit that is not in its qubit
+                map.
+
+        """
+        i2q = circuit.qubit_map.i2q
+        instructions: dict[tuple[str, tuple[float, ...]], int] = {}
+        rows: list[list[int]] = []
+        for schedule, moment in circuit.scheduled_moments:
+            for position, instruction in enumerate(moment.instructions):
+                if is_annotation_instruction(instruction):
+                    raise TQECError(
+                        f"Cannot represent the annotation {instruction.name} in a "
+                        f"{ColumnarScheduledCircuit.__name__}."
+                    )
+                if instruction.tag:
+                    raise TQECError(
+                        f"Cannot represent the tag of {instruction} in a "
+                        f"{ColumnarScheduledCircuit.__name__}."
+                    )
+                key = (instruction.name, tuple(instruction.gate_args_copy()))
+                instruction_index = instructions.setdefault(key, len(instructions))
+                for group in instruction.target_groups():
+                    if len(group) > 2 or not all(target.is_qubit_target for target in group):
+                        raise TQECError(
+                            f"Cannot represent the targets {group} of {instruction.name} "
+                            f"in a {ColumnarScheduledCircuit.__name__}."
+                        )
+                    row = [schedule, position, instruction_index, 0, 0, 0, 0, 0, 0]
+                    for i, target in enumerate(group):
+                        qubit = i2q[target.qubit_value]
+                        row[3 + i] = qubit.x
+                        row[5 + i] = qubit.y
+                        row[7 + i] = target.is_inverted_result_target
+                    rows.append(row)
+        table = numpy.array(rows, dtype=numpy.int64).reshape(-1, 9)
+        return ColumnarScheduledCircuit(
+            list(instructions),
+            schedules=table[:, 0],
+            instances=numpy.zeros(table.shape[0], dtype=numpy.int64),
+            positions=table[:, 1],
+            instruction_indices=table[:, 2],
+            xs=table[:, 3:5],
+            ys=table[:, 5:7],
+            inverted=table[:, 7:9].astype(numpy.bool_),
+            qubits=numpy.array(
+                [(q.x, q.y) for q in circuit.qubit_map.qubits], dtype=numpy.int64
+            ).reshape(-1, 2),
+        )
+
+    def tile(
+        self, offsets: npt.NDArray[numpy.int64], instances: npt.NDArray[numpy.int64]
+    ) -> ColumnarScheduledCircuit:
+        """Return the concatenation of translated copies of ``self``.
+
+        Args:
+            offsets: array of shape ``(m, 2)`` with the translation applied to
+                each copy.
+            instances: array of shape ``(m,)`` with the instance index of each
+                copy.
+
+        Returns:
+            ``m`` copies of ``self``, the ``i``-th one translated by
+            ``offsets[i]`` and with instance index ``instances[i]``.
+
+        """
+        copies = offsets.shape[0]
+        dx = offsets[:, 0, numpy.newaxis, numpy.newaxis]
+        dy = offsets[:, 1, numpy.newaxis, numpy.newaxis]
+        return ColumnarScheduledCircuit(
+            self.instructions,
+            schedules=numpy.tile(self.schedules, copies),
+            instances=numpy.repeat(instances, self.schedules.size),
+            positions=numpy.tile(self.positions, copies),
+            instruction_indices=numpy.tile(self.instruction_indices, copies),
+            xs=(self.xs[numpy.newaxis] + dx).reshape(-1, 2),
+            ys=(self.ys[numpy.newaxis] + dy).reshape(-1, 2),
+            inverted=numpy.tile(self.inverted, (copies, 1)),
+            qubits=(self.qubits[numpy.newaxis] + offsets[:, numpy.newaxis, :]).reshape(-1, 2),
+        )
+
+    @staticmethod
+    def concatenate(
+        circuits: Sequence[ColumnarScheduledCircuit],
+    ) -> ColumnarScheduledCircuit:
+        """Return a circuit with the target groups and qubits of all the provided ``circuits``."""
+        if not circuits:
+            return ColumnarScheduledCircuit.from_scheduled_circuit(ScheduledCircuit.empty())
+        instructions: dict[tuple[str, tuple[float, ...]], int] = {}
+        instruction_indices: list[npt.NDArray[numpy.int64]] = []
+        for circuit in circuits:
+            remap = numpy.array(
+                [instructions.setdefault(key, len(instructions)) for key in circuit.instructions],
+                dtype=numpy.int64,
+            ).reshape(-1)
+            instruction_indices.append(remap[circuit.instruction_indices])
+        return ColumnarScheduledCircuit(
+            list(instructions),
+            schedules=numpy.concatenate([c.schedules for c in circuits]),
+            instances=numpy.concatenate([c.instances for c in circuits]),
+            positions=numpy.concatenate([c.positions for c in circuits]),
+            instruction_indices=numpy.concatenate(instruction_indices),
+            xs=numpy.concatenate([c.xs for c in circuits]),
+            ys=numpy.concatenate([c.ys for c in circuits]),
+            inverted=numpy.concatenate([c.inverted for c in circuits]),
+            qubits=numpy.concatenate([c.qubits for c in circuits]),
+        )
+
+    def to_scheduled_circuit(self, mergeable_instructions: Iterable[str] = ()) -> ScheduledCircuit:
+        """Build the :class:`.ScheduledCircuit` represented by ``self``.
+
+        The returned circuit is the same as the one returned by
+        :func:`.merge_scheduled_circuits` on the circuits represented by
+        ``self``, ordered by instance index: qubits are indexed in sorted order
+        and, in each moment, duplicated target groups of instructions with a
+        name in ``mergeable_instructions`` are removed, target groups of the
+        same instruction are merged and sorted, and instructions are ordered by
+        first appearance, mergeable instructions last.
+
+        Args:
+            mergeable_instructions: names of the instructions whose duplicated
+                target groups are removed.
+
+        Raises:
+            MultipleOperationsOnSameQubitError: if, after removing duplicates,
+                a qubit is targeted by several instructions of the same moment.
+
+        """
+        qubits = numpy.unique(self.qubits, axis=0)
+        qubit_map = QubitMap({i: GridQubit(x, y) for i, (x, y) in enumerate(qubits.tolist())})
+        if self.schedules.size == 0:
+            return ScheduledCircuit([], Schedule(), qubit_map, _avoid_checks=True)
+
+        # Qubit indices, in sorted (x, y) order, of the targets.
+        xmin, ymin = qubits.min(axis=0).tolist()
+        height = int(qubits[:, 1].max()) - ymin + 1
+        sorted_keys = (qubits[:, 0] - xmin) * height + (qubits[:, 1] - ymin)
+        arities = self.arities[self.instruction_indices]
+        indices = numpy.searchsorted(sorted_keys, (self.xs - xmin) * height + (self.ys - ymin))
+        indices[arities == 1, 1] = -1
+        inverted = self.inverted.astype(numpy.int64)
+        inverted[arities == 1, 1] = 0
+
+        # Instructions of a moment are ordered by first appearance, mergeable
+        # instructions after the other ones.
+        schedules, schedule_indices = numpy.unique(self.schedules, return_inverse=True)
+        mergeable_names = frozenset(mergeable_instructions)
+        mergeable = numpy.array(
+            [name in mergeable_names for name, _ in self.instructions], dtype=numpy.int64
+        )[self.instruction_indices]
+        appearances = self.instances * (int(self.positions.max()) + 1) + self.positions
+        ranks = mergeable * (int(appearances.max()) + 1) + appearances
+        groups = schedule_indices * len(self.instructions) + self.instruction_indices
+        group_ranks = numpy.full(schedules.size * len(self.instructions), ranks.max())
+        numpy.minimum.at(group_ranks, groups, ranks)
+
+        # Remove duplicated target groups of mergeable instructions.
+        columns = numpy.stack(
+            [schedule_indices, self.instruction_indices, *indices.T, *inverted.T], axis=1
+        )
+        _, first_indices = numpy.unique(columns[mergeable == 1], axis=0, return_index=True)
+        kept = numpy.concatenate(
+            [numpy.flatnonzero(mergeable == 0), numpy.flatnonzero(mergeable == 1)[first_indices]]
+        )
+        columns = columns[kept]
+        columns = columns[
+            numpy.lexsort((*columns[:, :1:-1].T, group_ranks[groups[kept]], columns[:, 0]))
+        ]
+
+        # Check that each qubit is targeted at most once per moment.
+        targeted = numpy.concatenate([columns[:, [0, 2]], columns[columns[:, 3] >= 0][:, [0, 3]]])
+        targeted_keys, counts = numpy.unique(
+            targeted[:, 0] * qubits.shape[0] + targeted[:, 1], return_counts=True
+        )
+        if numpy.any(counts > 1):
+            raise MultipleOperationsOnSameQubitError(
+                sorted(set((targeted_keys[counts > 1] % qubits.shape[0]).tolist()))
+            )
+
+        moments: list[Moment] = []
+        lines: list[str] = []
+        targets: list[str] = []
+        used_qubits: set[int] = set()
+        current: tuple[int, int] | None = None
+        rows = columns.tolist()
+        rows.append([-1, -1, -1, -1, 0, 0])
+        for schedule_index, instruction_index, q0, q1, inv0, inv1 in rows:
+            if current is not None and current != (schedule_index, instruction_index):
+                name, args = self.instructions[current[1]]
+                arguments = f"({', '.join(map(repr, args))})" if args else ""
+                lines.append(f"{name}{arguments} {' '.join(targets)}")
+                targets.clear()
+                if current[0] != schedule_index:
+                    moments.append(
+                        Moment(
+                            stim.Circuit("\n".join(lines)),
+                            used_qubits=used_qubits,
+                            _avoid_checks=True,
+                        )
+                    )
+                    lines = []
+                    used_qubits = set()
+            current = (schedule_index, instruction_index)
+            targets.append(f"!{q0}" if inv0 else str(q0))
+            used_qubits.add(q0)
+            if q1 >= 0:
+                targets.append(f"!{q1}" if inv1 else str(q1))
+                used_qubits.add(q1)
+        return ScheduledCircuit(
+            moments, Schedule(schedules.tolist()), qubit_map, _avoid_checks=True
+        )
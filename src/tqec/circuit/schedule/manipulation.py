@@ -18,15 +18,17 @@ This module implement a few central functions for the :mod:`tqec` library:
 from __future__ import annotations
 
 import functools
+import heapq
 import itertools
 import operator
 import warnings
+from collections import Counter
 from collections.abc import Iterable, Sequence
 
 import stim
 
-from tqec.circuit.moment import Moment
-from tqec.circuit.qubit import GridQubit
+from tqec.circuit.moment import Moment, MultipleOperationsOnSameQubitError
+from tqec.circuit.qubit import ANNOTATION_INSTRUCTIONS, GridQubit
 from tqec.circuit.qubit_map import QubitMap
 from tqec.circuit.schedule.circuit import ScheduledCircuit
 from tqec.circuit.schedule.schedule import Schedule
@@ -58,33 +60,30 @@ class _ScheduledCircuits:
         self._global_qubit_map = global_qubit_map
         self._iterators = [circuit.scheduled_moments for circuit in self._circuits]
         self._current_moments = [next(it, None) for it in self._iterators]
+        # Priority queue of the schedule of the pending moment of each circuit.
+        # Ties are broken by circuit index, so moments with the same schedule
+        # are collected in the order of the circuits.
+        self._pending_schedules = [
+            (moment[0], index)
+            for index, moment in enumerate(self._current_moments)
+            if moment is not None
+        ]
+        heapq.heapify(self._pending_schedules)
 
     def has_pending_moment(self) -> bool:
         """Check if any of the managed instances has a pending moment.
 
-        Any moment that has not been collected by using collect_moment is considered to be pending.
-
         Any moment that has not been collected by using ``collect_moment`` is considered to be
         pending.
 
         """
-        return any(self._has_pending_moment(i) for i in range(len(self._circuits)))
-
-    def _has_pending_moment(self, index: int) -> bool:
-        """Check if the managed instance at the given index has a pending operation."""
-        return self._current_moments[index] is not None
-
-    def _peek_scheduled_moment(self, index: int) -> tuple[int, Moment]:
-        """Recover **without collecting** pending operations for the instance at the given index."""
-        ret = self._current_moments[index]
-        assert ret is not None
-        return ret
+        return bool(self._pending_schedules)
 
     def _pop_scheduled_moment(self, index: int) -> tuple[int, Moment]:
         """Recover and mark as collected the pending moment for the instance at the given index.
 
         Raises:
-            AssertionError: ``if not self.has_pending_operation(index)``.
+            TQECError: if the instance at the given index has no pending moment.
 
         """
         ret = self._current_moments[index]
@@ -93,7 +92,9 @@ class _ScheduledCircuits:
                 "Trying to pop a Moment instance from a ScheduledCircuit with "
                 "all its moments already collected."
             )
-        self._current_moments[index] = next(self._iterators[index], None)
+        self._current_moments[index] = next_moment = next(self._iterators[index], None)
+        if next_moment is not None:
+            heapq.heappush(self._pending_schedules, (next_moment[0], index))
         return ret
 
     @property
@@ -112,16 +113,12 @@ class _ScheduledCircuits:
 
         """
         assert self.has_pending_moment()
-        circuit_indices_organised_by_schedule: dict[int, list[int]] = dict()
-        for circuit_index in range(self.number_of_circuits):
-            if not self._has_pending_moment(circuit_index):
-                continue
-            schedule, _ = self._peek_scheduled_moment(circuit_index)
-            circuit_indices_organised_by_schedule.setdefault(schedule, list()).append(circuit_index)
-
-        minimum_schedule = min(circuit_indices_organised_by_schedule.keys())
+        minimum_schedule = self._pending_schedules[0][0]
         moments_to_return: list[Moment] = list()
-        for circuit_index in circuit_indices_organised_by_schedule[minimum_schedule]:
+        # Schedules of a circuit are strictly increasing, so the moments pushed
+        # by _pop_scheduled_moment are never collected by this loop.
+        while self._pending_schedules and self._pending_schedules[0][0] == minimum_schedule:
+            _, circuit_index = heapq.heappop(self._pending_schedules)
             _, moment = self._pop_scheduled_moment(circuit_index)
             moments_to_return.append(moment)
         return minimum_schedule, moments_to_return
@@ -238,6 +235,87 @@ def merge_instructions(
     ]
 
 
+@functools.lru_cache(maxsize=65536)
+def _target_to_text(target: stim.GateTarget) -> str:
+    if target.is_measurement_record_target:
+        return f"rec[{target.value}]"
+    if target.is_sweep_bit_target:
+        return f"sweep[{target.value}]"
+    if target.is_combiner:
+        return "*"
+    text = "!" if target.is_inverted_result_target else ""
+    if target.is_x_target:
+        text += "X"
+    elif target.is_y_target:
+        text += "Y"
+    elif target.is_z_target:
+        text += "Z"
+    return text + str(target.value)
+
+
+def _escape_tag(tag: str) -> str:
+    """Escape ``tag`` as in the text representation of a ``stim.Circuit``."""
+    return tag.replace("\\", "\\B").replace("]", "\\C").replace("\r", "\\r").replace("\n", "\\n")
+
+
+def _merge_moments(
+    moments: Iterable[Moment],
+    mergeable_instruction_names: frozenset[str],
+) -> Moment:
+    """Merge moments scheduled at the same time into a single :class:`.Moment`.
+
+    This is equivalent to calling :func:`remove_duplicate_instructions` and
+    :func:`merge_instructions` on the instructions of ``moments`` and sorting the
+    target groups of the resulting instructions, but buckets instructions by
+    name, tag and arguments in a single pass and builds the merged circuit once.
+
+    Raises:
+        MultipleOperationsOnSameQubitError: if, once duplicated target groups of
+            mergeable instructions are removed, several non-annotation
+            instructions are applied on the same qubit.
+
+    """
+    # Non-mergeable instructions come first, in order of first appearance, and
+    # duplicated target groups of mergeable instructions are removed.
+    target_groups: dict[tuple[str, str, tuple[float, ...]], list[tuple[stim.GateTarget, ...]]] = {}
+    mergeable_target_groups: dict[
+        tuple[str, str, tuple[float, ...]], set[tuple[stim.GateTarget, ...]]
+    ] = {}
+    for moment in moments:
+        for instruction in moment.instructions:
+            key = (instruction.name, instruction.tag, tuple(instruction.gate_args_copy()))
+            groups = (tuple(group) for group in instruction.target_groups())
+            if instruction.name in mergeable_instruction_names:
+                mergeable_target_groups.setdefault(key, set()).update(groups)
+            else:
+                target_groups.setdefault(key, []).extend(groups)
+
+    def _sort_key(target_group: tuple[stim.GateTarget, ...]) -> tuple[int, ...]:
+        return tuple(t.value for t in target_group)
+
+    lines: list[str] = []
+    used_qubits: list[int] = []
+    for (name, tag, args), groups in itertools.chain(
+        target_groups.items(), mergeable_target_groups.items()
+    ):
+        sorted_groups = sorted(groups, key=_sort_key)
+        if name not in ANNOTATION_INSTRUCTIONS:
+            used_qubits.extend(
+                t.value for group in sorted_groups for t in group if t.is_qubit_target
+            )
+        tag_text = f"[{_escape_tag(tag)}]" if tag else ""
+        arguments = f"({', '.join(map(repr, args))})" if args else ""
+        targets = " ".join(_target_to_text(target) for group in sorted_groups for target in group)
+        lines.append(f"{name}{tag_text}{arguments} {targets}")
+    # Same check as Moment.check_is_valid_moment (merged moments can neither
+    # contain TICK nor REPEAT instructions), without re-reading the merged circuit.
+    if len(set(used_qubits)) != len(used_qubits):
+        raise MultipleOperationsOnSameQubitError(
+            [qi for qi, count in Counter(used_qubits).items() if count > 1]
+        )
+    return Moment(stim.Circuit("\n".join(lines)), set(used_qubits), _avoid_checks=True)
+
+
 def merge_scheduled_circuits(
     circuits: list[ScheduledCircuit],
     global_qubit_map: QubitMap,
@@ -267,6 +345,11 @@ def merge_scheduled_circuits(
     Returns:
         a circuit representing the merged scheduled circuits given as input.
 
+    Raises:
+        MultipleOperationsOnSameQubitError: if a merged moment is not valid,
+            e.g. if two circuits apply non-mergeable instructions on the same
+            qubit at the same schedule.
+
     """
     scheduled_circuits = _ScheduledCircuits(circuits, global_qubit_map)
 
@@ -274,28 +357,10 @@ def merge_scheduled_circuits(
     all_schedules = Schedule()
     global_i2q = QubitMap({i: q for q, i in scheduled_circuits.q2i.items()})
 
+    mergeable_instruction_names = frozenset(mergeable_instructions)
     while scheduled_circuits.has_pending_moment():
         schedule, moments = scheduled_circuits.collect_moments_at_minimum_schedule()
-        # Flatten the moments into a list of operations to perform some modifications
-        instructions: list[stim.CircuitInstruction] = functools.reduce(
-            operator.iadd, (list(moment.instructions) for moment in moments), []
-        )
-        # Avoid duplicated operations. Any operation that have the Plaquette.get_mergeable_tag() tag
-        # is considered mergeable, and can be removed if another operation in the list
-        # is considered equal (and has the mergeable tag).
-        deduplicated_instructions = remove_duplicate_instructions(
-            instructions,
-            mergeable_instruction_names=frozenset(mergeable_instructions),
-        )
-        merged_instructions = merge_instructions(deduplicated_instructions)
-        circuit = stim.Circuit()
-        for inst in merged_instructions:
-            circuit.append(
-                inst.name,
-                functools.reduce(operator.iadd, _sort_target_groups(inst.target_groups()), []),
-                inst.gate_args_copy(),
-            )
-        all_moments.append(Moment(circuit))
+        all_moments.append(_merge_moments(moments, mergeable_instruction_names))
         all_schedules.append(schedule)
 
     return ScheduledCircuit(all_moments, all_schedules, global_i2q, _avoid_checks=True)
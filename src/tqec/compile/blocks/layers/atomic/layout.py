@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+import functools
 from collections.abc import Iterable
+from copy import deepcopy
+from dataclasses import dataclass
 from functools import cached_property
 from typing import Final, TypeGuard
 
+import numpy
+import numpy.typing as npt
 from typing_extensions import override
 
 from tqec.circuit.qubit import GridQubit
@@ -242,32 +247,68 @@ class LayoutLayer(BaseLayer):
         template = LayoutTemplate(template_dict)
         return template, template.get_global_plaquettes(plaquettes_dict)
 
-    def qubits(self, k: int) -> set[GridQubit]:
-        """Return the qubits used by the circuit representing the layer at scale ``k``.
+    def qubit_coordinates(self, k: int) -> npt.NDArray[numpy.int64]:
+        """Return the coordinates of the qubits used by the circuit representing the layer.
 
         Computed from the underlying templates and plaquettes without generating
         a :class:`~tqec.circuit.schedule.circuit.ScheduledCircuit`, so that callers
-        can build a global qubit map ahead of streaming circuit generation.
+        can build a global qubit map ahead of streaming circuit generation. Layers
+        that only differ by a translation share the same computation.
+
+        Args:
+            k: scaling factor.
+
+        Raises:
+            NotImplementedError: if not all layers composing ``self`` are instances
+                of :class:`~tqec.compile.blocks.layers.atomic.plaquette.PlaquetteLayer`.
+
+        Returns:
+            an array of shape ``(n, 2)`` with the sorted and distinct ``(x, y)``
+            coordinates of the ``n`` qubits used at scale ``k``.
+
+        """
+        content = self._content()
+        if content is None:
+            raise NotImplementedError(
+                f"Found a layer that is not an instance of {PlaquetteLayer.__name__}. "
+                "Qubit listing is not implemented (yet) for this case."
+            )
+        shift = self._shift(k)
+        return _local_qubit_coordinates(content, k) + numpy.array([shift.x, shift.y])
+
+    def qubits(self, k: int) -> set[GridQubit]:
+        """Return the qubits used by the circuit representing the layer at scale ``k``.
+
+        See :meth:`qubit_coordinates`.
 
         """
-        template, plaquettes = self.to_template_and_plaquettes()
-        plaquette_array = template.instantiate(k)
-        increments = template.get_increments()
+        return {GridQubit(x, y) for x, y in self.qubit_coordinates(k).tolist()}
+
+    def _content(self) -> _LayoutLayerContent | None:
+        """Return the content of ``self`` relative to its minimum cube, if only made of plaquettes.
+
+        Layers with the same content are represented by the same circuit up to
+        a translation, see :meth:`_shift`.
+        """
+        if not contains_only_plaquette_layers(self.layers):
+            return None
+        mincube, _ = self.bounds
+        return _LayoutLayerContent(
+            tuple(
+                (type(pos)(pos._x - 2 * mincube.x, pos._y - 2 * mincube.y), layer)
+                for pos, layer in self.layers.items()
+            ),
+            self.element_shape,
+        )
+
+    def _shift(self, k: int) -> Shift2D:
+        """Return the translation from the local coordinates of ``self`` to its qubits."""
         mincube, _ = self.bounds
         eshape = self.element_shape.to_shape_2d(k)
-        layer_shift = Shift2D(mincube.x * (eshape.x - 1), mincube.y * (eshape.y - 1))
-
-        qubits: set[GridQubit] = set()
-        for row_index, line in enumerate(plaquette_array):
-            for column_index, plaquette_index in enumerate(line):
-                if plaquette_index == 0:
-                    continue
-                plaquette = plaquettes[int(plaquette_index)]
-                offset_x = plaquette.origin.x + column_index * increments.x + layer_shift.x
-                offset_y = plaquette.origin.y + row_index * increments.y + layer_shift.y
-                for q in plaquette.circuit.qubits:
-                    qubits.add(GridQubit(q.x + offset_x, q.y + offset_y))
-        return qubits
+        # See: https://github.com/tqec/tqec/issues/525
+        # This is a temporary fix to the above issue, we may need a utility function
+        # to calculate shift to avoid similar issues in the future.
+        return Shift2D(mincube.x * (eshape.x - 1), mincube.y * (eshape.y - 1))
 
     def to_circuit(self, k: int, reschedule_measurements: bool = True) -> ScheduledCircuit:
         """Return the quantum circuit representing the layer.
@@ -285,15 +326,23 @@ class LayoutLayer(BaseLayer):
         """
         if reschedule_measurements:
             self.reschedule_measurements()
-        template, plaquettes = self.to_template_and_plaquettes()
-        scheduled_circuit = generate_circuit(template, k, plaquettes)
+        content = self._content()
+        if content is not None:
+            # Layers that only differ by a translation share the same circuit in
+            # local coordinates, so it is only generated once.
+            local_circuit = _generate_local_circuit(content, k)
+            # Copy the moments, that are mutable, to keep the cached circuit intact.
+            scheduled_circuit = ScheduledCircuit(
+                [deepcopy(moment) for moment in local_circuit.moments],
+                local_circuit.schedule,
+                local_circuit.qubit_map,
+                _avoid_checks=True,
+            )
+        else:
+            template, plaquettes = self.to_template_and_plaquettes()
+            scheduled_circuit = generate_circuit(template, k, plaquettes)
         # Shift the qubits of the returned scheduled circuit
-        mincube, _ = self.bounds
-        eshape = self.element_shape.to_shape_2d(k)
-        # See: https://github.com/tqec/tqec/issues/525
-        # This is a temporary fix to the above issue, we may need a utility function
-        # to calculate shift to avoid similar issues in the future.
-        shift = Shift2D(mincube.x * (eshape.x - 1), mincube.y * (eshape.y - 1))
+        shift = self._shift(k)
         shifted_circuit = scheduled_circuit.map_to_qubits(lambda q: q + shift)
         return shifted_circuit
 
@@ -322,3 +371,86 @@ class LayoutLayer(BaseLayer):
         # before returning.
         shift = (-1, -1)
         return tlq + shift, brq + shift
+
+
+@dataclass(frozen=True)
+class _LayoutLayerContent:
+    """Content of a :class:`LayoutLayer` translated to have its minimum cube at the origin.
+
+    Two instances are equal if their layers have the same positions, templates,
+    plaquettes and trimmed borders, in which case they are represented by the
+    same circuit in local coordinates.
+    """
+
+    layers: tuple[tuple[LayoutPosition2D, PlaquetteLayer], ...]
+    element_shape: PhysicalQubitScalable2D
+
+    def __hash__(self) -> int:
+        return hash(
+            (
+                self.element_shape,
+                tuple(
+                    (pos, layer.template, layer.plaquettes, layer.trimmed_spatial_borders)
+                    for pos, layer in self.layers
+                ),
+            )
+        )
+
+    def __eq__(self, other: object) -> bool:
+        return (
+            isinstance(other, _LayoutLayerContent)
+            and self.element_shape == other.element_shape
+            and len(self.layers) == len(other.layers)
+            and all(
+                type(pos) is type(other_pos)
+                and pos == other_pos
+                and layer == other_layer
+                and layer.trimmed_spatial_borders == other_layer.trimmed_spatial_borders
+                for (pos, layer), (other_pos, other_layer) in zip(self.layers, other.layers)
+            )
+        )
+
+
+@functools.lru_cache(maxsize=128)
+def _generate_local_circuit(content: _LayoutLayerContent, k: int) -> ScheduledCircuit:
+    """Generate the circuit of a layout layer in its local coordinates.
+
+    The returned circuit is shared between all the layers with the same
+    ``content``, and so should not be mutated.
+    """
+    layer = LayoutLayer(dict(content.layers), content.element_shape)
+    template, plaquettes = layer.to_template_and_plaquettes()
+    return generate_circuit(template, k, plaquettes)
+
+
+@functools.lru_cache(maxsize=128)
+def _local_qubit_coordinates(content: _LayoutLayerContent, k: int) -> npt.NDArray[numpy.int64]:
+    """Return the sorted and distinct qubit coordinates of a layout layer in its local coordinates.
+
+    The returned array is shared between all the layers with the same
+    ``content`` and so is read-only.
+    """
+    layer = LayoutLayer(dict(content.layers), content.element_shape)
+    template, plaquettes = layer.to_template_and_plaquettes()
+    plaquette_array = template.instantiate(k)
+    increments = template.get_increments()
+    rows, columns = numpy.nonzero(plaquette_array)
+    plaquette_indices = plaquette_array[rows, columns]
+    coordinates: list[npt.NDArray[numpy.int64]] = [numpy.empty((0, 2), dtype=numpy.int64)]
+    for plaquette_index in numpy.unique(plaquette_indices).tolist():
+        plaquette = plaquettes[plaquette_index]
+        instances = plaquette_indices == plaquette_index
+        origins = numpy.stack(
+            [
+                plaquette.origin.x + columns[instances] * increments.x,
+                plaquette.origin.y + rows[instances] * increments.y,
+            ],
+            axis=1,
+        )
+        offsets = numpy.array(
+            [(q.x, q.y) for q in plaquette.circuit.qubits], dtype=numpy.int64
+        ).reshape(-1, 2)
+        coordinates.append((origins[:, numpy.newaxis, :] + offsets).reshape(-1, 2))
+    qubits = numpy.unique(numpy.concatenate(coordinates), axis=0)
+    qubits.flags.writeable = False
+    return qubits
@@ -27,8 +27,10 @@ documentation.
 
 """
 
+from .compute import DetectorComputationPool as DetectorComputationPool
 from .compute import (
     compute_detectors_for_fixed_radius as compute_detectors_for_fixed_radius,
 )
 from .database import DetectorDatabase as DetectorDatabase
+from .database import DetectorDatabaseStatistics as DetectorDatabaseStatistics
 from .detector import Detector as Detector
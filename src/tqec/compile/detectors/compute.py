@@ -1,11 +1,20 @@
+from __future__ import annotations
+
+import contextlib
+import copy
+import functools
 import json
-from collections.abc import Sequence
+import multiprocessing.pool
+import os
+from collections.abc import Iterable, Mapping, Sequence
+from dataclasses import dataclass
 from multiprocessing import Pool, cpu_count
+from typing import cast
 
 import numpy
 import numpy.typing as npt
 import stim
-from tqecd.flow import build_flows_from_fragments
+from tqecd.flow import FragmentFlows, build_flows_from_fragments
 from tqecd.fragment import Fragment
 from tqecd.match import (
     MatchedDetector,
@@ -15,16 +24,21 @@ from tqecd.match import (
 
 from tqec.circuit.measurement import Measurement, get_measurements_from_circuit
 from tqec.circuit.qubit import GridQubit
-from tqec.circuit.schedule import ScheduledCircuit, relabel_circuits_qubit_indices
-from tqec.compile.detectors.database import DetectorDatabase
+from tqec.circuit.qubit_map import QubitMap
+from tqec.compile.detectors.database import (
+    DetectorDatabase,
+    _DetectorDatabaseKey,
+)
 from tqec.compile.detectors.detector import Detector
 from tqec.compile.generation import generate_circuit_from_instantiation
-from tqec.plaquette.plaquette import Plaquettes
+from tqec.plaquette.plaquette import Plaquette, Plaquettes
 from tqec.templates.base import Template
 from tqec.templates.display import get_template_representation_from_instantiation
 from tqec.templates.subtemplates import (
     SubTemplateType,
+    Unique3DSubTemplates,
     get_spatially_distinct_3d_subtemplates,
+    stack_spatially_distinct_subtemplates,
 )
 from tqec.utils.array import to2dlist
 from tqec.utils.coordinates import StimCoordinates
@@ -189,7 +203,7 @@ def _center_plaquette_syndrome_qubits(
 
 
 def _best_effort_filter_detectors(
-    detectors: list[Detector],
+    detectors: Iterable[Detector],
     subtemplates: Sequence[SubTemplateType],
     plaquettes: Sequence[Plaquettes],
     increments: Shift2D,
@@ -251,6 +265,133 @@ def _best_effort_filter_detectors(
     return frozenset(filtered_detectors)
 
 
+def _is_empty_timeslice(subtemplate: SubTemplateType, plaquettes: Plaquettes) -> bool:
+    """Return ``True`` if the circuit generated from the provided timeslice is empty.
+
+    This is equivalent to checking
+    ``generate_circuit_from_instantiation(subtemplate, plaquettes, increments).is_empty()``
+    without generating the circuit: only the circuits of the plaquettes used in
+    ``subtemplate`` are inspected.
+    """
+    indices = numpy.unique(subtemplate)
+    return all(plaquettes[i].circuit.is_empty() for i in indices.tolist() if i != 0)
+
+
+def _strip_leading_empty_timeslices(
+    subtemplates: Sequence[SubTemplateType],
+    plaquettes: Sequence[Plaquettes],
+) -> tuple[Sequence[SubTemplateType], Sequence[Plaquettes]]:
+    """Remove the timeslices that are empty at the beginning of the provided situation.
+
+    Empty timeslices do not contribute any measurement, so the detectors at the
+    end of a situation do not depend on them. Removing them before looking
+    a situation up in a :class:`.DetectorDatabase` ensures that situations only
+    differing by their empty history (e.g., the first layer of a block computed
+    with different ``lookback`` values) share the same database entry.
+
+    The last timeslice is never removed, even if empty.
+
+    Args:
+        subtemplates: a sequence of sub-template(s) describing the situation.
+        plaquettes: a sequence of collection of plaquettes each representing one
+            QEC round of the situation.
+
+    Returns:
+        the provided ``subtemplates`` and ``plaquettes``, without their leading
+        empty timeslices.
+
+    """
+    start = 0
+    while start < min(len(subtemplates), len(plaquettes)) - 1 and _is_empty_timeslice(
+        subtemplates[start], plaquettes[start]
+    ):
+        start += 1
+    return subtemplates[start:], plaquettes[start:]
+
+
+@functools.lru_cache(maxsize=1024)
+def _plaquette_reach(plaquette: Plaquette) -> int:
+    """Return the maximum distance, along each axis, from a plaquette cell corner to its qubits.
+
+    A plaquette placed on a cell with its top-left corner at ``(x, y)`` only
+    uses qubits with coordinates in ``[x - reach, x + reach] x [y - reach, y + reach]``.
+    """
+    origin = plaquette.origin
+    return max(
+        (max(abs(q.x + origin.x), abs(q.y + origin.y)) for q in plaquette.qubits),
+        default=0,
+    )
+
+
+@dataclass(frozen=True)
+class _TimesliceFlows:
+    """Data about one timeslice of a situation, independent of the other timeslices.
+
+    Qubits are indexed with :func:`_situation_qubit_index`, so that the data of
+    the different timeslices of a situation can be combined without relabelling.
+
+    Attributes:
+        circuit: circuit of the timeslice, without qubit coordinates.
+        qubits: qubits used by ``circuit``, indexed by their index in ``circuit``.
+        flows: stabilizer flows of ``circuit``. Should be copied before being
+            provided to functions from ``tqecd.match`` that mutate them.
+
+    """
+
+    circuit: stim.Circuit
+    qubits: dict[int, GridQubit]
+    flows: FragmentFlows
+
+
+def _situation_qubit_index(qubit: GridQubit, width: int, margin: int) -> int:
+    """Index of ``qubit`` in a situation spanning ``width`` qubit columns.
+
+    Args:
+        qubit: qubit to index, in the sub-template coordinates.
+        width: number of qubit columns spanned by the situation.
+        margin: number of qubit rows and columns used by the situation above
+            and on the left of its top-left plaquette cell corner.
+
+    """
+    return (qubit.y + margin) * width + qubit.x + margin
+
+
+@functools.lru_cache(maxsize=4096)
+def _get_timeslice_flows(
+    subtemplate_data: bytes,
+    shape: tuple[int, ...],
+    plaquettes: Plaquettes,
+    increments: Shift2D,
+    margin: int,
+) -> _TimesliceFlows:
+    """Generate the circuit of one timeslice and compute its stabilizer flows.
+
+    Situations overlap in time (the last timeslice of a situation is often the
+    first one of the situation computed for the next layer) and repeat in
+    space, so this function caches its results.
+
+    Args:
+        subtemplate_data: bytes of the ``numpy.int64`` sub-template of the
+            timeslice.
+        shape: shape of the sub-template of the timeslice.
+        plaquettes: plaquettes of the timeslice.
+        increments: spatial increments between each ``Plaquette`` origin.
+        margin: maximum :func:`_plaquette_reach` of the plaquettes used in the
+            situation the timeslice belongs to.
+
+    """
+    subtemplate = numpy.frombuffer(subtemplate_data, dtype=numpy.int64).reshape(shape)
+    circuit = generate_circuit_from_instantiation(subtemplate, plaquettes, increments)
+    width = (shape[1] - 1) * increments.x + 2 * margin + 1
+    circuit = circuit.map_qubit_indices(
+        {i: _situation_qubit_index(q, width, margin) for i, q in circuit.qubit_map.items()}
+    )
+    coordless_circuit = circuit.get_circuit(include_qubit_coords=False)
+    flows = build_flows_from_fragments([Fragment(coordless_circuit)])[0]
+    assert isinstance(flows, FragmentFlows)
+    return _TimesliceFlows(coordless_circuit, dict(circuit.qubit_map.items()), flows)
+
+
 def _compute_detectors_at_end_of_situation(
     subtemplates: Sequence[SubTemplateType],
     plaquettes: Sequence[Plaquettes],
@@ -272,51 +413,42 @@ def _compute_detectors_at_end_of_situation(
         return frozenset()
 
     # Note: if there is more than 1 time slice, remove any initial time slice
-    # that is trivially empty. This is a faster version of the next while loop,
-    # but this might not catch all empty circuits (e.g., those that have an
-    # explicit plaquette, that turns out to be empty).
-    while len(subtemplates) > 1 and numpy.all(subtemplates[0] == 0):
-        assert len(plaquettes) > 1  # make type checkers happy
-        subtemplates = subtemplates[1:]
-        plaquettes = plaquettes[1:]
-
-    # Note: if there is more than 1 time slice, remove any initial time slice
-    # that is empty. Same as above, but without any false negative and less
-    # efficient.
-    current_circuit = generate_circuit_from_instantiation(
-        subtemplates[0], plaquettes[0], increments
+    # that is empty.
+    subtemplates, plaquettes = _strip_leading_empty_timeslices(subtemplates, plaquettes)
+    # Compute the flows of each timeslice, using the same qubit indices for all
+    # the timeslices so that they can be matched without relabelling qubits.
+    margin = max(
+        _plaquette_reach(plaqs[i])
+        for subtemplate, plaqs in zip(subtemplates, plaquettes)
+        for i in numpy.unique(subtemplate).tolist()
+        if i != 0
     )
-    while len(subtemplates) > 1 and current_circuit.is_empty():
-        assert len(plaquettes) > 1  # make type checkers happy
-        subtemplates = subtemplates[1:]
-        plaquettes = plaquettes[1:]
-        current_circuit = generate_circuit_from_instantiation(
-            subtemplates[0], plaquettes[0], increments
+    timeslices = [
+        _get_timeslice_flows(
+            numpy.ascontiguousarray(subtemplate, dtype=numpy.int64).tobytes(),
+            subtemplate.shape,
+            plaqs,
+            increments,
+            margin,
         )
-    # Build subcircuit for each Plaquettes layer
-    subcircuits: list[ScheduledCircuit] = [current_circuit]
-    for subtemplate, plaqs in zip(subtemplates[1:], plaquettes[1:]):
-        subcircuit = generate_circuit_from_instantiation(subtemplate, plaqs, increments)
-        subcircuits.append(subcircuit)
-    # Extract the global qubit map from the generated sub-circuits, relabeling
-    # qubits if needed.
-    subcircuits, global_qubit_map = relabel_circuits_qubit_indices(subcircuits)
-    # Get the stim.Circuit instances. We do not need the coordinates here
-    # because we have already computed the global qubit map.
-    coordless_subcircuits = [sc.get_circuit(include_qubit_coords=False) for sc in subcircuits]
+        for subtemplate, plaqs in zip(subtemplates, plaquettes)
+    ]
+    global_qubit_map = QubitMap(
+        dict(sorted({i: q for ts in timeslices for i, q in ts.qubits.items()}.items()))
+    )
     # Get the full stim.Circuit to compute a measurement records offset map and
     # filter out detectors at the end.
     complete_circuit = global_qubit_map.to_circuit()
-    for coordless_subcircuit in coordless_subcircuits[:-1]:
-        complete_circuit += coordless_subcircuit
+    for timeslice in timeslices[:-1]:
+        complete_circuit += timeslice.circuit
         complete_circuit.append("TICK", [], [])
-    complete_circuit += coordless_subcircuits[-1]
+    complete_circuit += timeslices[-1].circuit
 
     # Use tqecd.detectors module to match the detectors. Note that, for
     # the moment, only the last two time slices are taken into account.
+    # Matching mutates the flows, so the cached flows are copied.
     coordinates_by_index = {i: (float(q.x), float(q.y)) for i, q in global_qubit_map.items()}
-    fragments = [Fragment(circ) for circ in coordless_subcircuits]
-    flows = build_flows_from_fragments(fragments)
+    flows = [copy.copy(timeslice.flows) for timeslice in timeslices]
     matched_detectors = match_detectors_within_fragment(flows[-1], coordinates_by_index)
     if len(flows) == 2:
         matched_detectors.extend(
@@ -336,6 +468,234 @@ def _compute_detectors_at_end_of_situation(
     return _best_effort_filter_detectors(detectors, subtemplates, plaquettes, increments)
 
 
+def _crop_situation(
+    subtemplates: Sequence[SubTemplateType],
+    plaquettes: Sequence[Plaquettes],
+    radius: int,
+) -> tuple[Sequence[SubTemplateType], Sequence[Plaquettes]]:
+    """Restrict the provided situation to the plaquettes within ``radius`` of its center.
+
+    Timeslices that become empty at the beginning of the cropped situation are
+    removed with :func:`_strip_leading_empty_timeslices`.
+
+    Args:
+        subtemplates: a sequence of sub-template(s) describing the situation.
+        plaquettes: a sequence of collection of plaquettes each representing one
+            QEC round of the situation.
+        radius: radius of the returned situation. Should not be larger than the
+            radius of the provided situation.
+
+    Returns:
+        sub-templates of shape ``(2 * radius + 1, 2 * radius + 1)`` centered on
+        the central plaquette of the provided situation, and their plaquettes.
+
+    """
+    r = subtemplates[-1].shape[0] // 2
+    cropped = [s[r - radius : r + radius + 1, r - radius : r + radius + 1] for s in subtemplates]
+    return _strip_leading_empty_timeslices(cropped, plaquettes)
+
+
+@functools.lru_cache(maxsize=1024)
+def _measured_qubits(plaquette: Plaquette) -> frozenset[GridQubit]:
+    """Return the qubits measured by ``plaquette``, in the plaquette coordinates."""
+    return frozenset(
+        m.qubit for m in get_measurements_from_circuit(plaquette.circuit.get_circuit())
+    )
+
+
+def _is_radius_sufficient(
+    detectors: Iterable[Detector],
+    subtemplates: Sequence[SubTemplateType],
+    plaquettes: Sequence[Plaquettes],
+    increments: Shift2D,
+) -> bool:
+    """Check if the detectors computed on a situation do not depend on plaquettes outside of it.
+
+    The radius of the situation is considered sufficient if:
+
+    1. each measurement, in the last round, of a syndrome qubit owned by the
+       central plaquette (see :func:`_center_plaquette_syndrome_qubits`) is
+       part of a detector, if the central plaquette measures that qubit,
+    2. no detector involves a measurement of a qubit that is only used by the
+       plaquettes on the border of the situation.
+
+    The first condition checks that no detector is missing because the flows
+    forming it leave the situation, and the second one that the detectors found
+    do not rely on the absence of the plaquettes around the situation.
+
+    Args:
+        detectors: detectors computed on the provided situation.
+        subtemplates: sub-templates describing the situation.
+        plaquettes: plaquettes describing the situation.
+        increments: spatial increments between each ``Plaquette`` origin.
+
+    Returns:
+        ``True`` if computing detectors on a larger situation with the same
+        center is not expected to change the detectors.
+
+    """
+    detectors = list(detectors)
+    r = subtemplates[-1].shape[0] // 2
+    x_range = range(increments.x, 2 * r * increments.x + 1)
+    y_range = range(increments.y, 2 * r * increments.y + 1)
+    if any(
+        m.qubit.x not in x_range or m.qubit.y not in y_range
+        for d in detectors
+        for m in d.measurements
+    ):
+        return False
+    central_plaquette_index = int(subtemplates[-1][r, r])
+    if central_plaquette_index == 0:
+        return True
+    central_plaquette = plaquettes[-1][central_plaquette_index]
+    origin = central_plaquette.origin
+    offset = Shift2D(r * increments.x + origin.x, r * increments.y + origin.y)
+    measured_qubits = {q + offset for q in _measured_qubits(central_plaquette)}
+    covered = frozenset(m for d in detectors for m in d.measurements)
+    return all(
+        Measurement(q, -1) in covered
+        for q in _center_plaquette_syndrome_qubits(subtemplates[-1], plaquettes[-1], increments)
+        if q in measured_qubits
+    )
+
+
+def _get_detectors_from_database(
+    database: DetectorDatabase,
+    subtemplates: Sequence[SubTemplateType],
+    plaquettes_by_timestep: Sequence[Plaquettes],
+    increments: Shift2D,
+) -> frozenset[Detector] | None:
+    """Return the detectors of the provided situation stored in ``database``, if any.
+
+    If ``database.adaptive_radius`` is set, the situation might have been stored
+    with a smaller radius (see :func:`_compute_situations`). The smaller radii
+    are tried first, only considering the situations that have been stored with
+    ``sufficient_radius=True``, and the detectors found are shifted to the
+    coordinate system of the provided situation. A single lookup is recorded in
+    ``database.statistics``.
+    """
+    radius = subtemplates[-1].shape[0] // 2
+    candidates: list[tuple[int, Sequence[SubTemplateType], Sequence[Plaquettes], bool]] = []
+    if database.adaptive_radius:
+        candidates.extend(
+            (r, *_crop_situation(subtemplates, plaquettes_by_timestep, r), True)
+            for r in range(1, radius)
+        )
+    candidates.append((radius, subtemplates, plaquettes_by_timestep, False))
+    if database.adaptive_radius:
+        candidates.append((radius, subtemplates, plaquettes_by_timestep, True))
+    found = database.get_first_detectors(candidate[1:] for candidate in candidates)
+    if found is None:
+        return None
+    index, detectors = found
+    r = candidates[index][0]
+    shift_x, shift_y = (radius - r) * increments.x, (radius - r) * increments.y
+    if shift_x or shift_y:
+        detectors = frozenset(d.offset_spatially_by(shift_x, shift_y) for d in detectors)
+    return detectors
+
+
+def _compute_detectors_in_batch(
+    situations: Sequence[tuple[Sequence[SubTemplateType], Sequence[Plaquettes], Shift2D]],
+    database: DetectorDatabase | None,
+    pool: DetectorComputationPool | None,
+) -> list[frozenset[Detector]]:
+    """Compute the detectors of the provided situations, in parallel if a ``pool`` is provided.
+
+    The computation time is recorded in ``database.statistics``.
+    """
+    with (
+        database.statistics.measure_computation()
+        if database is not None
+        else contextlib.nullcontext()
+    ):
+        if pool is not None and len(situations) > 1:
+            return pool.compute_situations(
+                [
+                    (numpy.stack(subtemplates, axis=2), plaquettes, increments)
+                    for subtemplates, plaquettes, increments in situations
+                ]
+            )
+        return [
+            _compute_detectors_at_end_of_situation(subtemplates, plaquettes, increments)
+            for subtemplates, plaquettes, increments in situations
+        ]
+
+
+def _compute_situations(
+    situations: Sequence[tuple[Sequence[SubTemplateType], Sequence[Plaquettes], Shift2D]],
+    database: DetectorDatabase | None,
+    pool: DetectorComputationPool | None = None,
+) -> list[frozenset[Detector]]:
+    """Compute the detectors of situations that are missing from ``database`` and add them to it.
+
+    If ``database.adaptive_radius`` is set, each situation is first computed on
+    its central plaquettes only (see :func:`_crop_situation`), starting from a
+    radius of 1. The radius is only increased for the situations for which
+    :func:`_is_radius_sufficient` does not hold, up to the radius of the
+    provided situation. Each situation is stored in ``database`` with the
+    radius it has been computed with, which is recorded by the shape of its
+    sub-templates. Situations computed with a radius for which
+    :func:`_is_radius_sufficient` holds are stored with
+    ``sufficient_radius=True``.
+
+    Args:
+        situations: ``(subtemplates, plaquettes, increments)`` tuples, each
+            describing one situation without leading empty timeslices.
+        database: database the computed situations are added to. Can be
+            ``None``, in which case the detectors are only computed.
+        pool: pool of worker processes used to compute the situations in
+            parallel. Default to ``None``, meaning that situations are computed
+            sequentially.
+
+    Returns:
+        the detectors of each entry of ``situations``, using a coordinate system
+        with its origin on the top-left qubit of the top-left plaquette of the
+        situation.
+
+    """
+    results: list[frozenset[Detector] | None] = [None] * len(situations)
+    radii = [subtemplates[-1].shape[0] // 2 for subtemplates, _, _ in situations]
+    pending = list(range(len(situations)))
+    if database is not None and database.adaptive_radius:
+        for r in range(1, max(radii, default=0)):
+            attempts = [
+                (i, *_crop_situation(situations[i][0], situations[i][1], r))
+                for i in pending
+                if r < radii[i]
+            ]
+            computed = _compute_detectors_in_batch(
+                [
+                    (subtemplates, plaquettes, situations[i][2])
+                    for i, subtemplates, plaquettes in attempts
+                ],
+                database,
+                pool,
+            )
+            for (i, subtemplates, plaquettes), cropped_detectors in zip(attempts, computed):
+                increments = situations[i][2]
+                if not _is_radius_sufficient(
+                    cropped_detectors, subtemplates, plaquettes, increments
+                ):
+                    continue
+                database.add_situation(
+                    subtemplates, plaquettes, cropped_detectors, sufficient_radius=True
+                )
+                shift_x, shift_y = (radii[i] - r) * increments.x, (radii[i] - r) * increments.y
+                results[i] = frozenset(
+                    d.offset_spatially_by(shift_x, shift_y) for d in cropped_detectors
+                )
+            pending = [i for i in pending if results[i] is None]
+    computed = _compute_detectors_in_batch([situations[i] for i in pending], database, pool)
+    for i, detectors in zip(pending, computed):
+        if database is not None:
+            database.add_situation(situations[i][0], situations[i][1], detectors)
+        results[i] = detectors
+    # Callers match the returned detectors with their situations by position.
+    assert all(detectors is not None for detectors in results)
+    return cast(list[frozenset[Detector]], results)
+
+
 def _get_database_access_exception(
     subtemplates: Sequence[SubTemplateType],
     plaquettes_by_timestep: Sequence[Plaquettes],
@@ -405,9 +765,16 @@ def compute_detectors_at_end_of_situation(
         TQECError: if `len(subtemplates) != len(plaquettes_at_timestep)`.
 
     """
+    # Leading empty timeslices do not change the detectors, so they are removed
+    # before looking the situation up in the database.
+    subtemplates, plaquettes_by_timestep = _strip_leading_empty_timeslices(
+        subtemplates, plaquettes_by_timestep
+    )
     # Try to recover the result from the database.
     if database is not None:
-        detectors = database.get_detectors(subtemplates, plaquettes_by_timestep)
+        detectors = _get_detectors_from_database(
+            database, subtemplates, plaquettes_by_timestep, increments
+        )
         # If not found and only detectors from the database should be used, this
         # is an error.
         if detectors is None and only_use_database:
@@ -415,10 +782,9 @@ def compute_detectors_at_end_of_situation(
         # Else, if not found but we are allowed to compute detectors, compute
         # and store in database.
         elif detectors is None:
-            detectors = _compute_detectors_at_end_of_situation(
-                subtemplates, plaquettes_by_timestep, increments
-            )
-            database.add_situation(subtemplates, plaquettes_by_timestep, detectors)
+            detectors = _compute_situations(
+                [(subtemplates, plaquettes_by_timestep, increments)], database
+            )[0]
     # If database is None
     else:
         if only_use_database:
@@ -618,45 +984,347 @@ def _extract_subtemplates_from_s3d(
     return [s3d[:, :, i] for i in range(s3d.shape[2])]
 
 
-def _compute_detector_for_subtemplate(
+# Plaquette collections sent to the current worker process by a
+# DetectorComputationPool, indexed by the identifier chosen by the pool.
+_WORKER_PLAQUETTES: dict[int, Sequence[Plaquettes]] = {}
+
+
+def _compute_detectors_in_worker(
     args: tuple[
-        tuple[int, ...],  # indices
+        int,  # plaquettes_id
+        Sequence[Plaquettes] | None,  # plaquettes
         npt.NDArray[numpy.int_],  # s3d
-        Sequence[Plaquettes],  # plaquettes
         Shift2D,  # increments
-        int,  # parallel_process_count
     ],
-) -> tuple[tuple[int, ...], frozenset[Detector]]:
-    """Wrap :func:`compute_detectors_at_end_of_situation` for parallel processing of detectors.
+) -> tuple[int, frozenset[Detector] | None]:
+    """Compute the detectors of one situation in a :class:`DetectorComputationPool` worker.
 
     Args:
         args: A tuple containing:
-            - indices: Tuple of indices identifying the subtemplate
-            - s3d: 3D numpy array representing the subtemplate
-            - plaquettes: Sequence of plaquettes for each time slice
-            - increments: Spatial increments between plaquette origins
-            - only_use_database: Whether to only use the database
+            - plaquettes_id: identifier of the plaquettes to use,
+            - plaquettes: plaquettes for each time slice, or ``None`` if they
+              have already been sent to the worker process,
+            - s3d: 3D numpy array representing the subtemplate,
+            - increments: spatial increments between plaquette origins.
 
     Returns:
-        A tuple containing the indices and the computed detectors
+        the worker process identifier and the computed detectors, or ``None``
+        instead of the detectors if the plaquettes were not provided and have
+        never been sent to the worker process.
 
     """
-    indices, s3d, plaquettes, increments, parallel_process_count = args
-    return (
-        indices,
-        compute_detectors_at_end_of_situation(
-            _extract_subtemplates_from_s3d(s3d),
-            plaquettes,
-            increments,
-            # Currently, we do not find an efficient way to share the database between
-            # multiple processes, so we just pass `None` here.
-            database=None,
-            only_use_database=False,
-            parallel_process_count=parallel_process_count,
-        ),
+    plaquettes_id, plaquettes, s3d, increments = args
+    if plaquettes is not None:
+        _WORKER_PLAQUETTES[plaquettes_id] = plaquettes
+    elif (plaquettes := _WORKER_PLAQUETTES.get(plaquettes_id)) is None:
+        return os.getpid(), None
+    return os.getpid(), _compute_detectors_at_end_of_situation(
+        _extract_subtemplates_from_s3d(s3d), plaquettes, increments
+    )
+
+
+class DetectorComputationPool:
+    def __init__(self, process_count: int = -1) -> None:
+        """Pool of worker processes computing detectors.
+
+        This class is meant to be created once and re-used for all the calls to
+        :func:`compute_detectors_for_fixed_radius` needed to compute the
+        detectors of a whole computation, avoiding to spawn new processes at
+        each call.
+
+        Worker processes keep in memory the plaquette collections they received,
+        so that a given collection of plaquettes is only sent once to each
+        worker. Once all the workers know about a collection, tasks only include
+        the 3-dimensional subtemplate and an integer identifying the plaquettes.
+
+        Worker processes are only started when needed and should be stopped by
+        calling :meth:`close`, or by using the instance as a context manager.
+
+        Args:
+            process_count: number of worker processes. -1 means using all the
+                available CPU cores. Default to -1.
+
+        Raises:
+            TQECError: if ``process_count`` is neither -1 nor strictly positive.
+
+        """
+        if process_count == -1:
+            process_count = cpu_count()
+        if process_count < 1:
+            raise TQECError(
+                f"Invalid process_count: {process_count}. Expected a positive integer or -1 "
+                "for using all available CPU cores."
+            )
+        self._process_count = process_count
+        self._pool: multiprocessing.pool.Pool | None = None
+        self._plaquettes_ids: dict[tuple[Plaquettes, ...], int] = {}
+        self._workers_knowing_plaquettes: dict[int, set[int]] = {}
+
+    @property
+    def process_count(self) -> int:
+        """Number of worker processes used by ``self``."""
+        return self._process_count
+
+    def compute(
+        self,
+        s3ds: Sequence[npt.NDArray[numpy.int_]],
+        plaquettes: Sequence[Plaquettes],
+        increments: Shift2D,
+    ) -> list[frozenset[Detector]]:
+        """Compute the detectors of several situations in parallel.
+
+        Args:
+            s3ds: 3-dimensional arrays of shape ``(n, n, t)`` representing the
+                situations to compute detectors for.
+            plaquettes: a sequence containing ``t`` collection(s) of plaquettes,
+                each representing one QEC round.
+            increments: spatial increments between each ``Plaquette`` origin.
+
+        Returns:
+            the detectors computed for each entry of ``s3ds``, using a coordinate
+            system with its origin on the top-left qubit of the top-left
+            plaquette of the situation.
+
+        """
+        return self.compute_situations([(s3d, plaquettes, increments) for s3d in s3ds])
+
+    def compute_situations(
+        self,
+        situations: Sequence[tuple[npt.NDArray[numpy.int_], Sequence[Plaquettes], Shift2D]],
+    ) -> list[frozenset[Detector]]:
+        """Compute the detectors of several situations, possibly using different plaquettes.
+
+        Args:
+            situations: a sequence of ``(s3d, plaquettes, increments)`` tuples,
+                each describing one situation with the same conventions as the
+                parameters of :meth:`compute`.
+
+        Returns:
+            the detectors computed for each entry of ``situations``, using a
+            coordinate system with its origin on the top-left qubit of the
+            top-left plaquette of the situation.
+
+        """
+        if self._pool is None:
+            self._pool = Pool(processes=self._process_count)
+        plaquettes_ids = [
+            self._plaquettes_ids.setdefault(tuple(plaquettes), len(self._plaquettes_ids))
+            for _, plaquettes, _ in situations
+        ]
+        # Plaquettes are only sent along with the tasks until every worker has
+        # them in its cache. The few tasks that might end up on a worker that
+        # never received the plaquettes are re-sent along with the plaquettes.
+        send_plaquettes = [
+            len(self._workers_knowing_plaquettes.get(pid, ())) < self._process_count
+            for pid in plaquettes_ids
+        ]
+        results: list[frozenset[Detector] | None] = [None] * len(situations)
+        pending = list(range(len(situations)))
+        while pending:
+            outputs = self._pool.map(
+                _compute_detectors_in_worker,
+                [
+                    (
+                        plaquettes_ids[i],
+                        situations[i][1] if send_plaquettes[i] else None,
+                        situations[i][0],
+                        situations[i][2],
+                    )
+                    for i in pending
+                ],
+            )
+            missed: list[int] = []
+            for i, (worker, detectors) in zip(pending, outputs):
+                if detectors is None:
+                    missed.append(i)
+                    send_plaquettes[i] = True
+                else:
+                    self._workers_knowing_plaquettes.setdefault(plaquettes_ids[i], set()).add(
+                        worker
+                    )
+                    results[i] = detectors
+            pending = missed
+        return [detectors for detectors in results if detectors is not None]
+
+    def close(self) -> None:
+        """Stop the worker processes."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+        self._workers_knowing_plaquettes.clear()
+
+    def __enter__(self) -> DetectorComputationPool:
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+
+def _get_increments_and_unique_3d_subtemplates(
+    templates: Sequence[Template],
+    k: int,
+    plaquettes: Sequence[Plaquettes],
+    fixed_subtemplate_radius: int,
+) -> tuple[Shift2D, Unique3DSubTemplates]:
+    """Check the provided parameters and extract the distinct situations they contain.
+
+    Args:
+        templates: a sequence containing `t` :class:`Template` instance(s), each
+            representing one QEC round.
+        k: scaling factor to consider in order to instantiate the provided
+            template.
+        plaquettes: a sequence containing `t` collection(s) of plaquettes each
+            representing one QEC round.
+        fixed_subtemplate_radius: Manhattan radius to consider when splitting the
+            provided `template` into sub-templates.
+
+    Raises:
+        TQECError: if the provided templates do not all have the same increments
+            or if ``templates`` and ``plaquettes`` do not have the same length.
+
+    Returns:
+        the increments shared by all the provided templates and the spatially
+        distinct 3-dimensional subtemplates of the provided templates.
+
+    """
+    all_increments = frozenset(t.get_increments() for t in templates)
+    if len(all_increments) != 1:
+        raise TQECError(
+            "Expected all the provided templates to have the same increments. "
+            f"Found the following different increments: {all_increments}."
+        )
+    increments = next(iter(all_increments))
+
+    if len(templates) != len(plaquettes):
+        raise TQECError("Expecting the same number of entries in templates and plaquettes.")
+
+    shape, origin = templates[-1].shape(k), templates[-1].instantiation_origin(k)
+    if all(t.shape(k) == shape and t.instantiation_origin(k) == origin for t in templates):
+        # All the templates are aligned: let each template compute its own
+        # sub-templates, which avoids instantiating them when they provide a
+        # specialised implementation.
+        unique_3d_subtemplates = stack_spatially_distinct_subtemplates(
+            [
+                t.get_spatially_distinct_subtemplates(
+                    k, fixed_subtemplate_radius, avoid_zero_plaquettes=False
+                )
+                for t in templates
+            ]
+        )
+    else:
+        template_instantiations = _compute_superimposed_template_instantiations(templates, k)
+        unique_3d_subtemplates = get_spatially_distinct_3d_subtemplates(
+            template_instantiations, manhattan_radius=fixed_subtemplate_radius
+        )
+    return increments, unique_3d_subtemplates
+
+
+def precompute_detectors_for_fixed_radius(
+    rounds: Iterable[tuple[Sequence[Template], Sequence[Plaquettes]]],
+    k: int,
+    database: DetectorDatabase,
+    fixed_subtemplate_radius: int = 2,
+    pool: DetectorComputationPool | None = None,
+) -> int:
+    """Compute in one batch the detectors of all the situations found in the provided rounds.
+
+    This function is the first phase of a two-phase detector computation. It
+    collects all the situations that :func:`compute_detectors_for_fixed_radius`
+    would encounter when called on each entry of ``rounds``, de-duplicates them
+    globally (the same situation appearing in several entries is only considered
+    once), and computes all the situations missing from ``database`` at once,
+    potentially in parallel using the provided ``pool``.
+
+    Once this function returns, calling :func:`compute_detectors_for_fixed_radius`
+    on any entry of ``rounds`` with the same ``database`` only retrieves detectors
+    from the database.
+
+    Args:
+        rounds: a collection of ``(templates, plaquettes)`` tuples, each one
+            being a valid input for :func:`compute_detectors_for_fixed_radius`.
+        k: scaling factor to consider in order to instantiate the provided
+            templates.
+        database: database of detectors that is used to avoid computing
+            detectors that are already known, and that is updated **in-place**
+            with the computed detectors.
+        fixed_subtemplate_radius: Manhattan radius to consider when splitting the
+            provided templates into sub-templates. See
+            :func:`compute_detectors_for_fixed_radius`. Default to 2.
+        pool: pool of worker processes used to compute the missing situations
+            in parallel. Default to ``None``, meaning that situations are computed
+            sequentially.
+
+    Returns:
+        the number of situations that have been computed and added to ``database``.
+
+    """
+    return precompute_detectors_for_scaling_factors(
+        {k: rounds}, database, fixed_subtemplate_radius, pool
     )
 
 
+def precompute_detectors_for_scaling_factors(
+    rounds_by_k: Mapping[int, Iterable[tuple[Sequence[Template], Sequence[Plaquettes]]]],
+    database: DetectorDatabase,
+    fixed_subtemplate_radius: int = 2,
+    pool: DetectorComputationPool | None = None,
+) -> int:
+    """Compute in one batch the detectors of the situations found for several scaling factors.
+
+    This function behaves like :func:`precompute_detectors_for_fixed_radius`,
+    except that the situations are collected for several values of ``k``. Most
+    of the situations encountered for a given ``k`` are also encountered for
+    the other values, only at different places, so they are de-duplicated across
+    all the provided values of ``k`` before being computed in a single batch.
+
+    Args:
+        rounds_by_k: a mapping from scaling factors to a collection of
+            ``(templates, plaquettes)`` tuples, each one being a valid input for
+            :func:`compute_detectors_for_fixed_radius` with that scaling factor.
+        database: database of detectors that is used to avoid computing
+            detectors that are already known, and that is updated **in-place**
+            with the computed detectors.
+        fixed_subtemplate_radius: Manhattan radius to consider when splitting the
+            provided templates into sub-templates. See
+            :func:`compute_detectors_for_fixed_radius`. Default to 2.
+        pool: pool of worker processes used to compute the missing situations
+            in parallel. Default to ``None``, meaning that situations are computed
+            sequentially.
+
+    Returns:
+        the number of situations that have been computed and added to ``database``.
+
+    """
+    missing: dict[
+        _DetectorDatabaseKey,
+        tuple[Sequence[SubTemplateType], Sequence[Plaquettes], Shift2D],
+    ] = {}
+    for k, rounds in rounds_by_k.items():
+        for templates, plaquettes in rounds:
+            increments, unique_3d_subtemplates = _get_increments_and_unique_3d_subtemplates(
+                templates, k, plaquettes, fixed_subtemplate_radius
+            )
+            for s3d in unique_3d_subtemplates.subtemplates.values():
+                subtemplates, situation_plaquettes = _strip_leading_empty_timeslices(
+                    _extract_subtemplates_from_s3d(s3d), plaquettes
+                )
+                key = _DetectorDatabaseKey(subtemplates, situation_plaquettes)
+                if (
+                    key in missing
+                    or _get_detectors_from_database(
+                        database, subtemplates, situation_plaquettes, increments
+                    )
+                    is not None
+                ):
+                    continue
+                missing[key] = (subtemplates, situation_plaquettes, increments)
+
+    situations = list(missing.values())
+    _compute_situations(situations, database, pool)
+    return len(situations)
+
+
 def compute_detectors_for_fixed_radius(
     templates: Sequence[Template],
     k: int,
@@ -665,6 +1333,7 @@ def compute_detectors_for_fixed_radius(
     database: DetectorDatabase | None = None,
     only_use_database: bool = False,
     parallel_process_count: int = 1,
+    pool: DetectorComputationPool | None = None,
 ) -> list[Detector]:
     """Compute and returns detectors from the provided computation description.
 
@@ -700,27 +1369,23 @@ def compute_detectors_for_fixed_radius(
         parallel_process_count: number of processes to use for parallel processing.
             1 for sequential processing, >1 for parallel processing using
             ``parallel_process_count`` processes, and -1 for using all available
-            CPU cores. Default to 1.
+            CPU cores. When parallel processing is enabled, the provided
+            ``database`` is looked up in the calling process and only the
+            situations that are missing from it are computed in parallel.
+            Ignored if ``pool`` is provided. Default to 1.
+        pool: pool of worker processes used to compute the situations missing
+            from ``database`` in parallel. Providing a pool avoids spawning new
+            processes at each call. Default to ``None``, in which case the pool
+            is created (and closed before returning) if ``parallel_process_count``
+            is not 1.
 
     Returns:
         a collection of detectors that should be added at the end of the circuit
         that would be obtained from the provided `templates` and `plaquettes`.
 
     """
-    all_increments = frozenset(t.get_increments() for t in templates)
-    if len(all_increments) != 1:
-        raise TQECError(
-            "Expected all the provided templates to have the same increments. "
-            f"Found the following different increments: {all_increments}."
-        )
-    increments = next(iter(all_increments))
-
-    if len(templates) != len(plaquettes):
-        raise TQECError("Expecting the same number of entries in templates and plaquettes.")
-
-    template_instantiations = _compute_superimposed_template_instantiations(templates, k)
-    unique_3d_subtemplates = get_spatially_distinct_3d_subtemplates(
-        template_instantiations, manhattan_radius=fixed_subtemplate_radius
+    increments, unique_3d_subtemplates = _get_increments_and_unique_3d_subtemplates(
+        templates, k, plaquettes, fixed_subtemplate_radius
     )
 
     # Each detector in detectors_by_subtemplate is using a coordinate system
@@ -730,27 +1395,58 @@ def compute_detectors_for_fixed_radius(
     # Handle the special case of parallel_process_count == -1
     if parallel_process_count == -1:
         parallel_process_count = cpu_count()
-    # If parallel_process_count > 1 we will enable parallel processing to
-    # compute detectors in parallel.
-    if parallel_process_count > 1:
-        args_list = [
-            (indices, s3d, plaquettes, increments, parallel_process_count)
-            for indices, s3d in unique_3d_subtemplates.subtemplates.items()
+    # If a pool is provided or parallel_process_count > 1 we will enable parallel
+    # processing to compute detectors in parallel.
+    if pool is not None or parallel_process_count > 1:
+        # Look the situations up in the database from the parent process first,
+        # so that only the situations missing from the database are sent to the
+        # worker processes.
+        detectors_by_situation: dict[tuple[int, ...], frozenset[Detector]] = {}
+        missing: list[tuple[int, ...]] = []
+        for indices, s3d in unique_3d_subtemplates.subtemplates.items():
+            subtemplates, situation_plaquettes = _strip_leading_empty_timeslices(
+                _extract_subtemplates_from_s3d(s3d), plaquettes
+            )
+            detectors_set = (
+                _get_detectors_from_database(
+                    database, subtemplates, situation_plaquettes, increments
+                )
+                if database is not None
+                else None
+            )
+            if detectors_set is not None:
+                detectors_by_situation[indices] = detectors_set
+            elif only_use_database:
+                raise _get_database_access_exception(subtemplates, situation_plaquettes)
+            else:
+                missing.append(indices)
+
+        # Using worker processes is only worth it if there are several
+        # situations to compute.
+        missing_situations = [
+            (
+                *_strip_leading_empty_timeslices(
+                    _extract_subtemplates_from_s3d(unique_3d_subtemplates.subtemplates[indices]),
+                    plaquettes,
+                ),
+                increments,
+            )
+            for indices in missing
         ]
+        computed: list[frozenset[Detector]]
+        if pool is None and len(missing) > 1:
+            with DetectorComputationPool(min(parallel_process_count, len(missing))) as tmp_pool:
+                computed = _compute_situations(missing_situations, database, tmp_pool)
+        else:
+            computed = _compute_situations(missing_situations, database, pool)
+        detectors_by_situation.update(zip(missing, computed))
 
-        with Pool(processes=parallel_process_count) as pool:
-            results = pool.map(_compute_detector_for_subtemplate, args_list)
-
-        # After synchronizing all child processes, we get all computed detectors,
-        # first we add them to database if it is provides, then we shift the coordinates of them
-        for indices, detectors_set in results:
-            subtemplates = _extract_subtemplates_from_s3d(
-                unique_3d_subtemplates.subtemplates[indices]
-            )
-            if database is not None:
-                database.add_situation(subtemplates, plaquettes, detectors_set)
+        # Finally, shift the coordinates of all the detectors.
+        for indices, detectors_set in detectors_by_situation.items():
             detectors_by_subtemplate[indices] = _shift_detectors_to_center_of_subtemplate(
-                detectors_set, subtemplates, increments
+                detectors_set,
+                _extract_subtemplates_from_s3d(unique_3d_subtemplates.subtemplates[indices]),
+                increments,
             )
 
     # If parallel_process_count == 1, computing detectors sequentially
@@ -1,16 +1,33 @@
 from __future__ import annotations
 
+import base64
 import hashlib
 import json
+import os
 import pickle
+import sqlite3
+import sys
+import time
+import uuid
 import warnings
-from collections.abc import Callable, Mapping, Sequence
+from collections import OrderedDict
+from collections.abc import (
+    Callable,
+    Collection,
+    Iterable,
+    Iterator,
+    Mapping,
+    MutableMapping,
+    Sequence,
+)
+from contextlib import contextmanager
 from dataclasses import dataclass
 from functools import cached_property
 from pathlib import Path
-from typing import Any, ClassVar, Final
+from typing import Any, ClassVar, Final, cast
 
 import numpy
+import numpy.typing as npt
 import semver
 
 from tqec.circuit.measurement_map import MeasurementRecordsMap
@@ -20,14 +37,77 @@ from tqec.circuit.schedule import (
     ScheduledCircuit,
     relabel_circuits_qubit_indices,
 )
-from tqec.compile.detectors.detector import Detector
+from tqec.compile.detectors.detector import Detector, detectors_from_bytes, detectors_to_bytes
 from tqec.compile.generation import generate_circuit_from_instantiation
 from tqec.plaquette.plaquette import Plaquette, Plaquettes
 from tqec.templates.subtemplates import SubTemplateType
 from tqec.utils.exceptions import TQECError
 from tqec.utils.position import Shift2D
 
-CURRENT_DATABASE_VERSION: Final[semver.Version] = semver.Version(1, 0, 0)
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
+CURRENT_DATABASE_VERSION: Final[semver.Version] = semver.Version(2, 0, 0)
+
+_MIGRATABLE_DATABASE_VERSIONS: Final[frozenset[semver.Version]] = frozenset(
+    [
+        # Situations indexed by a hash of their plaquette names computed with
+        # MD5, and detectors stored as JSON. SQLite files also stored the names
+        # of the plaquettes of each situation as JSON.
+        semver.Version(1, 0, 0),
+        # Detectors stored as JSON and, in SQLite files, plaquette names stored
+        # as JSON.
+        semver.Version(1, 1, 0),
+        # Detectors stored in binary, should have been a major version change.
+        # SQLite files still stored plaquette names as JSON.
+        semver.Version(1, 2, 0),
+    ]
+)
+"""Previous database versions that only differ from :data:`CURRENT_DATABASE_VERSION` by
+their representation and can be upgraded when read (see :meth:`DetectorDatabase._migrate`)."""
+
+
+class _PlaquetteNameTable:
+    def __init__(self) -> None:
+        """Intern plaquette names into dense integer identifiers.
+
+        Identifiers are only valid in the current process: they depend on the
+        order in which names are interned. Each name is also associated with a
+        64-bit digest that does not depend on that order and that can be used
+        to compute hashes that are stable across runs and OSes.
+
+        """
+        self._ids: dict[str, int] = {}
+        self._names: list[str] = []
+        self._digests: npt.NDArray[numpy.uint64] = numpy.empty((64,), dtype="<u8")
+
+    def intern(self, name: str) -> int:
+        """Return the identifier of ``name``, registering it if needed."""
+        identifier = self._ids.get(name)
+        if identifier is None:
+            identifier = len(self._ids)
+            if identifier == self._digests.shape[0]:
+                self._digests = numpy.resize(self._digests, (2 * identifier,))
+            self._digests[identifier] = int.from_bytes(
+                hashlib.blake2b(name.encode(), digest_size=8).digest(), "little"
+            )
+            self._ids[name] = identifier
+            self._names.append(name)
+        return identifier
+
+    def name(self, identifier: int) -> str:
+        """Return the name interned as ``identifier``."""
+        return self._names[identifier]
+
+    @property
+    def digests(self) -> npt.NDArray[numpy.uint64]:
+        """Stable digest of each interned name, indexed by identifier."""
+        return self._digests
+
+
+_PLAQUETTE_NAMES: Final[_PlaquetteNameTable] = _PlaquetteNameTable()
 
 
 @dataclass(frozen=True)
@@ -46,27 +126,36 @@ class _DetectorDatabaseKey:
             :class:`Plaquettes` entry storing enough :class:`Plaquette`
             instances to generate a circuit from corresponding entry in
             `self.subtemplates` and corresponding to one QEC round.
+        sufficient_radius: ``True`` if the detectors associated with the key
+            have been checked to not depend on plaquettes outside of the
+            situation (see
+            :func:`~tqec.compile.detectors.compute._is_radius_sufficient`).
+            Only such situations can be looked up on behalf of a situation with
+            a larger radius. Keys that only differ by this attribute represent
+            different entries of the database.
 
     ## Implementation details
 
     This class uses a surjective representation to compare (`__eq__`) and hash
     (`__hash__`) its instances. This representation is computed and cached using
-    the :meth:`_DetectorDatabaseKey.plaquette_names` property that basically
-    uses the provided subtemplates to build a nested tuple data-structure with
-    the same shape as `self.subtemplates` (3 dimensions, the first one being the
-    number of time steps, the next 2 ones being of odd and equal size and
-    depending on the radius used to build subtemplates) storing in each of its
-    entries the corresponding plaquette name.
-
-    This intermediate data-structure is not the most memory efficient one, but
-    it has the advantage of being easy to construct, trivially invariant to
-    plaquette re-indexing and easy to hash (with some care to NOT use Python's
-    default `hash` due to its absence of stability across different runs).
+    the :meth:`_DetectorDatabaseKey.plaquette_ids` property that uses the
+    provided subtemplates to build a contiguous ``int32`` array with the same
+    shape as `self.subtemplates` (3 dimensions, the first one being the number
+    of time steps, the next 2 ones being of odd and equal size and depending on
+    the radius used to build subtemplates) storing in each of its entries an
+    integer interned from the corresponding plaquette name.
+
+    This data-structure is trivially invariant to plaquette re-indexing and
+    cheap to compare. Because interned integers depend on the process, hashing
+    uses a stable digest of each plaquette name instead (with some care to NOT
+    use Python's default `hash` due to its absence of stability across
+    different runs).
 
     """
 
     subtemplates: Sequence[SubTemplateType]
     plaquettes_by_timestep: Sequence[Plaquettes]
+    sufficient_radius: bool = False
 
     def __post_init__(self) -> None:
         if len(self.subtemplates) != len(self.plaquettes_by_timestep):
@@ -106,6 +195,28 @@ class _DetectorDatabaseKey:
             for st, plaquettes in zip(self.subtemplates, self.plaquettes_by_timestep)
         )
 
+    @cached_property
+    def plaquette_ids(self) -> npt.NDArray[numpy.int32]:
+        """Cached property returning a representation of the current situation with interned names.
+
+        Returns:
+            a contiguous ``int32`` array such that ``ret[t, y, x]`` is the
+            identifier interned for
+            ``self.plaquettes_by_timestep[t][self.subtemplates[t][y, x]].name``.
+            Identifiers are only meaningful within the current process.
+
+        """
+        if not self.subtemplates:
+            return numpy.empty((0, 0, 0), dtype=numpy.int32)
+        ids = numpy.empty((len(self.subtemplates), *self.subtemplates[0].shape), dtype=numpy.int32)
+        for t, (st, plaquettes) in enumerate(zip(self.subtemplates, self.plaquettes_by_timestep)):
+            indices = numpy.unique(st)
+            lookup = numpy.zeros((int(indices[-1]) + 1,), dtype=numpy.int32)
+            for pi in indices.tolist():
+                lookup[pi] = _PLAQUETTE_NAMES.intern(plaquettes[pi].name)
+            ids[t] = lookup[st]
+        return ids
+
     @cached_property
     def reliable_hash(self) -> int:
         """Return a hash of ``self`` that is guaranteed to be constant.
@@ -129,20 +240,41 @@ class _DetectorDatabaseKey:
         hence re-computing detectors at each call and growing the database indefinitely.
 
         This method implements a reliable hash that should be constant no matter the context
-        (different Python calls, different OS, different version of Python, ...).
+        (different Python calls, different OS, different version of Python, ...). It hashes, in one
+        pass, the shape of :attr:`plaquette_ids` followed by the stable 64-bit digest of the name
+        of each plaquette in the situation and, if set, by :attr:`sufficient_radius`.
         """
-        hasher = hashlib.md5()
-        for timeslice in self.plaquette_names:
-            for row in timeslice:
-                for name in row:
-                    hasher.update(name.encode())
-        return int(hasher.hexdigest(), 16)
+        ids = self.plaquette_ids
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(numpy.asarray(ids.shape, dtype="<u4").tobytes())
+        hasher.update(_PLAQUETTE_NAMES.digests[ids].tobytes())
+        if self.sufficient_radius:
+            hasher.update(b"sufficient_radius")
+        return int.from_bytes(hasher.digest(), "big")
 
     def __hash__(self) -> int:
         return self.reliable_hash
 
     def __eq__(self, rhs: object) -> bool:
-        return isinstance(rhs, _DetectorDatabaseKey) and self.plaquette_names == rhs.plaquette_names
+        return (
+            isinstance(rhs, _DetectorDatabaseKey)
+            and self.sufficient_radius == rhs.sufficient_radius
+            and numpy.array_equal(self.plaquette_ids, rhs.plaquette_ids)
+        )
+
+    def __getstate__(self) -> dict[str, Any]:
+        # Cached properties are not pickled: interned identifiers are only valid
+        # in the current process and hashes may change with the database version.
+        return {
+            "subtemplates": self.subtemplates,
+            "plaquettes_by_timestep": self.plaquettes_by_timestep,
+            "sufficient_radius": self.sufficient_radius,
+        }
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        object.__setattr__(self, "subtemplates", state["subtemplates"])
+        object.__setattr__(self, "plaquettes_by_timestep", state["plaquettes_by_timestep"])
+        object.__setattr__(self, "sufficient_radius", state.get("sufficient_radius", False))
 
     def circuit(self, plaquette_increments: Shift2D) -> ScheduledCircuit:
         """Get the `stim.Circuit` instance represented by `self`.
@@ -178,15 +310,19 @@ class _DetectorDatabaseKey:
 
         Returns:
             a dictionary with the keys ``subtemplates`` and
-            ``plaquettes_by_timestep`` and their corresponding values.
+            ``plaquettes_by_timestep`` and their corresponding values, and the
+            key ``sufficient_radius`` if :attr:`sufficient_radius` is set.
 
         """
-        return {
+        data: dict[str, Any] = {
             "subtemplates": [st.tolist() for st in self.subtemplates],
             "plaquettes_by_timestep": [
                 p.to_dict(plaquettes_to_indices) for p in self.plaquettes_by_timestep
             ],
         }
+        if self.sufficient_radius:
+            data["sufficient_radius"] = True
+        return data
 
     @staticmethod
     def from_dict(
@@ -197,7 +333,7 @@ class _DetectorDatabaseKey:
 
         Args:
             data: dictionary with the keys ``subtemplates`` and
-                ``plaquettes_by_timestep``.
+                ``plaquettes_by_timestep`` and, optionally, ``sufficient_radius``.
             plaquettes: list of :class:`Plaquette` instances to use to build the
                 :class:`Plaquettes` instances. Each plaquette is represented by
                 its index in the list of unique plaquettes to save space.
@@ -211,7 +347,745 @@ class _DetectorDatabaseKey:
         plaquettes_by_timestep = [
             Plaquettes.from_dict(p, plaquettes) for p in data["plaquettes_by_timestep"]
         ]
-        return _DetectorDatabaseKey(subtemplates, plaquettes_by_timestep)
+        return _DetectorDatabaseKey(
+            subtemplates, plaquettes_by_timestep, data.get("sufficient_radius", False)
+        )
+
+
+class _LazyDetectorMapping(MutableMapping[_DetectorDatabaseKey, frozenset[Detector]]):
+    def __init__(
+        self, entries: Mapping[_DetectorDatabaseKey, bytes | frozenset[Detector]] | None = None
+    ) -> None:
+        """Store a mapping from situations to detectors in memory, rebuilding detectors lazily.
+
+        Detectors can be stored in the binary representation returned by
+        :func:`~tqec.compile.detectors.detector.detectors_to_bytes`, in which case
+        they are only rebuilt the first time they are looked up. That way,
+        loading a database does not rebuild the detectors that are never used,
+        and saving a database does not re-encode the detectors that have never
+        been rebuilt. Entries are always pickled in their binary representation.
+
+        Args:
+            entries: initial entries, either detectors or their binary
+                representation. Default to no entries.
+
+        """
+        self._entries: dict[_DetectorDatabaseKey, bytes | frozenset[Detector]] = (
+            dict(entries) if entries is not None else {}
+        )
+
+    def set_entry(self, key: _DetectorDatabaseKey, entry: bytes | frozenset[Detector]) -> None:
+        """Associate ``key`` with the provided detectors or their binary representation."""
+        self._entries[key] = entry
+
+    def update_entries(self, mapping: Mapping[_DetectorDatabaseKey, frozenset[Detector]]) -> None:
+        """Update ``self`` with the entries of ``mapping``, without rebuilding detectors."""
+        if isinstance(mapping, _LazyDetectorMapping):
+            self._entries.update(mapping._entries)
+        else:
+            self._entries.update(mapping.items())
+
+    def encoded_items(self) -> Iterator[tuple[_DetectorDatabaseKey, bytes]]:
+        """Yield each key of ``self`` with the binary representation of its detectors."""
+        for key, entry in self._entries.items():
+            yield key, entry if isinstance(entry, bytes) else detectors_to_bytes(entry)
+
+    def __getstate__(self) -> dict[str, Any]:
+        return {"entries": dict(self.encoded_items())}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self._entries = state["entries"]
+
+    def __getitem__(self, key: _DetectorDatabaseKey) -> frozenset[Detector]:
+        entry = self._entries[key]
+        if isinstance(entry, bytes):
+            entry = detectors_from_bytes(entry)
+            self._entries[key] = entry
+        return entry
+
+    def __setitem__(self, key: _DetectorDatabaseKey, detectors: frozenset[Detector]) -> None:
+        self._entries[key] = detectors
+
+    def __delitem__(self, key: _DetectorDatabaseKey) -> None:
+        del self._entries[key]
+
+    def discard(self, key: _DetectorDatabaseKey) -> None:
+        """Remove ``key`` from ``self`` if it is present, without rebuilding its detectors."""
+        self._entries.pop(key, None)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._entries
+
+    def __iter__(self) -> Iterator[_DetectorDatabaseKey]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        """Remove all the situations stored in ``self``."""
+        self._entries.clear()
+
+
+def _encoded_items(
+    mapping: Mapping[_DetectorDatabaseKey, frozenset[Detector]],
+) -> Iterator[tuple[_DetectorDatabaseKey, bytes]]:
+    """Yield each key of ``mapping`` with the binary representation of its detectors."""
+    if isinstance(mapping, _LazyDetectorMapping):
+        yield from mapping.encoded_items()
+    else:
+        for key, detectors in mapping.items():
+            yield key, detectors_to_bytes(detectors)
+
+
+def _decode_detectors(data: bytes | str | list[dict[str, Any]]) -> frozenset[Detector]:
+    """Rebuild detectors stored in their binary or, for older databases, JSON representation."""
+    if isinstance(data, bytes):
+        return detectors_from_bytes(data)
+    if isinstance(data, str):
+        data = json.loads(data)
+    return frozenset(Detector.from_dict(d) for d in data)
+
+
+class _SQLiteDetectorMapping(MutableMapping[_DetectorDatabaseKey, frozenset[Detector]]):
+    def __init__(self, filepath: Path) -> None:
+        """Store a mapping from situations to detectors in a SQLite file.
+
+        This class implements the ``MutableMapping`` interface expected for
+        :attr:`DetectorDatabase.mapping` but, instead of keeping every entry in
+        memory, each situation is stored as a row of a SQLite table indexed by
+        :attr:`_DetectorDatabaseKey.reliable_hash`. That means that:
+
+        - opening a database does not read any situation from disk,
+        - each lookup only reads the row it needs,
+        - saving the database only writes the rows that have been modified
+          (see :meth:`commit`).
+
+        Modifications are kept in memory until :meth:`commit` writes them in a
+        single transaction. That way, the SQLite file is only locked for writing
+        while saving, and several processes can share the same file.
+
+        Plaquettes are stored once in a dedicated table and are only loaded when
+        the full keys have to be rebuilt, i.e. when iterating over the mapping.
+        Each situation also stores the indices in that table of its plaquettes
+        (see :meth:`_encode_plaquette_ids`), that are compared on lookup to
+        rule out hash collisions. Detectors are stored in the binary representation returned by
+        :func:`~tqec.compile.detectors.detector.detectors_to_bytes`.
+
+        Args:
+            filepath: path of the SQLite file. Created if it does not exist.
+
+        """
+        self._filepath = filepath
+        self._connection = sqlite3.connect(filepath)
+        try:
+            self._create_tables()
+        except sqlite3.Error:
+            self._connection.close()
+            raise
+        self._plaquette_indices: dict[str, int] | None = None
+        # Databases written by a version before 2.0.0 stored the plaquette names
+        # of each situation instead of plaquette indices (see migrate).
+        self._has_names_column = any(
+            column == "names"
+            for _, column, *_ in self._connection.execute("PRAGMA table_info(situations)")
+        )
+        # Modifications that have not been committed yet. A value of None
+        # represents a removed situation.
+        self._pending: dict[_DetectorDatabaseKey, bytes | frozenset[Detector] | None] = {}
+        self._cleared = False
+
+    _CREATE_SITUATIONS_TABLE: ClassVar[str] = """
+        CREATE TABLE IF NOT EXISTS situations (
+            hash TEXT PRIMARY KEY,
+            plaquette_ids BLOB NOT NULL,
+            key TEXT NOT NULL,
+            detectors BLOB NOT NULL
+        )
+    """
+
+    def _create_tables(self) -> None:
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS plaquettes (
+                id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL, data TEXT NOT NULL
+            );
+            """
+            + self._CREATE_SITUATIONS_TABLE
+        )
+
+    @property
+    def filepath(self) -> Path:
+        """Path of the SQLite file backing ``self``."""
+        return self._filepath
+
+    @staticmethod
+    def _hash(key: _DetectorDatabaseKey) -> str:
+        # reliable_hash is a 128-bit integer that does not fit in a SQLite INTEGER.
+        return f"{key.reliable_hash:032x}"
+
+    def _encode_plaquette_ids(self, key: _DetectorDatabaseKey) -> bytes | None:
+        """Return the plaquettes of ``key`` as indices in the plaquettes table.
+
+        Returns:
+            the shape of :attr:`_DetectorDatabaseKey.plaquette_ids`,
+            :attr:`_DetectorDatabaseKey.sufficient_radius` and the index in the
+            plaquettes table of each entry of
+            :attr:`_DetectorDatabaseKey.plaquette_ids`, as little-endian 32-bit
+            integers, or ``None`` if one of the plaquettes is not in the table.
+
+        """
+        ids = key.plaquette_ids
+        unique_ids, inverse = numpy.unique(ids, return_inverse=True)
+        plaquette_indices = self._get_plaquette_indices()
+        indices: list[int] = []
+        for identifier in unique_ids.tolist():
+            index = plaquette_indices.get(_PLAQUETTE_NAMES.name(identifier))
+            if index is None:
+                return None
+            indices.append(index)
+        header = numpy.asarray((*ids.shape, key.sufficient_radius), dtype="<u4")
+        return header.tobytes() + numpy.asarray(indices, dtype="<u4")[inverse].tobytes()
+
+    def _get_plaquette_indices(self) -> dict[str, int]:
+        if self._plaquette_indices is None:
+            self._plaquette_indices = dict(
+                self._connection.execute("SELECT name, id FROM plaquettes").fetchall()
+            )
+        return self._plaquette_indices
+
+    def _register_plaquettes(self, key: _DetectorDatabaseKey) -> dict[Plaquette, int]:
+        indices = self._get_plaquette_indices()
+        plaquettes_to_indices: dict[Plaquette, int] = {}
+        for plaquette in _get_key_plaquettes(key):
+            if plaquette.name not in indices:
+                indices[plaquette.name] = len(indices)
+                self._connection.execute(
+                    "INSERT INTO plaquettes (id, name, data) VALUES (?, ?, ?)",
+                    (indices[plaquette.name], plaquette.name, json.dumps(plaquette.to_dict())),
+                )
+            plaquettes_to_indices[plaquette] = indices[plaquette.name]
+        return plaquettes_to_indices
+
+    def _get_plaquettes(self) -> list[Plaquette]:
+        return [
+            Plaquette.from_dict(json.loads(data))
+            for (data,) in self._connection.execute("SELECT data FROM plaquettes ORDER BY id")
+        ]
+
+    def get_metadata(self, name: str) -> str | None:
+        """Return the metadata stored under ``name`` or ``None`` if there is none."""
+        row = self._connection.execute(
+            "SELECT value FROM metadata WHERE name = ?", (name,)
+        ).fetchone()
+        return None if row is None else str(row[0])
+
+    def set_metadata(self, name: str, value: str) -> None:
+        """Store ``value`` as the metadata ``name``."""
+        self._connection.execute(
+            "INSERT OR REPLACE INTO metadata (name, value) VALUES (?, ?)", (name, value)
+        )
+
+    def commit(self) -> None:
+        """Write all the pending modifications to disk."""
+        # Plaquettes might have been added to the file by another process.
+        self._plaquette_indices = None
+        if self._cleared:
+            self._connection.execute("DELETE FROM situations")
+        if self._has_names_column and (self._cleared or self._pending):
+            self._rebuild_situations(rehash=False)
+        for key, detectors in self._pending.items():
+            if detectors is None:
+                self._connection.execute(
+                    "DELETE FROM situations WHERE hash = ? AND plaquette_ids = ?",
+                    (self._hash(key), self._encode_plaquette_ids(key)),
+                )
+                continue
+            plaquettes_to_indices = self._register_plaquettes(key)
+            self._connection.execute(
+                "INSERT OR REPLACE INTO situations (hash, plaquette_ids, key, detectors) "
+                "VALUES (?, ?, ?, ?)",
+                (
+                    self._hash(key),
+                    self._encode_plaquette_ids(key),
+                    json.dumps(key.to_dict(plaquettes_to_indices)),
+                    detectors if isinstance(detectors, bytes) else detectors_to_bytes(detectors),
+                ),
+            )
+        self._connection.commit()
+        self._pending.clear()
+        self._cleared = False
+
+    def close(self) -> None:
+        """Close the connection to the SQLite file, discarding uncommitted modifications."""
+        self._pending.clear()
+        self._cleared = False
+        self._connection.close()
+
+    def _get_from_file(self, key: _DetectorDatabaseKey) -> bytes | str | None:
+        if self._cleared or self._has_names_column:
+            return None
+        row = self._connection.execute(
+            "SELECT plaquette_ids, detectors FROM situations WHERE hash = ?", (self._hash(key),)
+        ).fetchone()
+        if row is None:
+            return None
+        plaquette_ids = self._encode_plaquette_ids(key)
+        if plaquette_ids is None:
+            # Plaquettes might have been added to the file by another process.
+            self._plaquette_indices = None
+            plaquette_ids = self._encode_plaquette_ids(key)
+        if row[0] != plaquette_ids:
+            return None
+        return cast(bytes | str, row[1])
+
+    def _get_entry(self, key: _DetectorDatabaseKey) -> bytes | str | frozenset[Detector] | None:
+        return self._pending[key] if key in self._pending else self._get_from_file(key)
+
+    def __getitem__(self, key: _DetectorDatabaseKey) -> frozenset[Detector]:
+        entry = self._get_entry(key)
+        if entry is None:
+            raise KeyError(key)
+        return entry if isinstance(entry, frozenset) else _decode_detectors(entry)
+
+    def __setitem__(self, key: _DetectorDatabaseKey, detectors: frozenset[Detector]) -> None:
+        self._pending[key] = detectors
+
+    def set_entry(self, key: _DetectorDatabaseKey, entry: bytes | frozenset[Detector]) -> None:
+        """Associate ``key`` with the provided detectors or their binary representation."""
+        self._pending[key] = entry
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, _DetectorDatabaseKey) and self._get_entry(key) is not None
+
+    def __delitem__(self, key: _DetectorDatabaseKey) -> None:
+        if key not in self:
+            raise KeyError(key)
+        self._pending[key] = None
+
+    def clear(self) -> None:
+        """Remove all the situations stored in ``self``."""
+        self._pending.clear()
+        self._cleared = True
+
+    def migrate(self) -> None:
+        """Upgrade the situations stored in ``self`` by a previous database version.
+
+        The hash indexing each situation is re-computed, which is needed when
+        :attr:`_DetectorDatabaseKey.reliable_hash` changes between two database
+        versions, detectors stored as JSON are converted to their binary
+        representation and plaquette names are replaced by plaquette indices.
+        """
+        self._rebuild_situations(rehash=True)
+
+    def _rebuild_situations(self, rehash: bool) -> None:
+        """Re-write every situation stored in the file with the current table layout.
+
+        Args:
+            rehash: if ``True``, the hash indexing each situation is re-computed.
+                Else, the stored hash is kept.
+
+        """
+        plaquettes = self._get_plaquettes()
+        rows = self._connection.execute("SELECT hash, key, detectors FROM situations").fetchall()
+        # Start a transaction before modifying the table layout.
+        self._connection.execute("DELETE FROM situations")
+        if self._has_names_column:
+            self._connection.execute("DROP TABLE situations")
+            self._connection.execute(self._CREATE_SITUATIONS_TABLE)
+            self._has_names_column = False
+        entries: list[tuple[str, bytes | None, str, bytes]] = []
+        for hash_, key_data, detectors in rows:
+            key = _DetectorDatabaseKey.from_dict(json.loads(key_data), plaquettes)
+            entries.append(
+                (
+                    self._hash(key) if rehash else hash_,
+                    self._encode_plaquette_ids(key),
+                    key_data,
+                    detectors_to_bytes(_decode_detectors(detectors))
+                    if isinstance(detectors, str)
+                    else detectors,
+                )
+            )
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO situations (hash, plaquette_ids, key, detectors) "
+            "VALUES (?, ?, ?, ?)",
+            entries,
+        )
+
+    def _keys_and_detectors(self) -> Iterator[tuple[_DetectorDatabaseKey, frozenset[Detector]]]:
+        if not self._cleared:
+            plaquettes = self._get_plaquettes()
+            for key_data, detectors in self._connection.execute(
+                "SELECT key, detectors FROM situations"
+            ):
+                key = _DetectorDatabaseKey.from_dict(json.loads(key_data), plaquettes)
+                if key not in self._pending:
+                    yield key, _decode_detectors(detectors)
+        for key, pending_detectors in self._pending.items():
+            if isinstance(pending_detectors, bytes):
+                yield key, detectors_from_bytes(pending_detectors)
+            elif pending_detectors is not None:
+                yield key, pending_detectors
+
+    def __iter__(self) -> Iterator[_DetectorDatabaseKey]:
+        return (key for key, _ in self._keys_and_detectors())
+
+    def __len__(self) -> int:
+        length = 0
+        if not self._cleared:
+            length = int(self._connection.execute("SELECT COUNT(*) FROM situations").fetchone()[0])
+        for key, detectors in self._pending.items():
+            in_file = self._get_from_file(key) is not None
+            length += (detectors is not None) - in_file
+        return length
+
+
+class _JournalDetectorMapping(MutableMapping[_DetectorDatabaseKey, frozenset[Detector]]):
+    _MIN_RECORDS_BEFORE_COMPACTION: ClassVar[int] = 1024
+
+    def __init__(self, filepath: Path, truncate: bool = False) -> None:
+        """Store a mapping from situations to detectors in an append-only journal.
+
+        This class implements the ``MutableMapping`` interface expected for
+        :attr:`DetectorDatabase.mapping`. Entries are kept in memory and each
+        modification is recorded as one compact JSON line, detectors being
+        recorded in the base64-encoded binary representation returned by
+        :func:`~tqec.compile.detectors.detector.detectors_to_bytes` and only
+        rebuilt when looked up. Modifications are
+        buffered until :meth:`commit` appends them to the journal file and
+        flushes it to disk, such that:
+
+        - saving the database only writes the modifications since the last save,
+        - a crash while saving can only lose the records being written: a
+          truncated last line is ignored when the journal is read back,
+        - several processes can share the same journal: before appending its
+          own records, :meth:`commit` replays the records appended by the other
+          processes since the journal was last read.
+
+        When the journal holds many more records than live situations, it is
+        compacted by atomically replacing it with a snapshot of its content
+        (see :meth:`compact`).
+
+        Warning:
+            This class does not lock the journal file. Callers sharing the
+            journal between processes should hold the lock acquired with
+            :func:`_lock_database_file` while calling :meth:`commit` or
+            :meth:`compact`.
+
+        Args:
+            filepath: path of the journal file. Created if it does not exist.
+            truncate: if ``True``, ignore the current content of ``filepath``.
+
+        """
+        self._filepath = filepath
+        self._mapping = _LazyDetectorMapping()
+        self._metadata: dict[str, str] = {}
+        self._pending: list[tuple[str, Any, Any]] = []
+        self._reset_file_state()
+        if not truncate:
+            self._catch_up()
+
+    @property
+    def filepath(self) -> Path:
+        """Path of the journal file backing ``self``."""
+        return self._filepath
+
+    def _reset_file_state(self) -> None:
+        # Plaquettes are referenced by their index in the journal, so the
+        # plaquettes registered in memory should always mirror the journal.
+        self._plaquettes: list[Plaquette] = []
+        self._plaquette_indices: dict[str, int] = {}
+        self._journal_id: str | None = None
+        self._offset = 0
+        self._record_count = 0
+
+    def _read_journal_id(self) -> str | None:
+        with open(self._filepath, "rb") as f:
+            first_line = f.readline()
+        try:
+            record = json.loads(first_line)
+        except json.JSONDecodeError:
+            return None
+        return record.get("journal") if isinstance(record, dict) else None
+
+    def _catch_up(self) -> None:
+        """Replay the records appended to the journal since it was last read.
+
+        If the journal has been replaced (e.g., compacted by another process)
+        since it was last read, it is replayed from the start. In both cases,
+        the modifications pending in ``self`` are then re-applied, as they will
+        be appended after the replayed records.
+        """
+        if not self._filepath.exists():
+            if self._offset != 0:
+                self._mapping.clear()
+                self._metadata.clear()
+                self._reset_file_state()
+            return
+        if self._offset != 0 and self._read_journal_id() != self._journal_id:
+            self._mapping.clear()
+            self._metadata.clear()
+            self._reset_file_state()
+        with open(self._filepath, "rb") as f:
+            f.seek(self._offset)
+            lines = f.read().split(b"\n")
+        for i, line in enumerate(lines):
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Only the last line may be incomplete, if a crash happened
+                # while it was written.
+                if i != len(lines) - 1:
+                    raise
+                break
+            self._replay(record)
+            self._record_count += 1
+            self._offset += len(line) + 1
+        for operation in self._pending:
+            self._apply(operation)
+
+    def _replay(self, record: dict[str, Any]) -> None:
+        if "journal" in record:
+            self._journal_id = record["journal"]
+        elif "plaquette" in record:
+            plaquette = Plaquette.from_dict(record["plaquette"])
+            self._plaquette_indices[plaquette.name] = len(self._plaquettes)
+            self._plaquettes.append(plaquette)
+        elif "set" in record:
+            key = _DetectorDatabaseKey.from_dict(record["set"], self._plaquettes)
+            if "data" in record:
+                self._mapping.set_entry(key, base64.b64decode(record["data"]))
+            else:
+                self._mapping[key] = _decode_detectors(record["detectors"])
+        elif "del" in record:
+            self._mapping.discard(_DetectorDatabaseKey.from_dict(record["del"], self._plaquettes))
+        elif "clear" in record:
+            self._mapping.clear()
+        elif "metadata" in record:
+            self._metadata[record["metadata"]] = record["value"]
+        else:
+            raise TQECError(f"Unknown record in detector database journal: {record}.")
+
+    def _apply(self, operation: tuple[str, Any, Any]) -> None:
+        kind, lhs, rhs = operation
+        if kind == "set":
+            self._mapping.set_entry(lhs, rhs)
+        elif kind == "del":
+            self._mapping.discard(lhs)
+        elif kind == "clear":
+            self._mapping.clear()
+        else:
+            self._metadata[lhs] = rhs
+
+    def _serialize(
+        self,
+        operations: Iterable[tuple[str, Any, Any]],
+        plaquettes: list[Plaquette],
+        plaquette_indices: dict[str, int],
+    ) -> list[str]:
+        """Serialize ``operations`` into journal records.
+
+        The plaquettes used by the serialized situations are registered in
+        ``plaquettes`` and ``plaquette_indices`` that are modified in-place.
+        """
+        records: list[dict[str, Any]] = []
+
+        def register(key: _DetectorDatabaseKey) -> dict[Plaquette, int]:
+            plaquettes_to_indices: dict[Plaquette, int] = {}
+            for plaquette in _get_key_plaquettes(key):
+                if plaquette.name not in plaquette_indices:
+                    plaquette_indices[plaquette.name] = len(plaquettes)
+                    plaquettes.append(plaquette)
+                    records.append({"plaquette": plaquette.to_dict()})
+                plaquettes_to_indices[plaquette] = plaquette_indices[plaquette.name]
+            return plaquettes_to_indices
+
+        for kind, lhs, rhs in operations:
+            if kind == "set":
+                indices = register(lhs)
+                data = rhs if isinstance(rhs, bytes) else detectors_to_bytes(rhs)
+                records.append(
+                    {"set": lhs.to_dict(indices), "data": base64.b64encode(data).decode()}
+                )
+            elif kind == "del":
+                records.append({"del": lhs.to_dict(register(lhs))})
+            elif kind == "clear":
+                records.append({"clear": True})
+            else:
+                records.append({"metadata": lhs, "value": rhs})
+        return [json.dumps(record, separators=(",", ":")) for record in records]
+
+    def get_metadata(self, name: str) -> str | None:
+        """Return the metadata stored under ``name`` or ``None`` if there is none."""
+        return self._metadata.get(name)
+
+    def set_metadata(self, name: str, value: str) -> None:
+        """Store ``value`` as the metadata ``name``."""
+        if self._metadata.get(name) != value:
+            self._metadata[name] = value
+            self._pending.append(("metadata", name, value))
+
+    def commit(self) -> None:
+        """Append all the pending modifications to the journal and flush it to disk.
+
+        Records appended by other processes are replayed first. The journal is
+        compacted instead if it holds too many obsolete records.
+        """
+        self._catch_up()
+        if not self._pending:
+            return
+        if self._record_count + len(self._pending) > max(
+            _JournalDetectorMapping._MIN_RECORDS_BEFORE_COMPACTION,
+            2 * (len(self._mapping) + len(self._plaquettes) + len(self._metadata)),
+        ):
+            self._write_snapshot()
+            return
+        plaquettes, plaquette_indices = list(self._plaquettes), dict(self._plaquette_indices)
+        records = self._serialize(self._pending, plaquettes, plaquette_indices)
+        if self._offset == 0:
+            self._journal_id = uuid.uuid4().hex
+            records.insert(0, json.dumps({"journal": self._journal_id}))
+        with open(self._filepath, "ab") as f:
+            # Drop any incomplete record to be able to append new ones.
+            f.truncate(self._offset)
+            data = "".join(record + "\n" for record in records).encode()
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self._plaquettes, self._plaquette_indices = plaquettes, plaquette_indices
+        self._offset += len(data)
+        self._record_count += len(records)
+        self._pending.clear()
+
+    def compact(self) -> None:
+        """Atomically replace the journal by a snapshot of the entries of ``self``.
+
+        Records appended by other processes are replayed first.
+        """
+        self._catch_up()
+        self._write_snapshot()
+
+    def _write_snapshot(self) -> None:
+        # Only keep the plaquettes that are still used.
+        plaquettes: list[Plaquette] = []
+        plaquette_indices: dict[str, int] = {}
+        journal_id = uuid.uuid4().hex
+        records = [
+            json.dumps({"journal": journal_id}),
+            *self._serialize(
+                [
+                    *(("metadata", name, value) for name, value in self._metadata.items()),
+                    *(("set", key, data) for key, data in self._mapping.encoded_items()),
+                ],
+                plaquettes,
+                plaquette_indices,
+            ),
+        ]
+        data = "".join(record + "\n" for record in records).encode()
+        _atomic_write(self._filepath, data)
+        self._plaquettes, self._plaquette_indices = plaquettes, plaquette_indices
+        self._journal_id = journal_id
+        self._offset = len(data)
+        self._record_count = len(records)
+        self._pending.clear()
+
+    def close(self) -> None:
+        """Discard the uncommitted modifications.
+
+        Note that, unlike the SQLite storage, the discarded modifications are
+        still visible through ``self``.
+        """
+        self._pending.clear()
+
+    def __getitem__(self, key: _DetectorDatabaseKey) -> frozenset[Detector]:
+        return self._mapping[key]
+
+    def __setitem__(self, key: _DetectorDatabaseKey, detectors: frozenset[Detector]) -> None:
+        self.set_entry(key, detectors)
+
+    def set_entry(self, key: _DetectorDatabaseKey, entry: bytes | frozenset[Detector]) -> None:
+        """Associate ``key`` with the provided detectors or their binary representation."""
+        self._mapping.set_entry(key, entry)
+        self._pending.append(("set", key, entry))
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._mapping
+
+    def __delitem__(self, key: _DetectorDatabaseKey) -> None:
+        del self._mapping[key]
+        self._pending.append(("del", key, None))
+
+    def clear(self) -> None:
+        """Remove all the situations stored in ``self``."""
+        self._mapping.clear()
+        self._pending.append(("clear", None, None))
+
+    def __iter__(self) -> Iterator[_DetectorDatabaseKey]:
+        return iter(self._mapping)
+
+    def __len__(self) -> int:
+        return len(self._mapping)
+
+
+def _get_key_plaquettes(key: _DetectorDatabaseKey) -> Iterator[Plaquette]:
+    """Yield the plaquettes needed to rebuild ``key``, including default values."""
+    for plaquettes in key.plaquettes_by_timestep:
+        collection = plaquettes.collection
+        yield from collection.values()
+        if collection.default_value is not None:
+            yield collection.default_value
+
+
+def _atomic_write(filepath: Path, data: str | bytes) -> None:
+    """Write ``data`` to ``filepath`` such that a crash never leaves a partial file."""
+    tmp_filepath = filepath.with_name(f".{filepath.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_filepath, "wb" if isinstance(data, bytes) else "w") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_filepath, filepath)
+    finally:
+        tmp_filepath.unlink(missing_ok=True)
+
+
+@contextmanager
+def _lock_database_file(filepath: Path, shared: bool = False) -> Iterator[None]:
+    """Hold an advisory lock on the database stored at ``filepath``.
+
+    The lock is taken on a ``.lock`` file next to ``filepath``, such that it
+    survives ``filepath`` being atomically replaced.
+
+    Args:
+        filepath: path of the database to lock.
+        shared: if ``True``, other processes can hold a shared lock at the same
+            time. Only supported on POSIX systems, the lock is always exclusive
+            on Windows.
+
+    """
+    with open(filepath.with_name(f"{filepath.name}.lock"), "a+b") as f:
+        if sys.platform == "win32":
+            f.seek(0)
+            while True:
+                try:
+                    # Retries for 10 seconds before raising.
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
 
 
 class _DetectorDatabaseIO:
@@ -259,15 +1133,105 @@ class _DetectorDatabaseIO:
             )
         return database
 
+    @staticmethod
+    def from_sqlite_file(filepath: Path) -> DetectorDatabase:
+        try:
+            mapping = _SQLiteDetectorMapping(filepath)
+            version = mapping.get_metadata("version")
+            frozen = mapping.get_metadata("frozen")
+            adaptive_radius = mapping.get_metadata("adaptive_radius")
+        except Exception as e:
+            return _DetectorDatabaseIO._handle_load_error(filepath, e, "sqlite")
+        database = DetectorDatabase(
+            mapping,
+            frozen=frozen == "1",
+            adaptive_radius=adaptive_radius == "1",
+        )
+        if version is not None:
+            database.version = semver.Version.parse(version)
+        return database
+
+    @staticmethod
+    def from_journal_file(filepath: Path) -> DetectorDatabase:
+        try:
+            mapping = _JournalDetectorMapping(filepath)
+        except Exception as e:
+            return _DetectorDatabaseIO._handle_load_error(filepath, e, "journal")
+        database = DetectorDatabase(
+            mapping,
+            frozen=mapping.get_metadata("frozen") == "1",
+            adaptive_radius=mapping.get_metadata("adaptive_radius") == "1",
+        )
+        if (version := mapping.get_metadata("version")) is not None:
+            database.version = semver.Version.parse(version)
+        return database
+
+    @staticmethod
+    def _has_compatible_metadata(
+        mapping: _SQLiteDetectorMapping | _JournalDetectorMapping, database: DetectorDatabase
+    ) -> bool:
+        return mapping.get_metadata("version") in {None, str(database.version)}
+
+    @staticmethod
+    def _merge_into(
+        mapping: _SQLiteDetectorMapping | _JournalDetectorMapping, database: DetectorDatabase
+    ) -> None:
+        """Add the situations of ``database`` to the ``mapping`` read from disk."""
+        if not _DetectorDatabaseIO._has_compatible_metadata(mapping, database):
+            mapping.clear()
+        for key in database._removed_keys:
+            if key in mapping:
+                del mapping[key]
+        for key, data in _encoded_items(database.mapping):
+            mapping.set_entry(key, data)
+
     @staticmethod
     def to_pickle_file(filepath: Path, database: DetectorDatabase) -> None:
-        with open(filepath, "wb") as f:
-            pickle.dump(database, f)
+        database = database._merged_with_file(filepath)
+        _atomic_write(filepath, pickle.dumps(database._with_in_memory_mapping()))
 
     @staticmethod
     def to_json_file(filepath: Path, database: DetectorDatabase) -> None:
-        with open(filepath, "w") as f:
-            json.dump(database.to_dict(), f)
+        database = database._merged_with_file(filepath)
+        _atomic_write(filepath, json.dumps(database.to_dict()))
+
+    @staticmethod
+    def to_sqlite_file(filepath: Path, database: DetectorDatabase) -> None:
+        mapping = database.mapping
+        is_backing_file = (
+            isinstance(mapping, _SQLiteDetectorMapping)
+            and mapping.filepath.resolve() == filepath.resolve()
+        )
+        if not isinstance(mapping, _SQLiteDetectorMapping) or not is_backing_file:
+            # Writing to a different file: merge every situation into it.
+            mapping = _SQLiteDetectorMapping(filepath)
+            _DetectorDatabaseIO._merge_into(mapping, database)
+        mapping.set_metadata("version", str(database.version))
+        mapping.set_metadata("frozen", "1" if database.frozen else "0")
+        mapping.set_metadata("adaptive_radius", "1" if database.adaptive_radius else "0")
+        mapping.commit()
+        if not is_backing_file:
+            mapping.close()
+
+    @staticmethod
+    def to_journal_file(filepath: Path, database: DetectorDatabase) -> None:
+        mapping = database.mapping
+        if (
+            isinstance(mapping, _JournalDetectorMapping)
+            and mapping.filepath.resolve() == filepath.resolve()
+        ):
+            # Only append the modifications since the last save.
+            journal = mapping
+        else:
+            try:
+                journal = _JournalDetectorMapping(filepath)
+            except Exception:
+                journal = _JournalDetectorMapping(filepath, truncate=True)
+            _DetectorDatabaseIO._merge_into(journal, database)
+        journal.set_metadata("version", str(database.version))
+        journal.set_metadata("frozen", "1" if database.frozen else "0")
+        journal.set_metadata("adaptive_radius", "1" if database.adaptive_radius else "0")
+        journal.commit()
 
 
 def _get_database_format(filepath: Path) -> str:
@@ -276,28 +1240,79 @@ def _get_database_format(filepath: Path) -> str:
         return "pickle"
     if suffix in {".json"}:
         return "json"
+    if suffix in {".sqlite", ".sqlite3", ".db"}:
+        return "sqlite"
+    if suffix in {".journal"}:
+        return "journal"
     raise TQECError(
         f"Could not infer the database format from the provided filepath ('{filepath}'). "
         "Supported formats are:\n  -" + "\n  -".join(DetectorDatabase._WRITERS.keys())
     )
 
 
+@dataclass
+class DetectorDatabaseStatistics:
+    """Counters describing how a :class:`DetectorDatabase` has been used.
+
+    Attributes:
+        hits: number of situations looked up that were found in the database.
+        misses: number of situations looked up that were not in the database.
+        miss_computation_time: time, in seconds, spent computing the detectors
+            of situations that were not in the database.
+        stored_bytes: size, in bytes, of the binary representation (see
+            :func:`~tqec.compile.detectors.detector.detectors_to_bytes`) of the
+            detectors added to the database.
+
+    """
+
+    hits: int = 0
+    misses: int = 0
+    miss_computation_time: float = 0.0
+    stored_bytes: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of the looked up situations that were found in the database."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    @contextmanager
+    def measure_computation(self) -> Iterator[None]:
+        """Add the time spent in the ``with`` block to :attr:`miss_computation_time`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.miss_computation_time += time.perf_counter() - start
+
+
 class DetectorDatabase:
     version: semver.Version = semver.Version(0, 0, 0)
+    adaptive_radius: bool = False
+    cache_size: int | None = None
+    # Situations removed since the last save, that should not be merged back
+    # from the file the database is saved to.
+    _removed_keys: frozenset[_DetectorDatabaseKey] = frozenset()
 
     _READERS: ClassVar[Mapping[str, Callable[[Path], DetectorDatabase]]] = {
         "pickle": _DetectorDatabaseIO.from_pickle_file,
         "json": _DetectorDatabaseIO.from_json_file,
+        "sqlite": _DetectorDatabaseIO.from_sqlite_file,
+        "journal": _DetectorDatabaseIO.from_journal_file,
     }
     _WRITERS: ClassVar[Mapping[str, Callable[[Path, DetectorDatabase], None]]] = {
         "pickle": _DetectorDatabaseIO.to_pickle_file,
         "json": _DetectorDatabaseIO.to_json_file,
+        "sqlite": _DetectorDatabaseIO.to_sqlite_file,
+        "journal": _DetectorDatabaseIO.to_journal_file,
     }
 
     def __init__(
         self,
-        mapping: dict[_DetectorDatabaseKey, frozenset[Detector]] | None = None,
+        mapping: MutableMapping[_DetectorDatabaseKey, frozenset[Detector]] | None = None,
         frozen: bool = False,
+        cache_size: int | None = None,
+        adaptive_radius: bool = False,
     ):
         """Store a mapping from "situations" to the corresponding detectors.
 
@@ -316,22 +1331,81 @@ class DetectorDatabase:
         - MINOR when the content of the database is invalidated (e.g. by changing a plaquette
         implementation without changing its name).
 
+        Databases from the previous versions listed in ``_MIGRATABLE_DATABASE_VERSIONS``
+        are upgraded when read.
+
         Old databases generated prior to the introduction of a version attribute will be
         loaded with the default value of .version, without passing through __init__,
         ie (0,0,0).
 
+        Args:
+            mapping: initial mapping from situations to detectors. Any mutable
+                mapping can be used, which allows to store situations somewhere
+                else than in memory (e.g., databases read from a SQLite file
+                with :meth:`from_file` lazily load their entries from disk).
+                Default to an empty in-memory mapping that stores detectors
+                read from a file in their binary representation until they
+                are looked up.
+            frozen: if ``True``, ``self`` is read-only.
+            cache_size: if not ``None``, the ``cache_size`` most recently used
+                situations are kept in memory in front of ``mapping``. This is
+                useful when ``mapping`` does not keep its entries in memory, e.g.
+                for databases read from a SQLite file, as it avoids reading
+                situations that are often looked up from disk again while keeping
+                the memory footprint of ``self`` bounded. Default to ``None``.
+            adaptive_radius: if ``True``, the detectors of a situation are
+                first computed on the situation restricted to a radius of 1
+                around its central plaquette, and the radius is only grown if
+                some syndrome measurements of the central plaquette do not end
+                up in any detector or if a detector reaches the border of the
+                restricted situation. Situations are stored with the radius
+                they have been computed with, which is recorded by the shape of
+                their sub-templates, and looked up with increasing radii. Only
+                the situations stored with ``sufficient_radius=True`` (see
+                :meth:`add_situation`) are looked up on behalf of situations
+                with a larger radius. Default to ``False``.
+
+        Usage counters are available in :attr:`statistics`. They are not
+        persisted when ``self`` is saved.
+
         """
         if mapping is None:
-            mapping = dict()
+            mapping = _LazyDetectorMapping()
         self.mapping = mapping
         self.frozen = frozen
+        self.adaptive_radius = adaptive_radius
+        self.cache_size = cache_size
         self.version = CURRENT_DATABASE_VERSION
+        self.statistics = DetectorDatabaseStatistics()
+        self._cache: OrderedDict[_DetectorDatabaseKey, frozenset[Detector]] = OrderedDict()
+
+    def __getstate__(self) -> dict[str, Any]:
+        state = self.__dict__.copy()
+        # Usage statistics and cached situations only make sense in the current process.
+        state.pop("statistics", None)
+        state.pop("_cache", None)
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.statistics = DetectorDatabaseStatistics()
+        self._cache = OrderedDict()
+
+    def _cache_situation(self, key: _DetectorDatabaseKey, detectors: frozenset[Detector]) -> None:
+        """Insert ``key`` as the most recently used situation of the in-memory tier."""
+        if self.cache_size is None:
+            return
+        self._cache[key] = detectors
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
 
     def add_situation(
         self,
         subtemplates: Sequence[SubTemplateType],
         plaquettes_by_timestep: Sequence[Plaquettes],
         detectors: frozenset[Detector] | Detector,
+        sufficient_radius: bool = False,
     ) -> None:
         """Add a new situation to the database.
 
@@ -347,6 +1421,11 @@ class DetectorDatabase:
                 The coordinates used by the :class:`Measurement` instances stored
                 in each entry should be relative to the top-left qubit of the
                 top-left plaquette in the provided `subtemplates`.
+            sufficient_radius: if ``True``, the provided ``detectors`` have been
+                checked to not depend on plaquettes outside of the situation,
+                which allows to use them for larger situations if
+                ``self.adaptive_radius``. The situation is stored separately
+                from the same situation without that mark. Default to ``False``.
 
         Raises:
             TQECError: if this method is called and `self.frozen`.
@@ -354,8 +1433,12 @@ class DetectorDatabase:
         """
         if self.frozen:
             raise TQECError("Cannot add a situation to a frozen database.")
-        key = _DetectorDatabaseKey(subtemplates, plaquettes_by_timestep)
-        self.mapping[key] = frozenset([detectors]) if isinstance(detectors, Detector) else detectors
+        if isinstance(detectors, Detector):
+            detectors = frozenset([detectors])
+        key = _DetectorDatabaseKey(subtemplates, plaquettes_by_timestep, sufficient_radius)
+        self.mapping[key] = detectors
+        self._cache_situation(key, detectors)
+        self.statistics.stored_bytes += len(detectors_to_bytes(detectors))
 
     def remove_situation(
         self,
@@ -381,11 +1464,39 @@ class DetectorDatabase:
             raise TQECError("Cannot remove a situation to a frozen database.")
         key = _DetectorDatabaseKey(subtemplates, plaquettes_by_timestep)
         del self.mapping[key]
+        self._cache.pop(key, None)
+        self._removed_keys = self._removed_keys | {key}
+
+    def prune(self, used_keys: Collection[_DetectorDatabaseKey]) -> int:
+        """Remove all the situations that are not in ``used_keys``.
+
+        As for :meth:`remove_situation`, the removed situations are not merged
+        back from the file ``self`` is later saved to.
+
+        Args:
+            used_keys: keys of :attr:`mapping` that should be kept.
+
+        Returns:
+            the number of removed situations.
+
+        Raises:
+            TQECError: if this method is called and `self.frozen`.
+
+        """
+        if self.frozen:
+            raise TQECError("Cannot remove a situation to a frozen database.")
+        unused_keys = [key for key in self.mapping if key not in used_keys]
+        for key in unused_keys:
+            del self.mapping[key]
+            self._cache.pop(key, None)
+        self._removed_keys = self._removed_keys | frozenset(unused_keys)
+        return len(unused_keys)
 
     def get_detectors(
         self,
         subtemplates: Sequence[SubTemplateType],
         plaquettes_by_timestep: Sequence[Plaquettes],
+        sufficient_radius: bool = False,
     ) -> frozenset[Detector] | None:
         """Return the detectors associated with the provided situation.
 
@@ -397,14 +1508,55 @@ class DetectorDatabase:
                 :class:`Plaquettes` entry storing enough :class:`Plaquette`
                 instances to generate a circuit from corresponding entry in
                 `self.subtemplates` and corresponding to one QEC round.
+            sufficient_radius: if ``True``, only look up the situation stored
+                with ``sufficient_radius=True`` by :meth:`add_situation`.
+                Default to ``False``.
 
         Returns:
             detectors associated with the provided situation or `None` if the
             situation is not in the database.
 
         """
-        key = _DetectorDatabaseKey(subtemplates, plaquettes_by_timestep)
-        return self.mapping.get(key)
+        found = self.get_first_detectors(
+            [(subtemplates, plaquettes_by_timestep, sufficient_radius)]
+        )
+        return found[1] if found is not None else None
+
+    def get_first_detectors(
+        self,
+        situations: Iterable[tuple[Sequence[SubTemplateType], Sequence[Plaquettes], bool]],
+    ) -> tuple[int, frozenset[Detector]] | None:
+        """Return the detectors of the first of the provided situations stored in the database.
+
+        Contrary to calling :meth:`get_detectors` on each situation, a single
+        lookup is recorded in :attr:`statistics`: a hit if one of the situations
+        is found, else a miss.
+
+        Args:
+            situations: ``(subtemplates, plaquettes_by_timestep, sufficient_radius)``
+                tuples describing the situations to look up, in order. See
+                :meth:`get_detectors` for the meaning of each entry.
+
+        Returns:
+            the index in ``situations`` of the first situation stored in the
+            database along with its detectors, or ``None`` if none of the
+            situations is in the database.
+
+        """
+        for i, (subtemplates, plaquettes_by_timestep, sufficient_radius) in enumerate(situations):
+            key = _DetectorDatabaseKey(subtemplates, plaquettes_by_timestep, sufficient_radius)
+            detectors = self._cache.get(key)
+            if detectors is not None:
+                self._cache.move_to_end(key)
+            else:
+                detectors = self.mapping.get(key)
+                if detectors is not None:
+                    self._cache_situation(key, detectors)
+            if detectors is not None:
+                self.statistics.hits += 1
+                return i, detectors
+        self.statistics.misses += 1
+        return None
 
     def freeze(self) -> None:
         """Make ``self`` read-only."""
@@ -439,9 +1591,27 @@ class DetectorDatabase:
     def __len__(self) -> int:
         return len(self.mapping)
 
+    def _with_in_memory_mapping(self) -> DetectorDatabase:
+        """Return ``self`` if its mapping is kept in memory, else an in-memory copy of ``self``.
+
+        The mapping of the returned database stores detectors in their binary
+        representation when pickled.
+        """
+        if isinstance(self.mapping, _LazyDetectorMapping):
+            return self
+        mapping = _LazyDetectorMapping()
+        mapping.update_entries(self.mapping)
+        database = DetectorDatabase(mapping, self.frozen, adaptive_radius=self.adaptive_radius)
+        database.version = self.version
+        return database
+
     def to_dict(self) -> dict[str, Any]:
         """Return a dictionary representation of the database.
 
+        Detectors are represented by the base64 encoding of their binary
+        representation (see
+        :func:`~tqec.compile.detectors.detector.detectors_to_bytes`).
+
         Returns:
             a dictionary with the keys ``mapping`` and ``frozen`` and their
             corresponding values.
@@ -461,11 +1631,12 @@ class DetectorDatabase:
             "mapping": [
                 [
                     key.to_dict(plaquettes_to_indices=plaquettes_to_indices),
-                    [d.to_dict() for d in detectors],
+                    base64.b64encode(data).decode(),
                 ]
-                for key, detectors in self.mapping.items()
+                for key, data in _encoded_items(self.mapping)
             ],
             "frozen": self.frozen,
+            "adaptive_radius": self.adaptive_radius,
             "uniq_plaquettes": [p.to_dict() for p in uniq_plaquettes],
         }
 
@@ -473,6 +1644,10 @@ class DetectorDatabase:
     def from_dict(data: dict[str, Any]) -> DetectorDatabase:
         """Return a database from its dictionary representation.
 
+        Detectors are only rebuilt from their binary representation when they
+        are looked up. Detectors represented as a list of dictionaries, as done
+        by previous versions, are also supported.
+
         Args:
             data: dictionary with the keys ``mapping`` and ``frozen``.
 
@@ -482,17 +1657,44 @@ class DetectorDatabase:
 
         """
         uniq_plaquettes = [Plaquette.from_dict(p) for p in data["uniq_plaquettes"]]
-        mapping = {
-            _DetectorDatabaseKey.from_dict(key, plaquettes=uniq_plaquettes): frozenset(
-                Detector.from_dict(d) for d in detectors
-            )
-            for key, detectors in data["mapping"]
-        }
-        return DetectorDatabase(mapping, data["frozen"])
+        mapping = _LazyDetectorMapping(
+            {
+                _DetectorDatabaseKey.from_dict(key, plaquettes=uniq_plaquettes): (
+                    base64.b64decode(detectors)
+                    if isinstance(detectors, str)
+                    else _decode_detectors(detectors)
+                )
+                for key, detectors in data["mapping"]
+            }
+        )
+        return DetectorDatabase(
+            mapping,
+            data["frozen"],
+            adaptive_radius=data.get("adaptive_radius", False),
+        )
 
     def to_file(self, filepath: Path) -> None:
         """Save the database to a file.
 
+        The file format is inferred from the extension of ``filepath``:
+
+        - ``.pkl`` or ``.pickle`` for a pickled database,
+        - ``.json`` for a JSON file,
+        - ``.sqlite``, ``.sqlite3`` or ``.db`` for a SQLite database,
+        - ``.journal`` for an append-only journal of modifications.
+
+        If ``self`` has been read from the SQLite file at ``filepath``, situations
+        have already been written to the file when added and this method only
+        commits them, avoiding to re-write the whole database. Similarly, if
+        ``self`` has been read from the journal at ``filepath``, this method only
+        appends the modifications performed since the last save, compacting the
+        journal from time to time. Pickle and JSON files are replaced atomically,
+        such that a crash while saving never leaves a corrupted file.
+
+        Several processes can save to the same ``filepath``: an advisory lock is
+        held while saving and the situations already stored in ``filepath`` are
+        merged with the ones of ``self`` instead of being overwritten.
+
         Args:
             filepath: path to the file where the database should be saved.
 
@@ -500,12 +1702,45 @@ class DetectorDatabase:
         if not filepath.parent.exists():
             filepath.parent.mkdir(parents=True)
         format = _get_database_format(filepath)
-        DetectorDatabase._WRITERS[format](filepath, self)
+        with _lock_database_file(filepath):
+            DetectorDatabase._WRITERS[format](filepath, self)
+        self._removed_keys = frozenset()
+
+    def _merged_with_file(self, filepath: Path) -> DetectorDatabase:
+        """Return a new database with the situations of ``self`` and of ``filepath``.
+
+        Situations of ``self`` take precedence over the ones stored in
+        ``filepath``, and situations removed from ``self`` since it was last
+        saved are not kept. The database stored in ``filepath`` is ignored if it
+        does not exist or if its version differs from the one of ``self``.
+
+        Warning:
+            The caller should hold the lock on ``filepath``.
+
+        """
+        mapping = _LazyDetectorMapping()
+        if filepath.exists():
+            on_disk = DetectorDatabase._read_file(filepath)
+            if on_disk.version == self.version:
+                mapping.update_entries(on_disk.mapping)
+        for key in self._removed_keys:
+            mapping.discard(key)
+        mapping.update_entries(self.mapping)
+        database = DetectorDatabase(mapping, self.frozen, adaptive_radius=self.adaptive_radius)
+        database.version = self.version
+        return database
 
     @staticmethod
     def from_file(filepath: Path) -> DetectorDatabase:
         """Initialise a new instance from a file.
 
+        See :meth:`to_file` for the supported formats. Databases read from a
+        SQLite file do not load any situation in memory: situations are read
+        from disk when looked up and written to disk (uncommitted until
+        :meth:`to_file` is called) when added. Databases read from a journal
+        record each modification and only write them when :meth:`to_file` is
+        called.
+
         Args:
             filepath: path to a file where a :class:`.DetectorDatabase` instance has been saved.
 
@@ -519,5 +1754,51 @@ class DetectorDatabase:
                 "on disk."
             )
         format = _get_database_format(filepath)
+        with _lock_database_file(filepath, shared=True):
+            database = DetectorDatabase._READERS[format](filepath)
+        if database.version in _MIGRATABLE_DATABASE_VERSIONS:
+            # Upgrading a SQLite database writes to its file.
+            with _lock_database_file(filepath):
+                database._migrate()
+        return database
+
+    @staticmethod
+    def _read_file(filepath: Path) -> DetectorDatabase:
+        """Read and upgrade the database stored at ``filepath``.
+
+        Warning:
+            The caller should hold the exclusive lock on ``filepath``.
+
+        """
+        format = _get_database_format(filepath)
         database = DetectorDatabase._READERS[format](filepath)
+        database._migrate()
         return database
+
+    def _migrate(self) -> None:
+        """Upgrade ``self`` to :data:`CURRENT_DATABASE_VERSION` if possible.
+
+        Only the versions in :data:`_MIGRATABLE_DATABASE_VERSIONS` are upgraded.
+        They only differ by the hash used to index situations, that is
+        re-computed here, and by the representation of detectors, that is
+        converted when reading them. Databases from any other version are left
+        untouched.
+
+        Warning:
+            Upgrading a database read from a SQLite file writes to that file, so
+            the caller should hold the exclusive lock on it.
+
+        """
+        if self.version not in _MIGRATABLE_DATABASE_VERSIONS:
+            return
+        if isinstance(self.mapping, _SQLiteDetectorMapping):
+            # The file might have been upgraded by another process since it was read.
+            if self.mapping.get_metadata("version") != str(CURRENT_DATABASE_VERSION):
+                self.mapping.migrate()
+                self.mapping.set_metadata("version", str(CURRENT_DATABASE_VERSION))
+                self.mapping.commit()
+        elif isinstance(self.mapping, (dict, _LazyDetectorMapping)):
+            mapping = _LazyDetectorMapping()
+            mapping.update_entries(self.mapping)
+            self.mapping = mapping
+        self.version = CURRENT_DATABASE_VERSION
@@ -2,13 +2,17 @@
 
 from __future__ import annotations
 
+import math
+import struct
+from collections.abc import Iterable
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, Final
 
 import stim
 
 from tqec.circuit.measurement import Measurement
 from tqec.circuit.measurement_map import MeasurementRecordsMap
+from tqec.circuit.qubit import GridQubit
 from tqec.utils.coordinates import StimCoordinates
 from tqec.utils.exceptions import TQECError
 
@@ -120,3 +124,116 @@ class Detector:
         measurements = frozenset(Measurement.from_dict(m) for m in data["measurements"])
         coordinates = StimCoordinates.from_dict(data["coordinates"])
         return Detector(measurements, coordinates)
+
+
+# Format version, number of detectors and number of measurements.
+_DETECTORS_HEADER: Final[struct.Struct] = struct.Struct("<BII")
+_DETECTORS_FORMAT_VERSION: Final[int] = 1
+
+
+def detectors_to_bytes(detectors: Iterable[Detector]) -> bytes:
+    """Return a compact binary representation of the provided detectors.
+
+    The representation is columnar. After a small header, it stores:
+
+    - the number of measurements of each detector, as ``uint16``,
+    - the ``(x, y, offset)`` triplet of each measurement, detector after
+      detector, as ``int16``,
+    - the ``(x, y, t)`` coordinates of each detector as ``float64``, a missing
+      ``t`` coordinate being represented by ``NaN``.
+
+    Args:
+        detectors: detectors to represent.
+
+    Raises:
+        TQECError: if a measurement qubit coordinate or offset does not fit in a
+            16-bit signed integer or if a detector has more than 65535
+            measurements.
+
+    Returns:
+        bytes that can be converted back to detectors with
+        :func:`detectors_from_bytes`.
+
+    """
+    detectors = list(detectors)
+    counts = [len(d.measurements) for d in detectors]
+    measurements = [
+        value
+        for d in detectors
+        for m in d.measurements
+        for value in (m.qubit.x, m.qubit.y, m.offset)
+    ]
+    coordinates = [
+        value
+        for d in detectors
+        for value in (
+            d.coordinates.x,
+            d.coordinates.y,
+            math.nan if d.coordinates.t is None else d.coordinates.t,
+        )
+    ]
+    try:
+        return b"".join(
+            (
+                _DETECTORS_HEADER.pack(
+                    _DETECTORS_FORMAT_VERSION, len(detectors), len(measurements) // 3
+                ),
+                struct.pack(f"<{len(counts)}H", *counts),
+                struct.pack(f"<{len(measurements)}h", *measurements),
+                struct.pack(f"<{len(coordinates)}d", *coordinates),
+            )
+        )
+    except struct.error as e:
+        raise TQECError(
+            "Cannot serialize detectors with more than 65535 measurements or with measurement "
+            "coordinates or offsets that do not fit in a 16-bit signed integer."
+        ) from e
+
+
+def detectors_from_bytes(data: bytes) -> frozenset[Detector]:
+    """Return the detectors from their binary representation.
+
+    Args:
+        data: bytes returned by :func:`detectors_to_bytes`.
+
+    Raises:
+        TQECError: if ``data`` is not a valid representation of detectors.
+
+    Returns:
+        the detectors represented by ``data``.
+
+    """
+    if len(data) < _DETECTORS_HEADER.size:
+        raise TQECError("Invalid binary representation of detectors: missing header.")
+    version, detector_count, measurement_count = _DETECTORS_HEADER.unpack_from(data)
+    if version != _DETECTORS_FORMAT_VERSION:
+        raise TQECError(f"Unsupported binary representation of detectors (version {version}).")
+    expected_size = _DETECTORS_HEADER.size + 26 * detector_count + 6 * measurement_count
+    if len(data) != expected_size:
+        raise TQECError(
+            f"Invalid binary representation of detectors: expected {expected_size} bytes but "
+            f"got {len(data)}."
+        )
+    offset = _DETECTORS_HEADER.size
+    counts = struct.unpack_from(f"<{detector_count}H", data, offset)
+    offset += 2 * detector_count
+    measurements = struct.unpack_from(f"<{3 * measurement_count}h", data, offset)
+    offset += 6 * measurement_count
+    coordinates = struct.unpack_from(f"<{3 * detector_count}d", data, offset)
+    detectors: list[Detector] = []
+    start = 0
+    for i, count in enumerate(counts):
+        x, y, t = coordinates[3 * i : 3 * i + 3]
+        detectors.append(
+            Detector(
+                frozenset(
+                    Measurement(
+                        GridQubit(measurements[j], measurements[j + 1]), measurements[j + 2]
+                    )
+                    for j in range(start, start + 3 * count, 3)
+                ),
+                StimCoordinates(x, y, None if math.isnan(t) else t),
+            )
+        )
+        start += 3 * count
+    return frozenset(detectors)
@@ -22,6 +22,7 @@ import numpy
 import numpy.typing as npt
 
 from tqec.circuit.schedule import (
+    ColumnarScheduledCircuit,
     ScheduledCircuit,
     merge_scheduled_circuits,
     relabel_circuits_qubit_indices,
@@ -29,6 +30,7 @@ from tqec.circuit.schedule import (
 from tqec.plaquette.plaquette import Plaquettes
 from tqec.templates.base import Template
 from tqec.utils.array import to2dlist
+from tqec.utils.exceptions import TQECError
 from tqec.utils.position import Shift2D
 
 
@@ -118,6 +120,44 @@ def generate_circuit_from_instantiation(
     if indices[0] == 0:
         indices = indices[1:]
 
+    # Plaquette circuits are tiled in their columnar representation, which
+    # translates and merges all the plaquette instances at once. Circuits that
+    # cannot be represented that way are merged moment by moment.
+    try:
+        columnar_circuits = {
+            i: ColumnarScheduledCircuit.from_scheduled_circuit(plaquettes[i].circuit)
+            for i in indices.tolist()
+        }
+    except TQECError:
+        return _generate_circuit_by_merging(plaquette_array, plaquettes, increments, indices)
+
+    column_count = plaquette_array.shape[1]
+    flat_plaquette_array = plaquette_array.ravel()
+    tiled_circuits: list[ColumnarScheduledCircuit] = []
+    mergeable_instructions: set[str] = set()
+    for plaquette_index, columnar_circuit in columnar_circuits.items():
+        plaquette = plaquettes[plaquette_index]
+        instances = numpy.flatnonzero(flat_plaquette_array == plaquette_index)
+        offsets = numpy.stack(
+            [
+                plaquette.origin.x + instances % column_count * increments.x,
+                plaquette.origin.y + instances // column_count * increments.y,
+            ],
+            axis=1,
+        )
+        tiled_circuits.append(columnar_circuit.tile(offsets, instances))
+        mergeable_instructions |= plaquette.mergeable_instructions
+    return ColumnarScheduledCircuit.concatenate(tiled_circuits).to_scheduled_circuit(
+        mergeable_instructions
+    )
+
+
+def _generate_circuit_by_merging(
+    plaquette_array: npt.NDArray[numpy.int_],
+    plaquettes: Plaquettes,
+    increments: Shift2D,
+    indices: npt.NDArray[numpy.int_],
+) -> ScheduledCircuit:
     # Plaquettes indices are starting at 1 in template_plaquettes. To avoid
     # offsets in the following code, we add an empty circuit at position 0.
     plaquette_circuits = {0: ScheduledCircuit.empty()} | {
@@ -43,7 +43,7 @@ For temporal pipes, the layers are replaced in-place within block instances.
 
 """
 
-from collections.abc import Iterator
+from collections.abc import Iterable, Iterator
 from pathlib import Path
 from typing import Final
 
@@ -471,6 +471,7 @@ class TopologicalComputationGraph:
         detector_database: DetectorDatabase | None = None,
         database_path: str | Path | None = DEFAULT_DETECTOR_DATABASE_PATH,
         reschedule_measurements: bool = True,
+        parallel_process_count: int | None = None,
     ) -> stim.Circuit:
         """Generate the ``stim.Circuit`` from the compiled graph.
 
@@ -492,6 +493,10 @@ class TopologicalComputationGraph:
                 to be in the same moment. Since each plaquette may have its own measurement
                 schedule, setting this may be necessary for hardware that requires
                 measurements to be synchronous.
+            parallel_process_count: number of processes used to compute the
+                detectors that are not already in ``detector_database``. -1
+                means using all the available cores. Default to ``None`` which
+                uses about half of the available cores.
 
         Returns:
             A compiled stim circuit.
@@ -503,12 +508,71 @@ class TopologicalComputationGraph:
             detector_database=detector_database,
             database_path=database_path,
             reschedule_measurements=reschedule_measurements,
+            parallel_process_count=parallel_process_count,
         )
         # If provided, apply the noise model.
         if noise_model is not None:
             circuit = noise_model.noisy_circuit(circuit)
         return circuit
 
+    def generate_stim_circuits(
+        self,
+        ks: Iterable[int],
+        noise_model: NoiseModel | None = None,
+        manhattan_radius: int = 2,
+        detector_database: DetectorDatabase | None = None,
+        database_path: str | Path | None = DEFAULT_DETECTOR_DATABASE_PATH,
+        reschedule_measurements: bool = True,
+        parallel_process_count: int | None = None,
+    ) -> dict[int, stim.Circuit]:
+        """Generate the ``stim.Circuit`` instances of the compiled graph for several scale factors.
+
+        This method is equivalent to calling :meth:`generate_stim_circuit` for
+        each entry of ``ks``, but only builds the layer tree once and computes the
+        detectors of all the scale factors in a single batch, sharing the
+        situations that appear for several scale factors.
+
+        Args:
+            ks: scale factors of the templates.
+            noise_model: noise model to be applied to the circuits.
+            manhattan_radius: radius considered to compute detectors.
+                Detectors are not computed and added to the circuits if this
+                argument is negative.
+            detector_database: an instance to retrieve from / store in detectors
+                that are computed as part of the circuit generation. If not given,
+                the detectors are retrieved from/stored in the provided
+                ``database_path``.
+            database_path: specify where to save to after the calculation. This
+                defaults to :data:`.DEFAULT_DETECTOR_DATABASE_PATH`
+                if not specified. If detector_database is not passed in, the code
+                attempts to retrieve the database from this location.
+            reschedule_measurements: whether to reschedule measurements in a ``LayoutLayer``
+                to be in the same moment. Since each plaquette may have its own measurement
+                schedule, setting this may be necessary for hardware that requires
+                measurements to be synchronous.
+            parallel_process_count: number of processes used to compute the
+                detectors that are not already in ``detector_database``. -1
+                means using all the available cores. Default to ``None`` which
+                uses about half of the available cores.
+
+        Returns:
+            A mapping from each entry of ``ks`` to the corresponding compiled stim
+            circuit.
+
+        """
+        circuits = self.to_layer_tree().generate_circuits(
+            ks,
+            manhattan_radius=manhattan_radius,
+            detector_database=detector_database,
+            database_path=database_path,
+            reschedule_measurements=reschedule_measurements,
+            parallel_process_count=parallel_process_count,
+        )
+        # If provided, apply the noise model.
+        if noise_model is not None:
+            circuits = {k: noise_model.noisy_circuit(circuit) for k, circuit in circuits.items()}
+        return circuits
+
     def generate_stim_circuit_stream(
         self,
         k: int,
@@ -517,6 +581,7 @@ class TopologicalComputationGraph:
         detector_database: DetectorDatabase | None = None,
         database_path: str | Path | None = DEFAULT_DETECTOR_DATABASE_PATH,
         reschedule_measurements: bool = True,
+        parallel_process_count: int | None = None,
     ) -> Iterator[stim.Circuit]:
         """Generate the ``stim.Circuit`` from the compiled graph.
 
@@ -538,6 +603,10 @@ class TopologicalComputationGraph:
                 to be in the same moment. Since each plaquette may have its own measurement
                 schedule, setting this may be necessary for hardware that requires
                 measurements to be synchronous.
+            parallel_process_count: number of processes used to compute the
+                detectors that are not already in ``detector_database``. -1
+                means using all the available cores. Default to ``None`` which
+                uses about half of the available cores.
 
         Returns:
             A compiled stim circuit.
@@ -550,6 +619,7 @@ class TopologicalComputationGraph:
             detector_database=detector_database,
             database_path=database_path,
             reschedule_measurements=reschedule_measurements,
+            parallel_process_count=parallel_process_count,
         )
 
         # aggregate circuits by combining elements in the iterator
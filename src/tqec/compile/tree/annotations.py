@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import math
+from array import array
+from collections.abc import Iterable, Iterator
 from dataclasses import dataclass, field
 from typing import Any
 
@@ -47,6 +49,69 @@ class DetectorAnnotation:
         )
 
 
+class DetectorAnnotations:
+    def __init__(self, annotations: Iterable[DetectorAnnotation] = ()) -> None:
+        """Detectors of a layer, stored as packed arrays of record offsets and coordinates.
+
+        Building one ``stim.CircuitInstruction`` per detector has a cost that
+        dominates the generation of large circuits. Instead, the measurement
+        offsets and coordinates of all the detectors are stored in flat arrays
+        and the ``DETECTOR`` instructions are built all at once by
+        :meth:`to_circuit`.
+
+        Args:
+            annotations: detectors initially stored in the returned instance.
+
+        """
+        self._offsets = array("q")
+        self._offset_bounds = array("q", [0])
+        self._coordinates = array("d")
+        self._coordinate_bounds = array("q", [0])
+        for annotation in annotations:
+            self.append(annotation)
+
+    def append(self, annotation: DetectorAnnotation) -> None:
+        """Add the provided detector after the ones already stored in ``self``."""
+        self._offsets.extend(annotation.measurement_offsets)
+        self._offset_bounds.append(len(self._offsets))
+        self._coordinates.extend(annotation.coordinates.to_stim_coordinates())
+        self._coordinate_bounds.append(len(self._coordinates))
+
+    def __len__(self) -> int:
+        return len(self._offset_bounds) - 1
+
+    def __iter__(self) -> Iterator[DetectorAnnotation]:
+        for i in range(len(self)):
+            coordinates = self._coordinates[
+                self._coordinate_bounds[i] : self._coordinate_bounds[i + 1]
+            ]
+            yield DetectorAnnotation(
+                StimCoordinates(*coordinates),
+                self._offsets[self._offset_bounds[i] : self._offset_bounds[i + 1]].tolist(),
+            )
+
+    def to_circuit(self) -> stim.Circuit:
+        """Return a circuit containing the ``DETECTOR`` instructions of the stored detectors.
+
+        The circuit is parsed from its text representation in one call, which
+        is a lot faster than appending each instruction individually. Floats are
+        formatted with ``repr`` that round-trips exactly, so the coordinates are
+        not altered.
+        """
+        offsets = self._offsets.tolist()
+        coordinates = self._coordinates.tolist()
+        offset_bounds = self._offset_bounds.tolist()
+        coordinate_bounds = self._coordinate_bounds.tolist()
+        lines = [
+            "DETECTOR("
+            + ",".join(map(repr, coordinates[coordinate_bounds[i] : coordinate_bounds[i + 1]]))
+            + ") "
+            + " ".join(f"rec[{o}]" for o in offsets[offset_bounds[i] : offset_bounds[i + 1]])
+            for i in range(len(self))
+        ]
+        return stim.Circuit("\n".join(lines))
+
+
 @dataclass(frozen=True)
 class Polygon:
     """A polygon representing a stabilizer region in Crumble."""
@@ -74,7 +139,7 @@ class Polygon:
 @dataclass
 class LayerNodeAnnotations:
     circuit: ScheduledCircuit | None = None
-    detectors: list[DetectorAnnotation] = field(default_factory=list)
+    detectors: DetectorAnnotations = field(default_factory=DetectorAnnotations)
     observables: list[Observable] = field(default_factory=list)
     polygons: list[Polygon] = field(default_factory=list)
 
@@ -82,7 +147,7 @@ class LayerNodeAnnotations:
         """Return a dictionary representation of ``self``."""
         return {  # pragma: no cover
             "circuit_str": (str(self.circuit.get_circuit()) if self.circuit is not None else None),
-            "detectors": self.detectors,
+            "detectors": list(self.detectors),
             "observables": self.observables,
             "polygons": self.polygons,
         }
@@ -1,12 +1,19 @@
 from __future__ import annotations
 
+import math
+from collections import deque
+from collections.abc import Iterable
 from dataclasses import dataclass, field
 
 from typing_extensions import override
 
 from tqec.circuit.measurement_map import MeasurementRecordsMap
 from tqec.compile.blocks.layers.atomic.layout import LayoutLayer
-from tqec.compile.detectors.compute import compute_detectors_for_fixed_radius
+from tqec.compile.detectors.compute import (
+    DetectorComputationPool,
+    compute_detectors_for_fixed_radius,
+    precompute_detectors_for_scaling_factors,
+)
 from tqec.compile.detectors.database import DetectorDatabase
 from tqec.compile.tree.annotations import DetectorAnnotation
 from tqec.compile.tree.node import LayerNode, NodeWalker
@@ -43,9 +50,27 @@ class LookbackInformation:
 
 @dataclass
 class LookbackInformationList:
-    """A sequence of :class:`LookbackInformation` instances."""
+    """A sequence of :class:`LookbackInformation` instances.
 
-    infos: list[LookbackInformation] = field(default_factory=list)
+    Only the ``window`` last entries are stored, older ones are dropped when new
+    entries are added. The length of the sequence still accounts for the dropped
+    entries.
+
+    Attributes:
+        window: maximum number of entries stored. ``None`` means that all the
+            entries are stored.
+        infos: the stored entries, from the oldest to the most recent.
+        length: total number of entries, including the ones that have been
+            dropped.
+
+    """
+
+    window: int | None = None
+    infos: deque[LookbackInformation] = field(init=False)
+    length: int = field(default=0, init=False)
+
+    def __post_init__(self) -> None:
+        self.infos = deque(maxlen=self.window)
 
     def append(
         self,
@@ -59,25 +84,35 @@ class LookbackInformationList:
         stack.
         """
         self.infos.append(LookbackInformation(template, plaquettes, measurement_records))
+        self.length += 1
 
     def extend(self, other: LookbackInformationList, repetitions: int = 1) -> None:
         """Add the provided lookback information to self, potentially repeating it several times.
 
         This method can be used when exiting a REPEAT block to update the lookback information by
-        taking into account that it might be repeated several times.
+        taking into account that it might be repeated several times. Only the repetitions that
+        end up in the window of ``self`` are materialised, so the cost of this method does not
+        depend on ``repetitions``.
 
         """
-        self.infos.extend(other.infos * repetitions)
+        self.length += other.length * repetitions
+        if not other.infos:
+            return
+        materialised_repetitions = repetitions
+        if self.window is not None:
+            materialised_repetitions = min(repetitions, math.ceil(self.window / len(other.infos)))
+        for _ in range(materialised_repetitions):
+            self.infos.extend(other.infos)
 
     def __len__(self) -> int:
-        return len(self.infos)
+        return self.length
 
     def __getitem__(self, index: int | slice) -> LookbackInformation | list[LookbackInformation]:
-        return self.infos[index]  # pragma: no cover
+        return list(self.infos)[index]  # pragma: no cover
 
 
 class LookbackStack:
-    def __init__(self) -> None:
+    def __init__(self, window: int | None = None) -> None:
         """Initialise the lookback stack.
 
         The lookback stack can be used to query the current state for detector computation.
@@ -88,12 +123,25 @@ class LookbackStack:
         In particular, this data-structure is useful to keep track of previous rounds in the
         presence of ``REPEAT`` blocks.
 
+        Args:
+            window: maximum number of rounds that can be looked back. If provided,
+                only the ``window`` last rounds are kept in memory and closing a
+                ``REPEAT`` block costs at most ``window`` operations, whatever the
+                number of repetitions. Default to ``None``, meaning that all the
+                rounds are kept.
+
+        Raises:
+            TQECError: if ``window`` is provided and is not strictly positive.
+
         """
-        self._stack: list[LookbackInformationList] = [LookbackInformationList()]
+        if window is not None and window < 1:
+            raise TQECError(f"The lookback window should be strictly positive. Got {window}.")
+        self._window = window
+        self._stack: list[LookbackInformationList] = [LookbackInformationList(window)]
 
     def enter_repeat_block(self) -> None:
         """Append a new entry to the stack."""
-        self._stack.append(LookbackInformationList())
+        self._stack.append(LookbackInformationList(self._window))
 
     def close_repeat_block(self, repetitions: int) -> None:
         """Remove the last entry on the stack, repeating it as needed into the new last entry."""
@@ -122,6 +170,11 @@ class LookbackStack:
             raise TQECError(
                 f"Cannot look back a negative number of rounds. Got a lookback value of {n}."
             )
+        if self._window is not None and n > self._window:
+            raise TQECError(
+                f"Cannot look back {n} rounds with a stack only keeping the last "
+                f"{self._window} rounds."
+            )
         if n == 0:
             return [], [], []
         templates: list[Template] = []
@@ -145,8 +198,10 @@ class LookbackStack:
     ) -> tuple[list[Template], list[Plaquettes], MeasurementRecordsMap]:
         """Get the last ``self._lookback`` QEC rounds."""
         templates, plaquettes, measurement_records = self._get_last_n(n)
-        measurement_record = MeasurementRecordsMap()
-        for mrec in measurement_records:
+        if not measurement_records:
+            return templates, plaquettes, MeasurementRecordsMap()
+        measurement_record = measurement_records[0]
+        for mrec in measurement_records[1:]:
             measurement_record = measurement_record.with_added_measurements(mrec)
         return templates, plaquettes, measurement_record
 
@@ -158,6 +213,57 @@ class LookbackStack:
         return len(self._stack[0])
 
 
+class _CollectLookbackRoundsOnLayerNode(NodeWalker):
+    def __init__(self, k: int, lookback: int, reschedule_measurements: bool):
+        """Walker collecting the rounds considered for detector computation at each leaf node.
+
+        This walker performs the same walk as :class:`AnnotateDetectorsOnLayerNode`
+        but, instead of computing detectors, only records the templates and
+        plaquettes of the ``lookback`` rounds that would be used to compute
+        detectors at each leaf. It does not need the circuit annotations.
+
+        Args:
+            k: scaling factor.
+            lookback: number of QEC rounds considered to find detectors.
+            reschedule_measurements: whether measurements of each leaf layer
+                will be rescheduled when generating its circuit. Rescheduling
+                changes the plaquettes of the layer, so it is applied here too
+                for the collected plaquettes to match the ones that will be
+                used later.
+
+        """
+        self._k = k
+        self._lookback_size = lookback
+        self._reschedule_measurements = reschedule_measurements
+        self._lookback_stack = LookbackStack(lookback)
+        self.rounds: list[tuple[list[Template], list[Plaquettes]]] = []
+
+    @override
+    def visit_node(self, node: LayerNode) -> None:
+        if not isinstance(node._layer, LayoutLayer):
+            return
+        if self._reschedule_measurements:
+            node._layer.reschedule_measurements()
+        self._lookback_stack.append(
+            *node._layer.to_template_and_plaquettes(), MeasurementRecordsMap()
+        )
+        templates, plaquettes, _ = self._lookback_stack.lookback(self._lookback_size)
+        self.rounds.append((templates, plaquettes))
+
+    @override
+    def enter_node(self, node: LayerNode) -> None:
+        if node.is_repeated:
+            self._lookback_stack.enter_repeat_block()
+
+    @override
+    def exit_node(self, node: LayerNode) -> None:
+        if not node.is_repeated:
+            return
+        repetitions = node.repetitions
+        assert repetitions is not None
+        self._lookback_stack.close_repeat_block(repetitions.integer_eval(self._k))
+
+
 class AnnotateDetectorsOnLayerNode(NodeWalker):
     def __init__(
         self,
@@ -192,7 +298,9 @@ class AnnotateDetectorsOnLayerNode(NodeWalker):
             parallel_process_count: number of processes to use for parallel processing.
                 1 for sequential processing, >1 for parallel processing using
                 ``parallel_process_count`` processes, and -1 for using all available
-                CPU cores. Default to 1.
+                CPU cores. The worker processes are shared by all the visited
+                nodes and should be stopped with :meth:`close` once the walk is
+                over. Default to 1.
 
         """
         if lookback < 1:
@@ -204,8 +312,10 @@ class AnnotateDetectorsOnLayerNode(NodeWalker):
         self._manhattan_radius = manhattan_radius
         self._database = detector_database if detector_database is not None else DetectorDatabase()
         self._lookback_size = lookback
-        self._lookback_stack = LookbackStack()
-        self._parallel_process_count = parallel_process_count
+        self._lookback_stack = LookbackStack(lookback)
+        self._pool = (
+            DetectorComputationPool(parallel_process_count) if parallel_process_count != 1 else None
+        )
 
     @override
     def visit_node(self, node: LayerNode) -> None:
@@ -229,7 +339,7 @@ class AnnotateDetectorsOnLayerNode(NodeWalker):
             self._manhattan_radius,
             self._database,
             only_use_database=False,
-            parallel_process_count=self._parallel_process_count,
+            pool=self._pool,
         )
 
         for detector in detectors:
@@ -254,3 +364,58 @@ class AnnotateDetectorsOnLayerNode(NodeWalker):
         repetitions = node.repetitions
         assert repetitions is not None
         self._lookback_stack.close_repeat_block(repetitions.integer_eval(self._k))
+
+    def precompute_detectors(
+        self,
+        root: LayerNode,
+        reschedule_measurements: bool = True,
+        ks: Iterable[int] | None = None,
+    ) -> int:
+        """Compute the detectors of all the situations found in the tree rooted at ``root``.
+
+        This method is the first phase of a two-phase detector computation. It
+        walks the tree to collect all the situations that will be encountered
+        when walking it with ``self``, de-duplicates them across all the leaf
+        nodes and computes, in one batch using the worker processes of ``self``
+        if any, the ones that are not in the database of ``self`` yet.
+
+        Walking the tree with ``self`` afterwards only retrieves detectors from
+        the database, so the total number of detector computations only depends
+        on the number of distinct situations, not on the number of layers.
+
+        Args:
+            root: root of the tree that will be walked with ``self``.
+            reschedule_measurements: whether the measurements of each leaf layer
+                will be rescheduled when generating its circuit. Should be
+                ``False`` if the circuits have already been generated.
+            ks: scaling factors for which the situations are collected. The
+                situations are de-duplicated across all the scaling factors, so
+                that walking the tree with an instance sharing the database of
+                ``self`` for any of these scaling factors only retrieves
+                detectors from the database. Default to ``None``, meaning that
+                only the scaling factor of ``self`` is considered.
+
+        Returns:
+            the number of situations that have been computed.
+
+        """
+        rounds_by_k: dict[int, list[tuple[list[Template], list[Plaquettes]]]] = {}
+        for k in ks if ks is not None else (self._k,):
+            collector = _CollectLookbackRoundsOnLayerNode(
+                k, self._lookback_size, reschedule_measurements
+            )
+            root.walk(collector)
+            rounds_by_k[k] = collector.rounds
+            # Measurements only need to be rescheduled once.
+            reschedule_measurements = False
+        return precompute_detectors_for_scaling_factors(
+            rounds_by_k,
+            self._database,
+            self._manhattan_radius,
+            self._pool,
+        )
+
+    def close(self) -> None:
+        """Stop the worker processes used to compute detectors, if any."""
+        if self._pool is not None:
+            self._pool.close()
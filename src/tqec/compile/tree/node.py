@@ -265,9 +265,13 @@ class LayerNode:
                     local_qubit_map[q]: global_qubit_map[q] for q in local_qubit_map.qubits
                 }
                 mapped_circuit = base_circuit.map_qubit_indices(qubit_indices_mapping)
-                for annotation in annotations.detectors + annotations.observables:
-                    mapped_circuit.append_annotation(annotation.to_instruction())
-                mapped_circuit.append_annotation(
+                # Annotations end the last moment of the circuit, so they can be
+                # appended after it. Detectors are appended in one block.
+                circuit = mapped_circuit.get_circuit(include_qubit_coords=False)
+                circuit += annotations.detectors.to_circuit()
+                for observable in annotations.observables:
+                    circuit.append(observable.to_instruction())
+                circuit.append(
                     stim.CircuitInstruction(
                         "SHIFT_COORDS", [], StimCoordinates(0, 0, 1).to_stim_coordinates()
                     )
@@ -276,7 +280,7 @@ class LayerNode:
                 if add_polygons:
                     yield annotations.polygons
 
-                yield mapped_circuit.get_circuit(include_qubit_coords=False)
+                yield circuit
 
             elif isinstance(self._layer, SequencedLayers):
                 leaf_dict: dict[LayerNode, list[tuple[Callable, ObservableComponent]]] = {}
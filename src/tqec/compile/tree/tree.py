@@ -1,11 +1,13 @@
 from __future__ import annotations
 
 import warnings
-from collections.abc import Iterator, Mapping, Sequence
+from collections.abc import Iterable, Iterator, Mapping, Sequence
 from multiprocessing import cpu_count
 from pathlib import Path
 from typing import Any
 
+import numpy
+import numpy.typing as npt
 import stim
 from typing_extensions import override
 
@@ -53,24 +55,42 @@ class QubitLister(NodeWalker):
         """Return all the qubits seen when exploring."""
         return self._seen_qubits
 
+    def to_qubit_map(self) -> QubitMap:
+        """Return a qubit map indexing the seen qubits in sorted order."""
+        return QubitMap.from_qubits(sorted(self.seen_qubits))
+
 
 class TemplateQubitLister(QubitLister):
-    """List qubits used by leaf layers without generating their circuits.
+    def __init__(self, k: int):
+        """List qubits used by leaf layers without generating their circuits.
 
-    Equivalent to :class:`QubitLister` but operates directly on the underlying
-    templates and plaquettes, so it can run before circuit annotation. Used to
-    precompute a qubit map for streaming circuit generation.
+        Equivalent to :class:`QubitLister` but operates directly on the underlying
+        templates and plaquettes, so it can run before circuit annotation. Used to
+        precompute a qubit map for streaming circuit generation.
 
-    Args:
-        k: scaling factor used to explore the quantum circuits.
+        Args:
+            k: scaling factor used to explore the quantum circuits.
 
-    """
+        """
+        super().__init__(k)
+        self._qubit_coordinates: list[npt.NDArray[numpy.int64]] = []
 
     @override
     def visit_node(self, node: LayerNode) -> None:
         if not isinstance(node._layer, LayoutLayer):
             return
-        self._seen_qubits |= node._layer.qubits(self._k)
+        self._qubit_coordinates.append(node._layer.qubit_coordinates(self._k))
+
+    @property
+    @override
+    def seen_qubits(self) -> set[GridQubit]:
+        return set(self.to_qubit_map().qubits)
+
+    @override
+    def to_qubit_map(self) -> QubitMap:
+        if not self._qubit_coordinates:
+            return QubitMap()
+        return QubitMap.from_qubit_coordinates(numpy.concatenate(self._qubit_coordinates))
 
 
 class LayerTree:
@@ -126,7 +146,7 @@ class LayerTree:
     ) -> QubitMap:
         qubit_lister = qubit_lister_cls(k)
         self._root.walk(qubit_lister)
-        return QubitMap.from_qubits(sorted(qubit_lister.seen_qubits))
+        return qubit_lister.to_qubit_map()
 
     def _annotate_observables(self, k: int) -> None:
         for obs_idx, observable in enumerate(self._abstract_observables):
@@ -143,15 +163,21 @@ class LayerTree:
     ) -> None:
         if manhattan_radius <= 0:
             return  # pragma: no cover
-        self._root.walk(
-            AnnotateDetectorsOnLayerNode(
-                k,
-                manhattan_radius,
-                detector_database,
-                lookback,
-                parallel_process_count,
-            )
+        walker = AnnotateDetectorsOnLayerNode(
+            k,
+            manhattan_radius,
+            detector_database,
+            lookback,
+            parallel_process_count,
         )
+        try:
+            if parallel_process_count != 1:
+                # Circuits are already annotated, so the layers are in their final
+                # state and measurements should not be rescheduled again.
+                walker.precompute_detectors(self._root, reschedule_measurements=False)
+            self._root.walk(walker)
+        finally:
+            walker.close()
         # The database will have been updated inside the above function, and here at
         # the end of the computation we save it to file.
         if detector_database is not None and database_path is not None:
@@ -279,6 +305,7 @@ class LayerTree:
         database_path: str | Path | None = DEFAULT_DETECTOR_DATABASE_PATH,
         lookback: int = 2,
         reschedule_measurements: bool = True,
+        parallel_process_count: int | None = None,
     ) -> stim.Circuit:
         """Generate the quantum circuit representing ``self``.
 
@@ -310,6 +337,10 @@ class LayerTree:
                 to be in the same moment. Since each plaquette may have its own measurement
                 schedule, setting this may be necessary for hardware that requires
                 measurements to be synchronous.
+            parallel_process_count: number of processes used to compute the
+                detectors that are not already in ``detector_database``. -1
+                means using all the available cores. Default to ``None`` which
+                uses about half of the available cores.
 
         Returns:
             a ``stim.Circuit`` instance implementing the computation described
@@ -325,6 +356,7 @@ class LayerTree:
             database_path,
             lookback,
             reschedule_measurements,
+            parallel_process_count,
         )
         for circ in stream:
             circuit += circ
@@ -339,6 +371,7 @@ class LayerTree:
         database_path: str | Path | None = DEFAULT_DETECTOR_DATABASE_PATH,
         lookback: int = 2,
         reschedule_measurements: bool = True,
+        parallel_process_count: int | None = None,
     ) -> Iterator[stim.Circuit]:
         """Generate the quantum circuit representing ``self``.
 
@@ -370,6 +403,10 @@ class LayerTree:
                 to be in the same moment. Since each plaquette may have its own measurement
                 schedule, setting this may be necessary for hardware that requires
                 measurements to be synchronous.
+            parallel_process_count: number of processes used to compute the
+                detectors that are not already in ``detector_database``. -1
+                means using all the available cores. Default to ``None`` which
+                uses about half of the available cores.
 
         Returns:
             an iterator of ``stim.Circuit`` instances implementing the computation described
@@ -378,98 +415,252 @@ class LayerTree:
         """
         # If already annotated, no need to re-annotate.
         if k in self._annotations:
-            annotations = self._get_annotation(k)
-            assert annotations.qubit_map is not None
-            if include_qubit_coords:
-                yield annotations.qubit_map.to_circuit()
-            yield from self._root._generate_circuit_stream(
-                k, annotations.qubit_map, reschedule_measurements
+            yield from self._generate_annotated_circuit_stream(
+                k, include_qubit_coords, reschedule_measurements
+            )
+            return
+        if isinstance(database_path, str):
+            database_path = Path(database_path)  # potential type conversion
+        detector_database = self._load_detector_database(detector_database, database_path)
+        try:
+            yield from self._generate_circuit_stream(
+                k,
+                include_qubit_coords,
+                manhattan_radius,
+                detector_database,
+                lookback,
+                reschedule_measurements,
+                parallel_process_count,
             )
-        else:
-            if isinstance(database_path, str):
-                database_path = Path(database_path)  # potential type conversion
+        finally:
+            # The database will have been updated inside the above function
+            # with AnnotateDetectorsOnLayerNode, and here at the end of the
+            # computation we save it to file.
+            if detector_database is not None and database_path is not None:
+                detector_database.to_file(database_path)
+
+    def generate_circuits(
+        self,
+        ks: Iterable[int],
+        include_qubit_coords: bool = True,
+        manhattan_radius: int = 2,
+        detector_database: DetectorDatabase | None = None,
+        database_path: str | Path | None = DEFAULT_DETECTOR_DATABASE_PATH,
+        lookback: int = 2,
+        reschedule_measurements: bool = True,
+        parallel_process_count: int | None = None,
+    ) -> dict[int, stim.Circuit]:
+        """Generate the quantum circuits representing ``self`` for several scaling factors.
+
+        This method is equivalent to calling :meth:`generate_circuit` for each
+        entry of ``ks``, except that the detectors are computed once for all the
+        scaling factors: the situations encountered for each scaling factor are
+        collected and de-duplicated across all the scaling factors, and the ones
+        that are not in the detector database are computed in a single batch.
+        The circuits of all the scaling factors are then generated from the
+        same tree, only retrieving detectors from the database.
+
+        Args:
+            ks: scaling factors to generate circuits for.
+            include_qubit_coords: whether to include ``QUBIT_COORDS`` annotations
+                in the returned quantum circuits or not. Default to ``True``.
+            manhattan_radius: Parameter for the automatic computation of detectors.
+                See :meth:`generate_circuit`.
+            detector_database: an instance to retrieve from / store in detectors
+                that are computed as part of the circuit generation. If not given,
+                the detectors are retrieved from/stored in the provided
+                ``database_path``. If there is no database at ``database_path``
+                either, an in-memory database is used to share the detectors
+                between the scaling factors.
+            database_path: specify where to save to after the calculation.
+                This defaults to :data:`.DEFAULT_DETECTOR_DATABASE_PATH` if
+                not specified. If detector_database is None, this method attempts to
+                retrieve the database from this location.
+            lookback: number of QEC rounds to consider to try to find detectors.
+                Including more rounds increases computation time.
+            reschedule_measurements: whether to reschedule measurements in a ``LayoutLayer``
+                to be in the same moment. See :meth:`generate_circuit`.
+            parallel_process_count: number of processes used to compute the
+                detectors that are not already in ``detector_database``. -1
+                means using all the available cores. Default to ``None`` which
+                uses about half of the available cores.
+
+        Returns:
+            a mapping from each entry of ``ks`` to the ``stim.Circuit`` instance
+            implementing the computation described by ``self`` for that scaling
+            factor.
 
-            if detector_database is None and database_path is not None and database_path.exists():
+        """
+        ks = list(dict.fromkeys(ks))
+        if isinstance(database_path, str):
+            database_path = Path(database_path)  # potential type conversion
+        missing_ks = [k for k in ks if k not in self._annotations]
+        loaded_database = (
+            self._load_detector_database(detector_database, database_path) if missing_ks else None
+        )
+        database = loaded_database if loaded_database is not None else DetectorDatabase()
+        if parallel_process_count is None:
+            parallel_process_count = cpu_count() // 2 + 1
+
+        circuits: dict[int, stim.Circuit] = {}
+        try:
+            if manhattan_radius > 0 and missing_ks:
+                walker = AnnotateDetectorsOnLayerNode(
+                    missing_ks[0], manhattan_radius, database, lookback, parallel_process_count
+                )
                 try:
-                    detector_database = DetectorDatabase.from_file(database_path)
-                except TQECError as e:
+                    walker.precompute_detectors(self._root, reschedule_measurements, ks=missing_ks)
+                finally:
+                    walker.close()
+            for k in ks:
+                stream = (
+                    self._generate_annotated_circuit_stream(
+                        k, include_qubit_coords, reschedule_measurements
+                    )
+                    if k in self._annotations
+                    else self._generate_circuit_stream(
+                        k,
+                        include_qubit_coords,
+                        manhattan_radius,
+                        database,
+                        lookback,
+                        reschedule_measurements,
+                        parallel_process_count=1,
+                        precompute=False,
+                    )
+                )
+                circuit = stim.Circuit()
+                for circ in stream:
+                    circuit += circ
+                circuits[k] = circuit
+        finally:
+            if loaded_database is not None and database_path is not None:
+                loaded_database.to_file(database_path)
+        return circuits
+
+    @staticmethod
+    def _load_detector_database(
+        detector_database: DetectorDatabase | None, database_path: Path | None
+    ) -> DetectorDatabase | None:
+        """Return the provided database, or the one stored at ``database_path`` if not provided."""
+        if detector_database is None and database_path is not None and database_path.exists():
+            try:
+                detector_database = DetectorDatabase.from_file(database_path)
+            except TQECError as e:
+                warnings.warn(
+                    f"An exception occurred when loading {database_path}: {e}\n"
+                    f"Database not opened.",
+                    TQECWarning,
+                )
+                detector_database = None
+
+        if detector_database is not None:
+            loaded_version = detector_database.version
+            current_version = CURRENT_DATABASE_VERSION
+            if loaded_version != current_version:
+                if database_path is not None and database_path != DEFAULT_DETECTOR_DATABASE_PATH:
+                    raise TQECError(
+                        f"The detector database on disk you have specified is incompatible "
+                        f"with the version in the TQEC code you are running. The version of "
+                        f"the disk database is {loaded_version}, while the version in the "
+                        f"TQEC code is {current_version}."
+                    )
+                else:  # ie using the default
                     warnings.warn(
-                        f"An exception occurred when loading {database_path}: {e}\n"
-                        f"Database not opened.",
+                        f"The default detector database that you have saved on your system is "
+                        f"out of date (version {loaded_version}). The version in the TQEC code "
+                        f"you are running is newer (version {current_version}). The database "
+                        "will be regenerated.",
                         TQECWarning,
                     )
-                    detector_database = None
-
-            if detector_database is not None:
-                loaded_version = detector_database.version
-                current_version = CURRENT_DATABASE_VERSION
-                if loaded_version != current_version:
-                    if (
-                        database_path is not None
-                        and database_path != DEFAULT_DETECTOR_DATABASE_PATH
-                    ):
-                        raise TQECError(
-                            f"The detector database on disk you have specified is incompatible "
-                            f"with the version in the TQEC code you are running. The version of "
-                            f"the disk database is {loaded_version}, while the version in the "
-                            f"TQEC code is {current_version}."
-                        )
-                    else:  # ie using the default
-                        warnings.warn(
-                            f"The default detector database that you have saved on your system is "
-                            f"out of date (version {loaded_version}). The version in the TQEC code "
-                            f"you are running is newer (version {current_version}). The database "
-                            "will be regenerated.",
-                            TQECWarning,
-                        )
-
-            # Enable parallel processing only if the detector database is empty or None,
-            # as current parallelization is effective only in this case.
-            # If we later support efficient parallelism with a populated database,
-            # we will expose the parallel_count parameter to users.
-            parallel_process_count = (
-                cpu_count() // 2 + 1
-                if (detector_database is None or len(detector_database) == 0)
-                else 1
-            )
+        return detector_database
 
-            qubit_map = self._get_global_qubit_map(k, TemplateQubitLister)
-            self._get_annotation(k).qubit_map = qubit_map
+    def _generate_annotated_circuit_stream(
+        self, k: int, include_qubit_coords: bool, reschedule_measurements: bool
+    ) -> Iterator[stim.Circuit]:
+        """Generate the quantum circuit of ``self`` for an already annotated scaling factor."""
+        annotations = self._get_annotation(k)
+        assert annotations.qubit_map is not None
+        if include_qubit_coords:
+            yield annotations.qubit_map.to_circuit()
+        yield from self._root._generate_circuit_stream(
+            k, annotations.qubit_map, reschedule_measurements
+        )
 
-            detectors_walker = (
-                AnnotateDetectorsOnLayerNode(
-                    k,
-                    manhattan_radius,
-                    detector_database,
-                    lookback,
-                    parallel_process_count,
-                )
-                if manhattan_radius > 0
-                else None
-            )
+    def _generate_circuit_stream(
+        self,
+        k: int,
+        include_qubit_coords: bool,
+        manhattan_radius: int,
+        detector_database: DetectorDatabase | None,
+        lookback: int,
+        reschedule_measurements: bool,
+        parallel_process_count: int | None,
+        precompute: bool = True,
+    ) -> Iterator[stim.Circuit]:
+        """Annotate ``self`` for the scaling factor ``k`` while generating its quantum circuit.
 
-            annotations = self._get_annotation(k)
-            assert annotations.qubit_map is not None
+        Args:
+            k: scaling factor.
+            include_qubit_coords: see :meth:`generate_circuit_stream`.
+            manhattan_radius: see :meth:`generate_circuit_stream`.
+            detector_database: database used to compute detectors. It is not
+                saved by this method.
+            lookback: see :meth:`generate_circuit_stream`.
+            reschedule_measurements: see :meth:`generate_circuit_stream`.
+            parallel_process_count: see :meth:`generate_circuit_stream`.
+            precompute: whether to compute all the situations of the tree in one
+                batch before streaming when worker processes are used (i.e. if
+                ``parallel_process_count != 1``). Should be ``False`` if the
+                situations are already in ``detector_database``.
 
-            if include_qubit_coords:
-                yield annotations.qubit_map.to_circuit()
+        """
+        # Situations already in the detector database are looked up before
+        # spawning any worker, so parallel processing only costs something
+        # when there are detectors left to compute.
+        if parallel_process_count is None:
+            parallel_process_count = cpu_count() // 2 + 1
 
-            subtree_to_z = {subtree_root: z for (z, subtree_root) in enumerate(self._root.children)}
+        qubit_map = self._get_global_qubit_map(k, TemplateQubitLister)
+        self._get_annotation(k).qubit_map = qubit_map
 
-            ctx = AnnotationContext(
-                detectors_walker, subtree_to_z, self._abstract_observables, self._observable_builder
+        detectors_walker = (
+            AnnotateDetectorsOnLayerNode(
+                k,
+                manhattan_radius,
+                detector_database,
+                lookback,
+                parallel_process_count,
             )
+            if manhattan_radius > 0
+            else None
+        )
 
-            try:
-                yield from self._root._generate_circuit_stream(
-                    k, annotations.qubit_map, reschedule_measurements, ctx
-                )
-            finally:
-                # The database will have been updated inside the above function
-                # with AnnotateDetectorsOnLayerNode, and here at the end of the
-                # computation we save it to file.
-                if detector_database is not None and database_path is not None:
-                    detector_database.to_file(database_path)
+        annotations = self._get_annotation(k)
+        assert annotations.qubit_map is not None
+
+        if include_qubit_coords:
+            yield annotations.qubit_map.to_circuit()
+
+        subtree_to_z = {subtree_root: z for (z, subtree_root) in enumerate(self._root.children)}
+
+        ctx = AnnotationContext(
+            detectors_walker, subtree_to_z, self._abstract_observables, self._observable_builder
+        )
+
+        try:
+            if detectors_walker is not None and precompute and parallel_process_count != 1:
+                # Compute all the distinct situations of the whole tree in one
+                # batch before streaming, which then only reads the database.
+                # That requires a second walk of the tree, only worth it if the
+                # situations can be computed in parallel.
+                detectors_walker.precompute_detectors(self._root, reschedule_measurements)
+            yield from self._root._generate_circuit_stream(
+                k, annotations.qubit_map, reschedule_measurements, ctx
+            )
+        finally:
+            if detectors_walker is not None:
+                detectors_walker.close()
 
     def _get_annotation(self, k: int) -> LayerTreeAnnotations:
         return self._annotations.setdefault(k, LayerTreeAnnotations())
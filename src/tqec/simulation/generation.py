@@ -35,7 +35,10 @@ def generate_stim_circuits_with_detectors(
                     compiled_graph.generate_stim_circuit(k, noise_model_factory(p)), k, p
                 )
 
-    except that the order in which the results are returned is not guaranteed.
+    except that the order in which the results are returned is not guaranteed
+    and that the circuits for all the values of ``k`` are generated with
+    :meth:`~tqec.compile.graph.TopologicalComputationGraph.generate_stim_circuits`,
+    which computes the detectors of all the values of ``k`` in a single batch.
 
     Args:
         compiled_graph: computation to export to `stim.Circuit` instances.
@@ -69,15 +72,12 @@ def generate_stim_circuits_with_detectors(
 
     """
     noise_models = {p: noise_model_factory(p) for p in ps}
-    circuits = {
-        k: compiled_graph.generate_stim_circuit(
-            k,
-            manhattan_radius=manhattan_radius,
-            detector_database=detector_database,
-            database_path=database_path,
-        )
-        for k in ks
-    }
+    circuits = compiled_graph.generate_stim_circuits(
+        ks,
+        manhattan_radius=manhattan_radius,
+        detector_database=detector_database,
+        database_path=database_path,
+    )
     yield from (
         (nm.noisy_circuit(circuit), k, p)
         for k, circuit in circuits.items()
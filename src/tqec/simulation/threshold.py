@@ -158,12 +158,11 @@ def binary_search_threshold(
     """
     compiled_graph = compile_block_graph(block_graph, convention, [observable])
     ks = tuple(sorted(ks))
-    noiseless_circuits = [
-        compiled_graph.generate_stim_circuit(
-            k, manhattan_radius=manhattan_radius, detector_database=detector_database
-        )
-        for k in ks
-    ]
+    noiseless_circuits = list(
+        compiled_graph.generate_stim_circuits(
+            ks, manhattan_radius=manhattan_radius, detector_database=detector_database
+        ).values()
+    )
     computed_logical_errors: dict[int, list[tuple[float, sinter.Fit]]] = {k: [] for k in ks}
     while not isclose(minp, maxp, rel_tol=rtol, abs_tol=atol):
         midp = (minp + maxp) / 2
@@ -14,6 +14,7 @@ from tqec.templates.enums import TemplateBorder
 from tqec.templates.subtemplates import (
     UniqueSubTemplates,
     get_spatially_distinct_subtemplates,
+    get_spatially_distinct_subtemplates_from_signatures,
 )
 from tqec.utils.position import (
     BlockPosition2D,
@@ -132,11 +133,17 @@ class Template(ABC):
         """Return a representation of the distinct sub-templates of the provided Manhattan radius.
 
         Note:
-            This method will likely be inefficient for large templates (i.e., large
-            values of `k`) or for large Manhattan radiuses, both in terms of memory
-            used and computation time.
-            Subclasses are invited to reimplement that method using a specialized
-            algorithm (or hard-coded values) to speed things up.
+            If ``self`` does not implement :meth:`get_subtemplate_signatures`,
+            this method will likely be inefficient for large templates (i.e.,
+            large values of `k`) or for large Manhattan radiuses, both in terms
+            of memory used and computation time.
+
+            Else, the sub-templates are only computed on an instantiation with
+            a small, ``k``-independent, scaling parameter returned by
+            :meth:`get_subtemplate_signatures_reference_k` and the signatures
+            are used to find the sub-template index of each entry of the
+            instantiation at scale ``k``, without ever instantiating the
+            template at scale ``k``.
 
         Args:
             k: scaling parameter used to instantiate the template.
@@ -152,10 +159,78 @@ class Template(ABC):
             a representation of all the sub-templates found.
 
         """
-        return get_spatially_distinct_subtemplates(  # pragma: no cover
+        reference_k = self.get_subtemplate_signatures_reference_k(manhattan_radius)
+        if reference_k is not None and k > reference_k:
+            # The sub-templates found for large values of k only depend on the
+            # parity of k.
+            reference_k += (k - reference_k) % 2
+            signatures = self.get_subtemplate_signatures(k, manhattan_radius)
+            reference_signatures = self.get_subtemplate_signatures(reference_k, manhattan_radius)
+            if signatures is not None and reference_signatures is not None:
+                reference = get_spatially_distinct_subtemplates(
+                    self.instantiate(reference_k), manhattan_radius, avoid_zero_plaquettes
+                )
+                subtemplates = get_spatially_distinct_subtemplates_from_signatures(
+                    reference, reference_signatures, signatures
+                )
+                if subtemplates is not None:
+                    return subtemplates
+        return get_spatially_distinct_subtemplates(
             self.instantiate(k), manhattan_radius, avoid_zero_plaquettes
         )
 
+    def get_subtemplate_signatures(
+        self, k: int, manhattan_radius: int
+    ) -> npt.NDArray[numpy.int64] | None:
+        """Return a signature for each entry of the template instantiation.
+
+        Signatures are non-negative integers that are computed without
+        instantiating the template and that should verify the following
+        properties:
+
+        1. two entries of ``self.instantiate(k)`` with the same signature are
+           the center of the same sub-template of radius ``manhattan_radius``,
+        2. the signature of an entry only depends on its surroundings, not on
+           the value of ``k`` (i.e., the same surroundings at different values of
+           ``k`` lead to the same signature),
+        3. for any ``k`` larger than the value returned by
+           :meth:`get_subtemplate_signatures_reference_k`, the set of signatures
+           found is only a function of the parity of ``k``.
+
+        Subclasses are invited to implement this method, along with
+        :meth:`get_subtemplate_signatures_reference_k`, to speed up
+        :meth:`get_spatially_distinct_subtemplates`.
+
+        Args:
+            k: scaling parameter used to instantiate the template.
+            manhattan_radius: radius of the considered sub-templates.
+
+        Returns:
+            an array with the same shape as ``self.instantiate(k)`` containing
+            the signature of each entry, or ``None`` if signatures are not
+            available for ``self``. Default to ``None``.
+
+        """
+        return None
+
+    def get_subtemplate_signatures_reference_k(self, manhattan_radius: int) -> int | None:
+        """Return the scaling parameter above which sub-templates only depend on the parity of k.
+
+        See :meth:`get_subtemplate_signatures`.
+
+        Args:
+            manhattan_radius: radius of the considered sub-templates.
+
+        Returns:
+            the smallest scaling parameter ``k_ref`` such that the signatures
+            returned by :meth:`get_subtemplate_signatures` at any ``k >= k_ref``
+            are also found at ``k_ref`` or ``k_ref + 1`` (the one with the same
+            parity as ``k``), or ``None`` if signatures are not available for
+            ``self``. Default to ``None``.
+
+        """
+        return None
+
     def instantiation_origin(self, k: int) -> PlaquettePosition2D:
         """Coordinates of the top-left entry origin.
 
@@ -72,6 +72,7 @@ from typing_extensions import override
 
 from tqec.plaquette.plaquette import Plaquette, Plaquettes
 from tqec.templates.base import RectangularTemplate, Template
+from tqec.templates.subtemplates import get_border_distance_signatures
 from tqec.utils.exceptions import TQECError
 from tqec.utils.frozendefaultdict import FrozenDefaultDict
 from tqec.utils.position import (
@@ -277,6 +278,45 @@ class LayoutTemplate(Template):
             ] = element_instantiation
         return ret
 
+    @override
+    def get_subtemplate_signatures(
+        self, k: int, manhattan_radius: int
+    ) -> npt.NDArray[numpy.int64] | None:
+        element_shape = self._element_scalable_shape.to_numpy_shape(k)
+        # Signature of the entries in positions without any template.
+        empty_signatures = get_border_distance_signatures(element_shape, manhattan_radius)
+        element_signatures: dict[BlockPosition2D, npt.NDArray[numpy.int64]] = {}
+        for pos, element in self._layout.items():
+            signatures = element.get_subtemplate_signatures(k, manhattan_radius)
+            if signatures is None:
+                return None
+            element_signatures[pos] = signatures
+        # Include the block index in the signature because sub-templates close
+        # to a block border depend on the neighbouring blocks.
+        block_count = self._nx * self._ny
+        ret = numpy.zeros(self.shape(k).to_numpy_shape(), dtype=numpy.int64)
+        for y in range(self._ny):
+            for x in range(self._nx):
+                pos = BlockPosition2D(x + self._block_origin.x, y + self._block_origin.y)
+                signatures = element_signatures.get(pos, empty_signatures)
+                ret[
+                    y * element_shape[0] : (y + 1) * element_shape[0],
+                    x * element_shape[1] : (x + 1) * element_shape[1],
+                ] = signatures * block_count + (y * self._nx + x)
+        return ret
+
+    @override
+    def get_subtemplate_signatures_reference_k(self, manhattan_radius: int) -> int | None:
+        reference_ks = [
+            element.get_subtemplate_signatures_reference_k(manhattan_radius)
+            for element in self._layout.values()
+        ]
+        if any(reference_k is None for reference_k in reference_ks):
+            return None
+        # Entries without any template need a reference_k that is at least the
+        # one of QubitTemplate.
+        return max([2 * manhattan_radius + 2, *(k for k in reference_ks if k is not None)])
+
     @override
     def instantiation_origin(self, k: int) -> PlaquettePosition2D:
         return self._block_origin.get_top_left_plaquette_position(self.element_shape(k))
@@ -8,6 +8,7 @@ from typing_extensions import override
 
 from tqec.templates.base import BorderIndices, RectangularTemplate
 from tqec.templates.enums import TemplateBorder
+from tqec.templates.subtemplates import get_border_distance_signatures
 from tqec.utils.exceptions import TQECError
 from tqec.utils.scale import LinearFunction, PlaquetteScalable2D
 
@@ -70,6 +71,16 @@ class QubitTemplate(RectangularTemplate):
     def expected_plaquettes_number(self) -> int:
         return 14
 
+    @override
+    def get_subtemplate_signatures(
+        self, k: int, manhattan_radius: int
+    ) -> npt.NDArray[numpy.int64] | None:
+        return get_border_distance_signatures(self.shape(k).to_numpy_shape(), manhattan_radius)
+
+    @override
+    def get_subtemplate_signatures_reference_k(self, manhattan_radius: int) -> int | None:
+        return 2 * manhattan_radius + 2
+
     @override
     def get_border_indices(self, border: TemplateBorder) -> BorderIndices:
         match border:
@@ -173,6 +184,29 @@ class QubitSpatialCubeTemplate(RectangularTemplate):
     def expected_plaquettes_number(self) -> int:
         return 24
 
+    @override
+    def get_subtemplate_signatures(
+        self, k: int, manhattan_radius: int
+    ) -> npt.NDArray[numpy.int64] | None:
+        shape = self.shape(k).to_numpy_shape()
+        signatures = get_border_distance_signatures(shape, manhattan_radius)
+        # On top of the distance to the borders, the bulk depends on the
+        # position with respect to the two diagonals. The signs of the offsets
+        # to the diagonals are constant in a sub-template whose center is at an
+        # offset larger than 2 * manhattan_radius, so clip them.
+        clip = 2 * manhattan_radius + 1
+        i = numpy.arange(shape[0], dtype=numpy.int64)[:, numpy.newaxis]
+        j = numpy.arange(shape[1], dtype=numpy.int64)[numpy.newaxis, :]
+        main_diagonal_offset = numpy.clip(i - j, -clip, clip) + clip
+        anti_diagonal_offset = numpy.clip(i + j - (shape[1] - 1), -clip, clip) + clip
+        return (signatures * (2 * clip + 1) + main_diagonal_offset) * (
+            2 * clip + 1
+        ) + anti_diagonal_offset
+
+    @override
+    def get_subtemplate_signatures_reference_k(self, manhattan_radius: int) -> int | None:
+        return 4 * manhattan_radius + 4
+
     @override
     def get_border_indices(self, border: TemplateBorder) -> BorderIndices:
         match border:
@@ -230,6 +264,16 @@ class QubitVerticalBorders(RectangularTemplate):
     def expected_plaquettes_number(self) -> int:
         return 8
 
+    @override
+    def get_subtemplate_signatures(
+        self, k: int, manhattan_radius: int
+    ) -> npt.NDArray[numpy.int64] | None:
+        return get_border_distance_signatures(self.shape(k).to_numpy_shape(), manhattan_radius)
+
+    @override
+    def get_subtemplate_signatures_reference_k(self, manhattan_radius: int) -> int | None:
+        return 2 * manhattan_radius + 2
+
     @override
     def get_border_indices(self, border: TemplateBorder) -> BorderIndices:
         match border:
@@ -283,6 +327,16 @@ class QubitHorizontalBorders(RectangularTemplate):
     def expected_plaquettes_number(self) -> int:
         return 8
 
+    @override
+    def get_subtemplate_signatures(
+        self, k: int, manhattan_radius: int
+    ) -> npt.NDArray[numpy.int64] | None:
+        return get_border_distance_signatures(self.shape(k).to_numpy_shape(), manhattan_radius)
+
+    @override
+    def get_subtemplate_signatures_reference_k(self, manhattan_radius: int) -> int | None:
+        return 2 * manhattan_radius + 2
+
     @override
     def get_border_indices(self, border: TemplateBorder) -> BorderIndices:
         match border:
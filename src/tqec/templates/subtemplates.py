@@ -8,6 +8,7 @@ from dataclasses import dataclass
 
 import numpy
 import numpy.typing as npt
+from numpy.lib.stride_tricks import sliding_window_view
 
 from tqec.utils.exceptions import TQECError
 
@@ -138,40 +139,36 @@ def get_spatially_distinct_subtemplates(
         - :math:`m` the height of the provided ``instantiation`` array,
         - :math:`r` the provided Manhattan radius,
 
-        it takes of the order of :math:`n m (2r+1)^2` memory and has to sort an
-        array of :math:`nm` elements of size :math:`(2r+1)^2` in lexicographic
-        order so require, in the worst case,
-        :math:`O\left(nm\log(nm) (2r+1)^2\right)` runtime.
+        it takes of the order of :math:`n m (2r+1)^2` memory. Each of the
+        :math:`nm` sub-templates is hashed to a single integer, which requires
+        :math:`O\left(nm (2r+1)^2\right)` vectorised operations, and the
+        :math:`nm` resulting hashes are sorted, requiring
+        :math:`O\left(nm\log(nm)\right)` runtime.
 
         Subclasses are invited to reimplement that method using a specialized
         algorithm (or hard-coded values) to speed things up.
 
-        Some timings obtained on an AMD Ryzen 9 5950X: ::
+        Some timings obtained with ``benchmarks/spatially_distinct_subtemplates.py``: ::
 
             k = 10
             ----------------------------------------------------------------------
             radius   =         0 |         1 |         2 |         3 |         4
-            time (s) =  0.000776 |  0.000992 |   0.00151 |   0.00227 |   0.00321
-            ----------------------------------------------------------------------
-            k = 20
-            ----------------------------------------------------------------------
-            radius   =         0 |         1 |         2 |         3 |         4
-            time (s) =   0.00202 |   0.00356 |   0.00672 |    0.0116 |    0.0173
+            time (s) =  0.000229 |  0.000224 |  0.000267 |  0.000356 |  0.000535
             ----------------------------------------------------------------------
             k = 40
             ----------------------------------------------------------------------
             radius   =         0 |         1 |         2 |         3 |         4
-            time (s) =   0.00778 |    0.0156 |    0.0326 |    0.0574 |    0.0889
+            time (s) =  0.000514 |  0.000938 |   0.00188 |   0.00389 |     0.005
             ----------------------------------------------------------------------
-            k = 80
+            k = 160
             ----------------------------------------------------------------------
             radius   =         0 |         1 |         2 |         3 |         4
-            time (s) =    0.0318 |    0.0706 |     0.147 |      0.27 |     0.426
+            time (s) =   0.00873 |    0.0166 |    0.0304 |    0.0515 |    0.0829
             ----------------------------------------------------------------------
-            k = 160
+            k = 500
             ----------------------------------------------------------------------
             radius   =         0 |         1 |         2 |         3 |         4
-            time (s) =     0.139 |     0.309 |     0.651 |      1.25 |      1.98
+            time (s) =    0.0737 |     0.172 |     0.322 |     0.529 |      1.05
             ----------------------------------------------------------------------
 
     Args:
@@ -189,58 +186,188 @@ def get_spatially_distinct_subtemplates(
 
     """
     y, x = instantiation.shape
+    width = 2 * manhattan_radius + 1
     extended_instantiation = numpy.pad(
         instantiation, manhattan_radius, "constant", constant_values=0
     )
-
-    all_possible_subarrays: list[SubTemplateType] = []
-    ignored_flattened_indices: list[int] = []
-    considered_flattened_indices: list[int] = []
-    for i in range(manhattan_radius, manhattan_radius + y):
-        for j in range(manhattan_radius, manhattan_radius + x):
-            # Do not generate anything if the center plaquette is 0 in the
-            # original instantiation.
-            if avoid_zero_plaquettes and extended_instantiation[i, j] == 0:
-                ignored_flattened_indices.append(
-                    (i - manhattan_radius) * x + (j - manhattan_radius)
-                )
-                continue
-            considered_flattened_indices.append((i - manhattan_radius) * x + (j - manhattan_radius))
-            all_possible_subarrays.append(
-                extended_instantiation[
-                    i - manhattan_radius : i + manhattan_radius + 1,
-                    j - manhattan_radius : j + manhattan_radius + 1,
-                ]
-            )
-    # Shape of the array provided to numpy.unique:
-    #    (x * y, 2 * manhattan_radius + 1, 2 * manhattan_radius + 1)
-    # Calling numpy.unique
-    unique_situations, inverse_indices = numpy.unique(
-        all_possible_subarrays, axis=0, return_inverse=True
+    # View of shape (y * x, width * width) where each row is the flattened
+    # sub-template centered on the corresponding entry of ``instantiation``. No
+    # copy is performed until the rows are indexed below.
+    all_possible_subarrays = sliding_window_view(extended_instantiation, (width, width)).reshape(
+        y * x, width * width
     )
+    considered: npt.NDArray[numpy.bool_] | None = None
+    if avoid_zero_plaquettes:
+        # Do not generate anything if the center plaquette is 0 in the
+        # original instantiation.
+        considered = instantiation.reshape(y * x) != 0
+        all_possible_subarrays = all_possible_subarrays[considered]
+    unique_situations, inverse_indices = _unique_rows(all_possible_subarrays)
 
     # Note that the `inverse_indices` DO NOT include the ignored sub-templates because
     # their center was a 0 plaquette if `avoid_zero_plaquettes` is `True` so we
-    # should reconstruct the full indices from `inverse_indices` and
-    # `ignored_flattened_indices`.
+    # should reconstruct the full indices from `inverse_indices` and `considered`.
     # By convention, the index 0 will represent the ignored sub-templates, so we
     # also have to shift the `inverse_indices` and `unique_situations` keys by 1.
     # Start by shifting by 1.
     inverse_indices += 1
     subtemplates_by_indices = {
-        i + 1: typing.cast(npt.NDArray[numpy.int_], situation)
-        for i, situation in enumerate(unique_situations)
+        i + 1: situation.reshape(width, width) for i, situation in enumerate(unique_situations)
     }
     final_indices: npt.NDArray[numpy.int_]
-    if avoid_zero_plaquettes:
+    if considered is not None:
         final_indices = numpy.zeros((y * x,), dtype=numpy.int_)
-        final_indices[ignored_flattened_indices] = 0
-        final_indices[considered_flattened_indices] = inverse_indices
+        final_indices[considered] = inverse_indices
     else:
-        final_indices = inverse_indices.astype(numpy.int_)
+        final_indices = inverse_indices
     return UniqueSubTemplates(final_indices.reshape((y, x)), subtemplates_by_indices)
 
 
+def get_border_distance_signatures(
+    shape: tuple[int, int], manhattan_radius: int
+) -> npt.NDArray[numpy.int64]:
+    """Return sub-template signatures for templates that only depend on the distance to borders.
+
+    The returned signature of each entry encodes its distance to each of the 4
+    borders, clipped to ``2 * manhattan_radius + 2``, and the parity of its row
+    and column indices. This is enough to characterise the sub-templates of
+    radius ``manhattan_radius`` of any template that is made of a bulk repeating
+    with a period of 2 in both dimensions and of borders (and entries directly
+    next to borders) that are possibly different. The clipping distance is
+    larger than needed for such templates alone to also be able to distinguish
+    entries that see, through a border, a template with diagonal features (see
+    :class:`~tqec.templates.qubit.QubitSpatialCubeTemplate`) in a
+    :class:`~tqec.templates.layout.LayoutTemplate`.
+
+    See :meth:`~tqec.templates.base.Template.get_subtemplate_signatures` for
+    more information about signatures.
+
+    Args:
+        shape: shape of the template instantiation, as returned by
+            ``numpy.shape``.
+        manhattan_radius: radius of the considered sub-templates.
+
+    Returns:
+        an array of shape ``shape`` containing the signature of each entry.
+
+    """
+    clip = 2 * manhattan_radius + 2
+
+    def axis_signatures(size: int) -> npt.NDArray[numpy.int64]:
+        indices = numpy.arange(size, dtype=numpy.int64)
+        before = numpy.minimum(indices, clip)
+        after = numpy.minimum(size - 1 - indices, clip)
+        return (before * (clip + 1) + after) * 2 + indices % 2
+
+    y, x = shape
+    axis_range = 2 * (clip + 1) ** 2
+    return axis_signatures(y)[:, numpy.newaxis] * axis_range + axis_signatures(x)[numpy.newaxis, :]
+
+
+def get_spatially_distinct_subtemplates_from_signatures(
+    reference: UniqueSubTemplates,
+    reference_signatures: npt.NDArray[numpy.int64],
+    signatures: npt.NDArray[numpy.int64],
+) -> UniqueSubTemplates | None:
+    """Return the distinct sub-templates of a template from the ones of a smaller instantiation.
+
+    Two entries with the same signature are guaranteed to be the center of the
+    same sub-template. The sub-templates of an instantiation can then be
+    recovered from the sub-templates of a smaller ``reference`` instantiation of
+    the same template by matching signatures, without having to look at the
+    sub-templates of the (potentially large) instantiation.
+
+    The returned instance is exactly equal to the one that would be returned by
+    :func:`get_spatially_distinct_subtemplates` on the instantiation from which
+    ``signatures`` has been computed, including the indices used for each
+    sub-template.
+
+    Args:
+        reference: sub-templates of the reference instantiation, as returned by
+            :func:`get_spatially_distinct_subtemplates`.
+        reference_signatures: signatures of each entry of the reference
+            instantiation. Should have the same shape as
+            ``reference.subtemplate_indices``.
+        signatures: signatures of each entry of the instantiation for which the
+            sub-templates should be computed.
+
+    Returns:
+        the sub-templates corresponding to ``signatures``, or ``None`` if one of
+        the provided ``signatures`` cannot be found in ``reference_signatures``.
+
+    """
+    reference_signatures = reference_signatures.reshape(-1)
+    reference_indices = reference.subtemplate_indices.reshape(-1)
+    order = numpy.argsort(reference_signatures, kind="stable")
+    sorted_reference_signatures = reference_signatures[order]
+    positions = numpy.searchsorted(sorted_reference_signatures, signatures.reshape(-1))
+    positions = numpy.minimum(positions, sorted_reference_signatures.size - 1)
+    if not numpy.array_equal(sorted_reference_signatures[positions], signatures.reshape(-1)):
+        return None
+    indices = reference_indices[order[positions]]
+    # Only keep the sub-templates that are used, re-indexing them to keep the
+    # lexicographic order of get_spatially_distinct_subtemplates.
+    used = numpy.bincount(indices, minlength=len(reference.subtemplates) + 1) > 0
+    used[0] = False
+    old_indices = numpy.flatnonzero(used)
+    new_indices = numpy.zeros(used.size, dtype=numpy.int_)
+    new_indices[old_indices] = numpy.arange(1, old_indices.size + 1)
+    return UniqueSubTemplates(
+        new_indices[indices].reshape(signatures.shape),
+        {int(new_indices[old]): reference.subtemplates[int(old)] for old in old_indices.tolist()},
+    )
+
+
+def _unique_rows(
+    rows: npt.NDArray[numpy.int_],
+) -> tuple[npt.NDArray[numpy.int_], npt.NDArray[numpy.int_]]:
+    """Return the unique rows of a 2-dimensional array and the indices to reconstruct it.
+
+    This function is equivalent to
+    ``numpy.unique(rows, axis=0, return_inverse=True)``, including the
+    lexicographic order of the returned unique rows, but is significantly faster
+    for arrays with a lot of rows and few unique rows.
+
+    Each row is first hashed to a single integer using random (but fixed)
+    weights, which only requires a 1-dimensional :func:`numpy.unique` call. The
+    unique rows are then checked against the input to detect hash collisions,
+    in which case a slower exact method is used. Finally, the (few) unique rows
+    are sorted in lexicographic order.
+
+    Args:
+        rows: a 2-dimensional array of integers.
+
+    Returns:
+        a tuple ``(unique_rows, inverse)`` such that ``unique_rows`` contains the
+        unique rows of ``rows`` in lexicographic order and
+        ``unique_rows[inverse] == rows``.
+
+    """
+    if rows.shape[0] == 0:
+        return rows[:0].astype(numpy.int_), numpy.zeros((0,), dtype=numpy.int_)
+    rows = numpy.ascontiguousarray(rows, dtype=numpy.int_)
+    weights = numpy.random.default_rng(0x7EC).integers(
+        1, 2**62, size=rows.shape[1], dtype=numpy.int64
+    )
+    # Integer overflows wrap around, which is fine for hashing purposes.
+    hashes = rows.astype(numpy.int64, copy=False) @ weights
+    _, first_indices, inverse = numpy.unique(hashes, return_index=True, return_inverse=True)
+    unique_rows = rows[first_indices]
+    if not numpy.array_equal(unique_rows[inverse], rows):
+        # Hash collision: fall back to an exact, byte-wise, unique computation.
+        void_rows = rows.view(numpy.dtype((numpy.void, rows.dtype.itemsize * rows.shape[1])))
+        _, first_indices, inverse = numpy.unique(
+            void_rows.reshape(-1), return_index=True, return_inverse=True
+        )
+        unique_rows = rows[first_indices]
+    # Sort the unique rows in lexicographic order and update the inverse indices
+    # accordingly.
+    order = numpy.lexsort(unique_rows.T[::-1])
+    ranks = numpy.empty_like(order)
+    ranks[order] = numpy.arange(order.size)
+    return unique_rows[order], ranks[inverse.reshape(-1)].astype(numpy.int_)
+
+
 @dataclass(frozen=True)
 class Unique3DSubTemplates:
     """Stores the 3D sub-templates of a specific Manhattan radius in some templates.
@@ -287,7 +414,7 @@ class Unique3DSubTemplates:
         zero = tuple(0 for _ in range(t))
         indices: frozenset[tuple[int, ...]] = frozenset(
             typing.cast(tuple[int, ...], tuple(arr))
-            for arr in numpy.unique(self.subtemplate_indices.reshape(n * m, t), axis=0)
+            for arr in _unique_rows(self.subtemplate_indices.reshape(n * m, t))[0]
             if tuple(arr) != zero
         )
         if not indices.issubset(self.subtemplates.keys()):
@@ -348,10 +475,10 @@ def get_spatially_distinct_3d_subtemplates(
         - :math:`t` the number of time slices (``len(instantiations)``),
         - :math:`r` the provided Manhattan radius,
 
-        it takes of the order of up to :math:`nmt(2r+1)^2` memory, has to sort
-        :math:`t` arrays of :math:`nm` elements of size :math:`(2r+1)^2` in
-        lexicographic order, so require, in the worst case,
-        :math:`O\left(tnm\log(nm)(2r+1)^2\right)` runtime.
+        it takes of the order of up to :math:`nmt(2r+1)^2` memory and has to
+        hash and sort :math:`t` arrays of :math:`nm` sub-templates of size
+        :math:`(2r+1)^2`, so require, in the worst case,
+        :math:`O\left(tnm\left(\log(nm) + (2r+1)^2\right)\right)` runtime.
 
     Warning:
         This function assumes that the provided ``instantiations`` are compatible
@@ -387,14 +514,33 @@ def get_spatially_distinct_3d_subtemplates(
         )
         for i, inst in enumerate(instantiations)
     ]
+    return stack_spatially_distinct_subtemplates(unique_2d_subtemplates)
+
 
+def stack_spatially_distinct_subtemplates(
+    unique_2d_subtemplates: Sequence[UniqueSubTemplates],
+) -> Unique3DSubTemplates:
+    """Stack 2-dimensional sub-templates into 3-dimensional sub-templates.
+
+    Args:
+        unique_2d_subtemplates: the sub-templates of each time slice, computed
+            with ``avoid_zero_plaquettes=False``. All the entries should have
+            the same shape and the same Manhattan radius, and should represent
+            template instantiations that are compatible with each other (see
+            :func:`get_spatially_distinct_3d_subtemplates`).
+
+    Returns:
+        a representation of all the 3-dimensional sub-templates found.
+
+    """
+    manhattan_radius = unique_2d_subtemplates[0].manhattan_radius
     subtemplates_indices = numpy.stack(
         [u2ds.subtemplate_indices for u2ds in unique_2d_subtemplates], axis=2
     )
     n, m, t = subtemplates_indices.shape
     subtemplates: dict[tuple[int, ...], npt.NDArray[numpy.int_]] = {}
 
-    unique_3d_indices = numpy.unique(subtemplates_indices.reshape(n * m, t), axis=0)
+    unique_3d_indices, _ = _unique_rows(subtemplates_indices.reshape(n * m, t))
     # We might have 0 indices on some 2-dimensional slices. Because 0 will not be
     # a valid index for the 2-dimensional subtemplates we got from
     # get_spatially_distinct_subtemplates, pre-generate the corresponding array.
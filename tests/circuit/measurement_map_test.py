@@ -84,3 +84,32 @@ def test_with_added_measurements() -> None:
         GridQubit(1, 1): [-28, -25, -22, -19, -16, -13, -10, -7, -4, -1],
         GridQubit(2, 2): [-29, -26, -23, -20, -17, -14, -11, -8, -5, -2],
     }
+
+
+def test_with_added_measurements_sparse_offsets() -> None:
+    q0, q1 = GridQubit(0, 0), GridQubit(1, 1)
+    rec_map = MeasurementRecordsMap({q0: [-3]})
+    assert rec_map.with_added_measurements(MeasurementRecordsMap({q1: [-1]})) == (
+        MeasurementRecordsMap({q0: [-4], q1: [-1]})
+    )
+    # Offsets of the added map span more than its number of measurements.
+    assert MeasurementRecordsMap({q1: [-4]}).with_added_measurements(rec_map, 2) == (
+        MeasurementRecordsMap({q0: [-4, -3], q1: [-6]})
+    )
+    with pytest.raises(
+        TQECError,
+        match=r"^At least one measurement record offset has been found "
+        r"twice in the provided offsets.$",
+    ):
+        MeasurementRecordsMap({q1: [-1]}).with_added_measurements(MeasurementRecordsMap({q0: [-2]}))
+
+
+def test_measurement_records_map_equality() -> None:
+    qubit_map = QubitMap({i: GridQubit(i, i) for i in range(3)})
+    rec_map = MeasurementRecordsMap.from_circuit(stim.Circuit("M 0 2 1"), qubit_map)
+    assert rec_map == MeasurementRecordsMap(
+        {GridQubit(0, 0): [-3], GridQubit(1, 1): [-1], GridQubit(2, 2): [-2]}
+    )
+    assert rec_map != MeasurementRecordsMap({GridQubit(0, 0): [-3]})
+    assert rec_map.num_measurements == 3
+    assert MeasurementRecordsMap().with_added_measurements(rec_map, 4).num_measurements == 12
@@ -287,3 +287,17 @@ def test_moment_with_mapped_qubit_indices() -> None:
         OBSERVABLE_INCLUDE(1) rec[-2]
         """
     )
+
+
+def test_moment_with_mapped_qubit_indices_lookup_table() -> None:
+    qubit_index_map = {0: 3, 2: 7}
+    table = Moment.qubit_index_lookup_table(qubit_index_map)
+    assert table.tolist() == [3, 1, 7]
+    moment = Moment(stim.Circuit("H 0 1\nCX 2 4\nDETECTOR(0, 0) rec[-1]"))
+    mapped_moment = moment.with_mapped_qubit_indices({0: 3, 1: 1, 2: 7, 4: 4}, _lookup_table=table)
+    assert mapped_moment.circuit == stim.Circuit("H 3 1\nCX 7 4\nDETECTOR(0, 0) rec[-1]")
+    assert mapped_moment.qubits_indices == {1, 3, 4, 7}
+    annotations = Moment(stim.Circuit("DETECTOR(0, 0) rec[-1]"))
+    mapped_annotations = annotations.with_mapped_qubit_indices({})
+    assert mapped_annotations.circuit == annotations.circuit
+    assert mapped_annotations.circuit is not annotations.circuit
@@ -1,5 +1,6 @@
 import re
 
+import numpy
 import pytest
 import stim
 
@@ -39,6 +40,14 @@ def test_qubit_map_creation() -> None:
         QubitMap.from_circuit(stim.Circuit("QUBIT_COORDS(0, 0) 0\nQUBIT_COORDS(0, 0) 1"))
 
 
+def test_qubit_map_from_qubit_coordinates() -> None:
+    coordinates = numpy.array([(3, -1), (0, 2), (-2, 5), (0, 2), (3, -4), (0, -1)])
+    assert QubitMap.from_qubit_coordinates(coordinates) == QubitMap.from_qubits(
+        sorted({GridQubit(x, y) for x, y in coordinates.tolist()})
+    )
+    assert QubitMap.from_qubit_coordinates(numpy.empty((0, 2), dtype=numpy.int64)) == QubitMap()
+
+
 def test_qubit_map_getters() -> None:
     assert frozenset(QubitMap().indices) == frozenset()
     assert frozenset(QubitMap().qubits) == frozenset()
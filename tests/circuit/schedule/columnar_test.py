@@ -0,0 +1,93 @@
+import numpy
+import pytest
+import stim
+
+from tqec.circuit.moment import MultipleOperationsOnSameQubitError
+from tqec.circuit.qubit import GridQubit
+from tqec.circuit.schedule.circuit import ScheduledCircuit
+from tqec.circuit.schedule.columnar import ColumnarScheduledCircuit
+from tqec.circuit.schedule.manipulation import (
+    merge_scheduled_circuits,
+    relabel_circuits_qubit_indices,
+)
+from tqec.utils.exceptions import TQECError
+from tqec.utils.position import Shift2D
+
+_CIRCUIT = ScheduledCircuit.from_circuit(
+    stim.Circuit(
+        """
+        QUBIT_COORDS(0, 0) 0
+        QUBIT_COORDS(1, 1) 1
+        QUBIT_COORDS(2, 0) 2
+        QUBIT_COORDS(3, 3) 3
+        RX 0 2
+        R 1
+        TICK
+        CX 0 1
+        TICK
+        CX 2 1
+        TICK
+        M !1
+        MX 0 2
+        """
+    )
+)
+
+
+def test_columnar_scheduled_circuit_round_trip() -> None:
+    columnar = ColumnarScheduledCircuit.from_scheduled_circuit(_CIRCUIT)
+    assert columnar.schedules.tolist() == [0, 0, 0, 1, 2, 3, 3, 3]
+    assert columnar.to_scheduled_circuit() == _CIRCUIT
+
+
+def test_columnar_scheduled_circuit_tile() -> None:
+    offsets = [Shift2D(0, 0), Shift2D(2, 0), Shift2D(4, 4)]
+    columnar = ColumnarScheduledCircuit.from_scheduled_circuit(_CIRCUIT).tile(
+        numpy.array([(s.x, s.y) for s in offsets]), numpy.arange(len(offsets))
+    )
+    mergeable_instructions = frozenset(["RX", "MX"])
+    circuits, qubit_map = relabel_circuits_qubit_indices(
+        [_CIRCUIT.map_to_qubits(lambda q, s=s: q + s, inplace_qubit_map=False) for s in offsets]
+    )
+    expected = merge_scheduled_circuits(circuits, qubit_map, mergeable_instructions)
+    circuit = columnar.to_scheduled_circuit(mergeable_instructions)
+    assert circuit == expected
+    assert circuit.get_circuit() == expected.get_circuit()
+    with pytest.raises(MultipleOperationsOnSameQubitError):
+        columnar.to_scheduled_circuit()
+
+
+def test_columnar_scheduled_circuit_concatenate() -> None:
+    columnar = ColumnarScheduledCircuit.concatenate(
+        [
+            ColumnarScheduledCircuit.from_scheduled_circuit(_CIRCUIT),
+            ColumnarScheduledCircuit.from_scheduled_circuit(
+                ScheduledCircuit.from_circuit(
+                    stim.Circuit("QUBIT_COORDS(5, 5) 0\nQUBIT_COORDS(6, 6) 1\nCZ 0 1"), 1
+                )
+            ),
+        ]
+    )
+    circuit = columnar.to_scheduled_circuit()
+    assert circuit.qubits == _CIRCUIT.qubits | {GridQubit(5, 5), GridQubit(6, 6)}
+    assert circuit.moment_at_schedule(1).circuit == stim.Circuit("CX 0 1\nCZ 4 5")
+    assert ColumnarScheduledCircuit.concatenate([]).to_scheduled_circuit().is_empty()
+
+
+def test_columnar_scheduled_circuit_unsupported_instructions() -> None:
+    with pytest.raises(TQECError):
+        ColumnarScheduledCircuit.from_scheduled_circuit(
+            ScheduledCircuit.from_circuit(
+                stim.Circuit("QUBIT_COORDS(0, 0) 0\nM 0\nDETECTOR rec[-1]")
+            )
+        )
+    with pytest.raises(TQECError):
+        ColumnarScheduledCircuit.from_scheduled_circuit(
+            ScheduledCircuit.from_circuit(
+                stim.Circuit("QUBIT_COORDS(0, 0) 0\nQUBIT_COORDS(0, 1) 1\nMPP X0*X1")
+            )
+        )
+    with pytest.raises(TQECError):
+        ColumnarScheduledCircuit.from_scheduled_circuit(
+            ScheduledCircuit.from_circuit(stim.Circuit("QUBIT_COORDS(0, 0) 0\nH[tag] 0"))
+        )
@@ -1,6 +1,7 @@
 import pytest
 import stim
 
+from tqec.circuit.moment import MultipleOperationsOnSameQubitError
 from tqec.circuit.qubit import GridQubit
 from tqec.circuit.qubit_map import QubitMap
 from tqec.circuit.schedule.circuit import ScheduledCircuit
@@ -107,6 +108,32 @@ def test_merge_scheduled_circuits() -> None:
     )
 
 
+def test_merge_scheduled_circuits_invalid_moments() -> None:
+    circuits = [
+        ScheduledCircuit.from_circuit(stim.Circuit("QUBIT_COORDS(0, 0) 0\nH 0")),
+        ScheduledCircuit.from_circuit(stim.Circuit("QUBIT_COORDS(0, 0) 0\nX 0")),
+    ]
+    qubit_map = QubitMap({0: GridQubit(0, 0)})
+    with pytest.raises(MultipleOperationsOnSameQubitError):
+        merge_scheduled_circuits(circuits, qubit_map)
+    with pytest.raises(MultipleOperationsOnSameQubitError):
+        merge_scheduled_circuits(circuits, qubit_map, mergeable_instructions=["H"])
+
+    circuit = merge_scheduled_circuits(
+        [
+            ScheduledCircuit.from_circuit(
+                stim.Circuit("QUBIT_COORDS(0, 0) 0\nQUBIT_COORDS(1, 1) 1\nCX sweep[0] 0\nM !1"), 2
+            ),
+            ScheduledCircuit.from_circuit(stim.Circuit("QUBIT_COORDS(0, 0) 0\nM 0\nTICK\nH 0")),
+        ],
+        QubitMap({0: GridQubit(0, 0), 1: GridQubit(1, 1)}),
+        mergeable_instructions=["M"],
+    )
+    assert circuit.get_circuit() == stim.Circuit(
+        "QUBIT_COORDS(0, 0) 0\nQUBIT_COORDS(1, 1) 1\nM 0\nTICK\nH 0\nTICK\nCX sweep[0] 0\nM !1"
+    )
+
+
 def test_merge_instructions() -> None:
     circuit = stim.Circuit("H 0 1 2\nCX 3 4\nH 5 7")
     instructions: list[stim.CircuitInstruction] = []
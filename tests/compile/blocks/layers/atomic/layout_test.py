@@ -1,19 +1,25 @@
 from typing import Final
 
 import pytest
+import stim
 
-from tqec.compile.blocks.layers.atomic.layout import LayoutLayer
+from tqec.compile.blocks.layers.atomic.layout import (
+    LayoutLayer,
+    _generate_local_circuit,  # pyright: ignore[reportPrivateUsage]
+)
 from tqec.compile.blocks.layers.atomic.plaquettes import PlaquetteLayer
 from tqec.compile.blocks.positioning import LayoutPosition2D
+from tqec.plaquette._test_utils import make_surface_code_plaquette
 from tqec.plaquette.plaquette import Plaquettes
 from tqec.plaquette.rpng.rpng import RPNGDescription
 from tqec.plaquette.rpng.translators.default import DefaultRPNGTranslator
 from tqec.templates._testing import FixedTemplate
 from tqec.templates.layout import LayoutTemplate
 from tqec.templates.qubit import QubitTemplate
+from tqec.utils.enums import Basis
 from tqec.utils.exceptions import TQECError
 from tqec.utils.frozendefaultdict import FrozenDefaultDict
-from tqec.utils.position import BlockPosition2D
+from tqec.utils.position import BlockPosition2D, Shift2D
 from tqec.utils.scale import LinearFunction, PhysicalQubitScalable2D
 
 LOGICAL_QUBIT_SIDE: Final = LinearFunction(4, 5)
@@ -177,3 +183,50 @@ def test_scalable_num_moments(
         ).scalable_num_moments
         == plaquette_layer.scalable_num_moments
     )
+
+
+def test_to_circuit_translation_invariant() -> None:
+    layer = PlaquetteLayer(
+        QubitTemplate(),
+        Plaquettes(FrozenDefaultDict({}, default_value=make_surface_code_plaquette(Basis.Z))),
+    )
+
+    def _layout(x: int, y: int) -> LayoutLayer:
+        return LayoutLayer(
+            {
+                LayoutPosition2D.from_block_position(BlockPosition2D(x, y)): layer,
+                LayoutPosition2D.from_block_position(BlockPosition2D(x + 1, y)): layer,
+            },
+            LOGICAL_QUBIT_SHAPE,
+        )
+
+    circuit = _layout(0, 0).to_circuit(2)
+    hits = _generate_local_circuit.cache_info().hits
+    translated = _layout(2, 3).to_circuit(2)
+    assert _generate_local_circuit.cache_info().hits == hits + 1
+    # The shift between the two layouts is (2 * 12, 3 * 12) qubits for k=2.
+    assert translated.qubits == frozenset(q + Shift2D(24, 36) for q in circuit.qubits)
+    assert list(translated.moments) == list(circuit.moments)
+    # Mutating a returned circuit does not modify the cached one.
+    translated.append_annotation(stim.CircuitInstruction("DETECTOR", [stim.target_rec(-1)]))
+    assert list(_layout(0, 0).to_circuit(2).moments) == list(circuit.moments)
+
+
+@pytest.mark.parametrize("k", [1, 2, 4])
+def test_qubits(k: int) -> None:
+    layer = PlaquetteLayer(
+        QubitTemplate(),
+        Plaquettes(FrozenDefaultDict({}, default_value=make_surface_code_plaquette(Basis.Z))),
+    )
+    layout = LayoutLayer(
+        {
+            LayoutPosition2D.from_block_position(BlockPosition2D(1, -1)): layer,
+            LayoutPosition2D.from_block_position(BlockPosition2D(2, -1)): layer,
+            LayoutPosition2D.from_block_position(BlockPosition2D(2, 0)): layer,
+        },
+        LOGICAL_QUBIT_SHAPE,
+    )
+    qubits = layout.to_circuit(k).qubits
+    assert layout.qubits(k) == qubits
+    coordinates = layout.qubit_coordinates(k)
+    assert coordinates.tolist() == sorted([q.x, q.y] for q in qubits)
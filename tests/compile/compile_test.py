@@ -361,6 +361,19 @@ def test_compile_move_rotation(
     )
 
 
+def test_compile_move_rotation_adaptive_radius_database() -> None:
+    # Situations stored with a radius of 1 by a previous run have not been
+    # checked to be sufficient and should not be used for a radius of 2.
+    compiled_graph = compile_block_graph(move_rotation(Basis.Z), FIXED_BOUNDARY_CONVENTION)
+    expected = compiled_graph.generate_stim_circuit(1, manhattan_radius=2, database_path=None)
+    database = DetectorDatabase(adaptive_radius=True)
+    for manhattan_radius in (1, 2):
+        circuit = compiled_graph.generate_stim_circuit(
+            1, manhattan_radius=manhattan_radius, detector_database=database, database_path=None
+        )
+    assert circuit.num_detectors == expected.num_detectors
+
+
 @pytest.mark.slow
 @pytest.mark.parametrize(
     ("k", "convention", "in_future"), tuple(generate_inputs(CONVENTIONS, (False, True)))
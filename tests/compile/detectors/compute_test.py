@@ -9,19 +9,23 @@ from tqecd.measurement import RelativeMeasurementLocation
 from tqec.circuit.measurement import Measurement
 from tqec.circuit.qubit import GridQubit
 from tqec.compile.detectors.compute import (
+    DetectorComputationPool,
     _best_effort_filter_detectors,  # pyright: ignore[reportPrivateUsage]
     _center_plaquette_syndrome_qubits,  # pyright: ignore[reportPrivateUsage]
     _compute_detectors_at_end_of_situation,  # pyright: ignore[reportPrivateUsage]
     _compute_superimposed_template_instantiations,  # pyright: ignore[reportPrivateUsage]
     _get_measurement_offset_mapping,  # pyright: ignore[reportPrivateUsage]
     _get_or_default,  # pyright: ignore[reportPrivateUsage]
+    _get_timeslice_flows,  # pyright: ignore[reportPrivateUsage]
     _matched_detectors_to_detectors,  # pyright: ignore[reportPrivateUsage]
     compute_detectors_at_end_of_situation,
     compute_detectors_for_fixed_radius,
 )
 from tqec.compile.detectors.database import DetectorDatabase
 from tqec.compile.detectors.detector import Detector
+from tqec.compile.specs.library.generators.fixed_bulk import FixedBulkConventionGenerator
 from tqec.plaquette._test_utils import make_surface_code_plaquette
+from tqec.plaquette.compilation.base import IdentityPlaquetteCompiler
 from tqec.plaquette.plaquette import Plaquettes
 from tqec.plaquette.rpng.rpng import RPNGDescription
 from tqec.plaquette.rpng.translators.default import DefaultRPNGTranslator
@@ -30,7 +34,7 @@ from tqec.templates.layout import LayoutTemplate
 from tqec.templates.qubit import QubitTemplate
 from tqec.templates.subtemplates import SubTemplateType
 from tqec.utils.coordinates import StimCoordinates
-from tqec.utils.enums import Basis
+from tqec.utils.enums import Basis, Orientation
 from tqec.utils.exceptions import TQECError
 from tqec.utils.frozendefaultdict import FrozenDefaultDict
 from tqec.utils.position import BlockPosition2D, Shift2D
@@ -267,6 +271,32 @@ def test_compute_detectors_at_end_of_situation(
     )
 
 
+def test_compute_detectors_at_end_of_situation_reuses_timeslice_flows(
+    alternating_subtemplate: SubTemplateType,
+    init_plaquettes: Plaquettes,
+    memory_plaquettes: Plaquettes,
+) -> None:
+    increments = Shift2D(2, 2)
+    _get_timeslice_flows.cache_clear()
+    subtemplates = [alternating_subtemplate, alternating_subtemplate]
+    detectors = _compute_detectors_at_end_of_situation(
+        subtemplates, [init_plaquettes, memory_plaquettes], increments
+    )
+    assert _get_timeslice_flows.cache_info().misses == 2
+    # Matching detectors mutates flows: the cached flows should not be affected.
+    for _ in range(2):
+        assert (
+            _compute_detectors_at_end_of_situation(
+                subtemplates, [init_plaquettes, memory_plaquettes], increments
+            )
+            == detectors
+        )
+    assert _get_timeslice_flows.cache_info().hits == 4
+    # The first timeslice is shared with the following situation.
+    _compute_detectors_at_end_of_situation([alternating_subtemplate], [init_plaquettes], increments)
+    assert _get_timeslice_flows.cache_info().misses == 2
+
+
 def test_public_compute_detectors_at_end_of_situation(
     alternating_subtemplate: SubTemplateType, init_plaquettes: Plaquettes
 ) -> None:
@@ -303,6 +333,53 @@ def test_public_compute_detectors_at_end_of_situation(
     assert len(detectors) == 1
 
 
+@pytest.mark.parametrize("adaptive_radius", (False, True))
+def test_compute_detectors_at_end_of_situation_statistics(
+    alternating_subtemplate: SubTemplateType, init_plaquettes: Plaquettes, adaptive_radius: bool
+) -> None:
+    increments = Shift2D(2, 2)
+    # Adaptive lookups try several radii but should only record one hit or miss.
+    database = DetectorDatabase(adaptive_radius=adaptive_radius)
+    for _ in range(3):
+        compute_detectors_at_end_of_situation(
+            [alternating_subtemplate], [init_plaquettes], increments, database
+        )
+    assert database.statistics.hits == 2
+    assert database.statistics.misses == 1
+    assert database.statistics.hit_rate == pytest.approx(2 / 3)
+    assert database.statistics.miss_computation_time > 0
+    assert database.statistics.stored_bytes > 0
+
+
+def test_compute_detectors_at_end_of_situation_ignores_empty_history(
+    alternating_subtemplate: SubTemplateType, init_plaquettes: Plaquettes
+) -> None:
+    increments = Shift2D(2, 2)
+    database = DetectorDatabase()
+    empty_subtemplate = numpy.zeros_like(alternating_subtemplate)
+    empty_plaquettes = Plaquettes(FrozenDefaultDict({1: _EMPTY_PLAQUETTE}))
+    detectors = compute_detectors_at_end_of_situation(
+        [alternating_subtemplate], [init_plaquettes], increments, database
+    )
+    for history in (
+        [(empty_subtemplate, init_plaquettes)],
+        [
+            (empty_subtemplate, init_plaquettes),
+            (numpy.ones_like(empty_subtemplate), empty_plaquettes),
+        ],
+    ):
+        subtemplates = [subtemplate for subtemplate, _ in history] + [alternating_subtemplate]
+        plaquettes = [plaquettes for _, plaquettes in history] + [init_plaquettes]
+        assert (
+            compute_detectors_at_end_of_situation(
+                subtemplates, plaquettes, increments, database, only_use_database=True
+            )
+            == detectors
+        )
+    assert len(database) == 1
+    assert database.statistics.misses == 1
+
+
 def test_get_or_default() -> None:
     array = numpy.array([i + numpy.arange(10) for i in range(10)])
     numpy.testing.assert_array_equal(
@@ -402,3 +479,103 @@ def test_compute_detectors_for_fixed_radius(
         parallel_process_count=mp.cpu_count() // 2 + 1,
     )
     assert set(parallel_detectors) == set(detectors)
+
+
+def test_compute_detectors_for_fixed_radius_parallel_with_database(
+    init_plaquettes: Plaquettes, memory_plaquettes: Plaquettes
+) -> None:
+    k = 2
+    d = 2 * k + 1
+    template = FixedTemplate([[0 if (i + j) % 2 == 0 else 1 for j in range(d)] for i in range(d)])
+    templates = [template, template]
+    plaquettes = [
+        Plaquettes(FrozenDefaultDict(p.collection, default_value=_EMPTY_PLAQUETTE))
+        for p in (init_plaquettes, memory_plaquettes)
+    ]
+    database = DetectorDatabase()
+    detectors = compute_detectors_for_fixed_radius(templates, k, plaquettes, database=database)
+    database.freeze()
+
+    # All the situations are in the database, so nothing should be computed (a
+    # computation would try to modify the frozen database and raise).
+    parallel_detectors = compute_detectors_for_fixed_radius(
+        templates,
+        k,
+        plaquettes,
+        database=database,
+        only_use_database=True,
+        parallel_process_count=2,
+    )
+    assert set(parallel_detectors) == set(detectors)
+
+    with pytest.raises(TQECError, match=r"^Failed to retrieve a situation"):
+        compute_detectors_for_fixed_radius(
+            templates,
+            k,
+            plaquettes,
+            database=DetectorDatabase(),
+            only_use_database=True,
+            parallel_process_count=2,
+        )
+
+
+def test_compute_detectors_for_fixed_radius_adaptive_radius() -> None:
+    generator = FixedBulkConventionGenerator(_TRANSLATOR, IdentityPlaquetteCompiler)
+    template = QubitTemplate()
+    templates = [template, template]
+    plaquettes = [
+        generator.get_memory_qubit_plaquettes(Orientation.HORIZONTAL, reset=Basis.Z),
+        generator.get_memory_qubit_plaquettes(Orientation.HORIZONTAL),
+    ]
+    detectors = set(compute_detectors_for_fixed_radius(templates, 2, plaquettes))
+
+    database = DetectorDatabase(adaptive_radius=True)
+    adaptive_detectors = compute_detectors_for_fixed_radius(
+        templates, 2, plaquettes, database=database
+    )
+    assert set(adaptive_detectors) == detectors
+    # Memory situations do not need a radius of 2.
+    assert {key.subtemplates[-1].shape for key in database.mapping} == {(3, 3)}
+
+    database.freeze()
+    for parallel_process_count in (1, 2):
+        database_detectors = compute_detectors_for_fixed_radius(
+            templates,
+            2,
+            plaquettes,
+            database=database,
+            only_use_database=True,
+            parallel_process_count=parallel_process_count,
+        )
+        assert set(database_detectors) == detectors
+
+    with DetectorComputationPool(2) as pool:
+        pool_detectors = compute_detectors_for_fixed_radius(
+            templates, 2, plaquettes, database=DetectorDatabase(adaptive_radius=True), pool=pool
+        )
+    assert set(pool_detectors) == detectors
+
+
+def test_compute_detectors_for_fixed_radius_with_pool(
+    init_plaquettes: Plaquettes, memory_plaquettes: Plaquettes
+) -> None:
+    k = 2
+    d = 2 * k + 1
+    template = FixedTemplate([[0 if (i + j) % 2 == 0 else 1 for j in range(d)] for i in range(d)])
+    templates, plaquettes = [template, template], [init_plaquettes, memory_plaquettes]
+    detectors = compute_detectors_for_fixed_radius(templates, k, plaquettes)
+
+    with DetectorComputationPool(2) as pool:
+        assert pool.process_count == 2
+        # Calling several times re-uses the same worker processes, that already
+        # know the plaquettes after the first call.
+        for _ in range(3):
+            parallel_detectors = compute_detectors_for_fixed_radius(
+                templates, k, plaquettes, pool=pool
+            )
+            assert set(parallel_detectors) == set(detectors)
+
+
+def test_detector_computation_pool_invalid_process_count() -> None:
+    with pytest.raises(TQECError, match=r"^Invalid process_count: 0\."):
+        DetectorComputationPool(0)
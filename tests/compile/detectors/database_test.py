@@ -1,16 +1,26 @@
+import json
+import pickle
+import sqlite3
 from collections.abc import Iterable
+from pathlib import Path
 from typing import cast
 
 import numpy
 import pytest
+import semver
 
 from tqec.circuit.measurement import Measurement
 from tqec.circuit.qubit import GridQubit
+from tqec.compile.detectors import database as database_module
 from tqec.compile.detectors.database import (
+    CURRENT_DATABASE_VERSION,
     DetectorDatabase,
+    DetectorDatabaseStatistics,
     _DetectorDatabaseKey,  # pyright: ignore[reportPrivateUsage]
+    _JournalDetectorMapping,  # pyright: ignore[reportPrivateUsage]
+    _LazyDetectorMapping,  # pyright: ignore[reportPrivateUsage]
 )
-from tqec.compile.detectors.detector import Detector
+from tqec.compile.detectors.detector import Detector, detectors_from_bytes
 from tqec.compile.specs.library.generators.fixed_bulk import (
     FixedBulkConventionGenerator,
 )
@@ -112,14 +122,38 @@ def test_detector_database_key_hash() -> None:
     # This is a value that has been pre-computed locally. It is hard-coded here
     # to check that the hash of a dbkey is reliable and does not change depending
     # on the Python interpreter, Python version, host OS, process ID, ...
-    assert hash(dbkey) == 1068059953232381272
+    assert hash(dbkey) == 855928636767328037
 
     dbkey = _DetectorDatabaseKey(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1])
     assert hash(dbkey) == hash(dbkey)
     # This is a value that has been pre-computed locally. It is hard-coded here
     # to check that the hash of a dbkey is reliable and does not change depending
     # on the Python interpreter, Python version, host OS, process ID, ...
-    assert hash(dbkey) == 1986764458427930321
+    assert hash(dbkey) == 992657401815883740
+
+
+def test_detector_database_key_plaquette_ids() -> None:
+    dbkey = _DetectorDatabaseKey(SUBTEMPLATES[1:5], PLAQUETTE_COLLECTIONS[1:5])
+    assert dbkey.plaquette_ids.dtype == numpy.int32
+    assert dbkey.plaquette_ids.flags.c_contiguous
+    assert dbkey.plaquette_ids.shape == (4, *SUBTEMPLATES[1].shape)
+    # Plaquette re-indexing does not change the key.
+    reindexed = _DetectorDatabaseKey(
+        [st + 1 for st in SUBTEMPLATES[1:5]],
+        [p.map_indices(lambda i: i + 1) for p in PLAQUETTE_COLLECTIONS[1:5]],
+    )
+    assert reindexed == dbkey
+    assert hash(reindexed) == hash(dbkey)
+
+
+def test_detector_database_key_pickle() -> None:
+    dbkey = _DetectorDatabaseKey(SUBTEMPLATES[1:5], PLAQUETTE_COLLECTIONS[1:5])
+    hash(dbkey)
+    state = dbkey.__getstate__()
+    assert set(state.keys()) == {"subtemplates", "plaquettes_by_timestep", "sufficient_radius"}
+    unpickled = pickle.loads(pickle.dumps(dbkey))
+    assert unpickled == dbkey
+    assert hash(unpickled) == hash(dbkey)
 
 
 def test_detector_database_creation() -> None:
@@ -176,6 +210,61 @@ def test_detector_database_freeze() -> None:
     assert detectors2 == DETECTORS[1]
 
 
+def test_detector_database_cache(tmp_path: Path) -> None:
+    filepath = tmp_path / "database.sqlite"
+    db = DetectorDatabase()
+    for i in range(1, 4):
+        db.add_situation(SUBTEMPLATES[:i], PLAQUETTE_COLLECTIONS[:i], DETECTORS[i % 2])
+    db.to_file(filepath)
+
+    db = DetectorDatabase.from_file(filepath)
+    db.cache_size = 2
+    for i in (1, 2, 1, 3):
+        assert db.get_detectors(SUBTEMPLATES[:i], PLAQUETTE_COLLECTIONS[:i]) == DETECTORS[i % 2]
+    # The least recently used situation has been evicted from the in-memory tier.
+    assert (
+        list(db._cache)
+        == [  # pyright: ignore[reportPrivateUsage]
+            _DetectorDatabaseKey(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1]),
+            _DetectorDatabaseKey(SUBTEMPLATES[:3], PLAQUETTE_COLLECTIONS[:3]),
+        ]
+    )
+    assert db.get_detectors(SUBTEMPLATES[:4], PLAQUETTE_COLLECTIONS[:4]) is None
+    assert (db.statistics.hits, db.statistics.misses) == (4, 1)
+
+    db.remove_situation(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1])
+    assert db.get_detectors(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1]) is None
+
+
+def test_detector_database_get_first_detectors() -> None:
+    db = DetectorDatabase()
+    db.add_situation(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1], DETECTORS[0])
+    db.add_situation(SUBTEMPLATES[:2], PLAQUETTE_COLLECTIONS[:2], DETECTORS[1])
+    situations = [
+        (SUBTEMPLATES[:3], PLAQUETTE_COLLECTIONS[:3], False),
+        (SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1], True),
+        (SUBTEMPLATES[:2], PLAQUETTE_COLLECTIONS[:2], False),
+        (SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1], False),
+    ]
+    assert db.get_first_detectors(situations) == (2, DETECTORS[1])
+    assert db.get_first_detectors(situations[:2]) is None
+    # Each call records a single lookup.
+    assert (db.statistics.hits, db.statistics.misses) == (1, 1)
+
+
+def test_detector_database_statistics_pickle() -> None:
+    db = DetectorDatabase(cache_size=4)
+    db.add_situation(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1], DETECTORS[0])
+    assert db.get_detectors(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1]) == DETECTORS[0]
+    assert db.statistics.hits == 1
+    assert db.statistics.stored_bytes > 0
+
+    loaded = pickle.loads(pickle.dumps(db))
+    assert loaded.statistics == DetectorDatabaseStatistics()
+    assert loaded.cache_size == 4
+    assert loaded.get_detectors(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1]) == DETECTORS[0]
+
+
 def test_detector_database_translation_invariance() -> None:
     db = DetectorDatabase()
     db.add_situation(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1], DETECTORS[0])
@@ -215,3 +304,398 @@ def test_detector_database_dict() -> None:
     detectors1 = new_db.get_detectors(SUBTEMPLATES[:2], PLAQUETTE_COLLECTIONS[:2])
     assert detectors1 is not None
     assert detectors1 == DETECTORS[1]
+
+
+def test_detector_database_sqlite_file(tmp_path: Path) -> None:
+    filepath = tmp_path / "database.sqlite"
+    db = DetectorDatabase()
+    db.add_situation(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1], DETECTORS[0])
+    db.add_situation(SUBTEMPLATES[:2], PLAQUETTE_COLLECTIONS[:2], DETECTORS[1])
+    db.to_file(filepath)
+
+    new_db = DetectorDatabase.from_file(filepath)
+    assert len(new_db) == 2
+    assert new_db.version == db.version
+    assert new_db.get_detectors(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1]) == DETECTORS[0]
+    assert new_db.get_detectors(SUBTEMPLATES[:2], PLAQUETTE_COLLECTIONS[:2]) == DETECTORS[1]
+    assert new_db.get_detectors(SUBTEMPLATES[:3], PLAQUETTE_COLLECTIONS[:3]) is None
+    # Keys can be rebuilt from the file content.
+    assert set(new_db.mapping.keys()) == set(db.mapping.keys())
+
+
+def test_detector_database_sqlite_incremental_save(tmp_path: Path) -> None:
+    filepath = tmp_path / "database.db"
+    DetectorDatabase().to_file(filepath)
+
+    db = DetectorDatabase.from_file(filepath)
+    db.add_situation(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1], DETECTORS[0])
+    db.add_situation(SUBTEMPLATES[:2], PLAQUETTE_COLLECTIONS[:2], DETECTORS[1])
+    db.remove_situation(SUBTEMPLATES[:2], PLAQUETTE_COLLECTIONS[:2])
+    # Nothing is visible from another connection before saving.
+    assert len(DetectorDatabase.from_file(filepath)) == 0
+    db.to_file(filepath)
+
+    new_db = DetectorDatabase.from_file(filepath)
+    assert len(new_db) == 1
+    assert new_db.get_detectors(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1]) == DETECTORS[0]
+
+    # A SQLite-backed database can be exported to the other formats.
+    new_db.to_file(tmp_path / "database.pkl")
+    pickled_db = DetectorDatabase.from_file(tmp_path / "database.pkl")
+    assert pickled_db.get_detectors(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1]) == DETECTORS[0]
+
+
+def test_load_database_sqlite_error(tmp_path: Path) -> None:
+    bad_database = tmp_path / "bad.sqlite"
+    bad_database.write_bytes(b"not a sqlite database" * 10)
+    with pytest.warns(UserWarning, match="Error"):
+        db = DetectorDatabase.from_file(bad_database)
+    assert len(db) == 0
+    assert not bad_database.exists()
+    assert list(tmp_path.glob("faulty_database_*.sqlite"))
+
+
+@pytest.mark.parametrize("extension", ("pkl", "sqlite", "json", "journal"))
+def test_detector_database_adaptive_radius(tmp_path: Path, extension: str) -> None:
+    db = DetectorDatabase(adaptive_radius=True)
+    db.add_situation(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1], DETECTORS[0])
+    db.add_situation(
+        SUBTEMPLATES[1:2], PLAQUETTE_COLLECTIONS[1:2], DETECTORS[1], sufficient_radius=True
+    )
+    db.to_file(tmp_path / f"database.{extension}")
+    new_db = DetectorDatabase.from_file(tmp_path / f"database.{extension}")
+    assert new_db.adaptive_radius
+    assert new_db.get_detectors(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1]) == DETECTORS[0]
+    assert (
+        new_db.get_detectors(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1], sufficient_radius=True)
+        is None
+    )
+    assert new_db.get_detectors(SUBTEMPLATES[1:2], PLAQUETTE_COLLECTIONS[1:2]) is None
+    assert (
+        new_db.get_detectors(SUBTEMPLATES[1:2], PLAQUETTE_COLLECTIONS[1:2], sufficient_radius=True)
+        == DETECTORS[1]
+    )
+
+
+def _use_names_column(filepath: Path) -> None:
+    # Situations of SQLite files written before 2.0.0 stored plaquette names.
+    connection = sqlite3.connect(filepath)
+    connection.executescript(
+        """
+        ALTER TABLE situations RENAME TO new_situations;
+        CREATE TABLE situations (
+            hash TEXT PRIMARY KEY, names TEXT NOT NULL, key TEXT NOT NULL, detectors BLOB NOT NULL
+        );
+        INSERT INTO situations SELECT hash, '[]', key, detectors FROM new_situations;
+        DROP TABLE new_situations;
+        """
+    )
+    connection.close()
+
+
+def _situations_columns(filepath: Path) -> list[str]:
+    connection = sqlite3.connect(filepath)
+    columns = [row[1] for row in connection.execute("PRAGMA table_info(situations)")]
+    connection.close()
+    return columns
+
+
+def test_detector_database_sqlite_migration(tmp_path: Path) -> None:
+    filepath = tmp_path / "database.sqlite"
+    db = DetectorDatabase()
+    db.add_situation(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1], DETECTORS[0])
+    db.add_situation(SUBTEMPLATES[:2], PLAQUETTE_COLLECTIONS[:2], DETECTORS[1])
+    db.to_file(filepath)
+    # Simulate a database written by a previous version, with different hashes,
+    # plaquette names and detectors stored as JSON.
+    _use_names_column(filepath)
+    connection = sqlite3.connect(filepath)
+    connection.execute("UPDATE situations SET hash = 'old' || hash")
+    for hash_, data in connection.execute("SELECT hash, detectors FROM situations").fetchall():
+        connection.execute(
+            "UPDATE situations SET detectors = ? WHERE hash = ?",
+            (json.dumps([d.to_dict() for d in detectors_from_bytes(data)]), hash_),
+        )
+    connection.execute("UPDATE metadata SET value = '1.0.0' WHERE name = 'version'")
+    connection.commit()
+    connection.close()
+
+    new_db = DetectorDatabase.from_file(filepath)
+    assert new_db.version == CURRENT_DATABASE_VERSION
+    assert len(new_db) == 2
+    assert new_db.get_detectors(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1]) == DETECTORS[0]
+    assert new_db.get_detectors(SUBTEMPLATES[:2], PLAQUETTE_COLLECTIONS[:2]) == DETECTORS[1]
+    # The migration has been saved.
+    assert DetectorDatabase.from_file(filepath).version == CURRENT_DATABASE_VERSION
+    assert "names" not in _situations_columns(filepath)
+    connection = sqlite3.connect(filepath)
+    assert all(
+        isinstance(data, bytes)
+        for (data,) in connection.execute("SELECT detectors FROM situations").fetchall()
+    )
+    connection.close()
+
+
+@pytest.mark.parametrize("version", ("0.1.0", "1.3.0", "3.0.0"))
+def test_detector_database_unknown_version_is_not_migrated(tmp_path: Path, version: str) -> None:
+    filepath = tmp_path / "database.sqlite"
+    db = DetectorDatabase()
+    db.add_situation(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1], DETECTORS[0])
+    db.to_file(filepath)
+    connection = sqlite3.connect(filepath)
+    connection.execute("UPDATE situations SET hash = 'old' || hash")
+    connection.execute("UPDATE metadata SET value = ? WHERE name = 'version'", (version,))
+    connection.commit()
+    connection.close()
+
+    new_db = DetectorDatabase.from_file(filepath)
+    assert str(new_db.version) == version
+    assert new_db.get_detectors(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1]) is None
+    assert len(new_db) == 1
+
+    db.version = semver.Version.parse(version)
+    db.to_file(tmp_path / "database.pkl")
+    assert str(DetectorDatabase.from_file(tmp_path / "database.pkl").version) == version
+
+
+def test_detector_database_sqlite_unknown_version_with_names_column(tmp_path: Path) -> None:
+    filepath = tmp_path / "database.sqlite"
+    db = DetectorDatabase()
+    db.add_situation(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1], DETECTORS[0])
+    db.version = semver.Version(0, 1, 0)
+    db.to_file(filepath)
+    _use_names_column(filepath)
+
+    new_db = DetectorDatabase.from_file(filepath)
+    assert new_db.get_detectors(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1]) is None
+    new_db.add_situation(SUBTEMPLATES[:2], PLAQUETTE_COLLECTIONS[:2], DETECTORS[1])
+    new_db.to_file(filepath)
+    # Saving converts the file to the current table layout without losing situations.
+    assert "names" not in _situations_columns(filepath)
+    assert len(DetectorDatabase.from_file(filepath)) == 2
+
+
+def test_detector_database_sqlite_hash_collision(tmp_path: Path) -> None:
+    filepath = tmp_path / "database.sqlite"
+    db = DetectorDatabase()
+    db.add_situation(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1], DETECTORS[0])
+    db.to_file(filepath)
+    # Index the stored situation with the hash of another situation.
+    other_key = _DetectorDatabaseKey(SUBTEMPLATES[1:2], PLAQUETTE_COLLECTIONS[1:2])
+    connection = sqlite3.connect(filepath)
+    connection.execute("UPDATE situations SET hash = ?", (f"{other_key.reliable_hash:032x}",))
+    connection.commit()
+    connection.close()
+
+    new_db = DetectorDatabase.from_file(filepath)
+    assert new_db.get_detectors(SUBTEMPLATES[1:2], PLAQUETTE_COLLECTIONS[1:2]) is None
+    # Plaquettes are the same but the radius of the stored situation has not been checked.
+    connection = sqlite3.connect(filepath)
+    key = _DetectorDatabaseKey(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1], sufficient_radius=True)
+    connection.execute("UPDATE situations SET hash = ?", (f"{key.reliable_hash:032x}",))
+    connection.commit()
+    connection.close()
+    assert (
+        new_db.get_detectors(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1], sufficient_radius=True)
+        is None
+    )
+
+
+def test_detector_database_sqlite_plaquettes_added_by_another_process(tmp_path: Path) -> None:
+    filepath = tmp_path / "database.sqlite"
+    db = DetectorDatabase()
+    db.add_situation(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1], DETECTORS[0])
+    db.to_file(filepath)
+    reader = DetectorDatabase.from_file(filepath)
+    assert reader.get_detectors(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1]) == DETECTORS[0]
+
+    writer = DetectorDatabase.from_file(filepath)
+    writer.add_situation(SUBTEMPLATES[2:4], PLAQUETTE_COLLECTIONS[2:4], DETECTORS[1])
+    writer.to_file(filepath)
+    assert reader.get_detectors(SUBTEMPLATES[2:4], PLAQUETTE_COLLECTIONS[2:4]) == DETECTORS[1]
+
+
+def test_detector_database_previous_minor_version_is_not_migrated(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # A minor version change invalidates the content of previous databases.
+    filepath = tmp_path / "database.pkl"
+    DetectorDatabase().to_file(filepath)
+    monkeypatch.setattr(
+        database_module, "CURRENT_DATABASE_VERSION", CURRENT_DATABASE_VERSION.bump_minor()
+    )
+    assert DetectorDatabase.from_file(filepath).version == CURRENT_DATABASE_VERSION
+
+
+def test_detector_database_legacy_json_detectors() -> None:
+    db = DetectorDatabase()
+    db.add_situation(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1], DETECTORS[0])
+    db_dict = db.to_dict()
+    assert isinstance(db_dict["mapping"][0][1], str)
+    # Previous versions represented detectors as a list of dictionaries.
+    db_dict["mapping"][0][1] = [d.to_dict() for d in DETECTORS[0]]
+    new_db = DetectorDatabase.from_dict(db_dict)
+    assert new_db.get_detectors(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1]) == DETECTORS[0]
+
+
+def test_detector_database_pickle_is_lazy(tmp_path: Path) -> None:
+    filepath = tmp_path / "database.pkl"
+    db = DetectorDatabase()
+    db.add_situation(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1], DETECTORS[0])
+    db.add_situation(SUBTEMPLATES[:2], PLAQUETTE_COLLECTIONS[:2], DETECTORS[1])
+    db.to_file(filepath)
+
+    new_db = DetectorDatabase.from_file(filepath)
+    assert isinstance(new_db.mapping, _LazyDetectorMapping)
+    entries = new_db.mapping._entries  # pyright: ignore[reportPrivateUsage]
+    assert all(isinstance(entry, bytes) for entry in entries.values())
+    assert new_db.get_detectors(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1]) == DETECTORS[0]
+    assert sum(isinstance(entry, bytes) for entry in entries.values()) == 1
+
+
+def test_detector_database_journal_file(tmp_path: Path) -> None:
+    filepath = tmp_path / "database.journal"
+    db = DetectorDatabase()
+    db.add_situation(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1], DETECTORS[0])
+    db.to_file(filepath)
+
+    new_db = DetectorDatabase.from_file(filepath)
+    assert len(new_db) == 1
+    assert new_db.version == db.version
+    assert new_db.get_detectors(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1]) == DETECTORS[0]
+
+    # Saving only appends the new records to the journal.
+    size = filepath.stat().st_size
+    new_db.add_situation(SUBTEMPLATES[:2], PLAQUETTE_COLLECTIONS[:2], DETECTORS[1])
+    new_db.remove_situation(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1])
+    assert filepath.stat().st_size == size
+    new_db.to_file(filepath)
+    assert filepath.stat().st_size > size
+
+    new_db = DetectorDatabase.from_file(filepath)
+    assert len(new_db) == 1
+    assert new_db.get_detectors(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1]) is None
+    assert new_db.get_detectors(SUBTEMPLATES[:2], PLAQUETTE_COLLECTIONS[:2]) == DETECTORS[1]
+
+
+def test_detector_database_journal_truncated_record(tmp_path: Path) -> None:
+    filepath = tmp_path / "database.journal"
+    db = DetectorDatabase()
+    db.add_situation(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1], DETECTORS[0])
+    db.to_file(filepath)
+    # Simulate a crash while appending a record.
+    with open(filepath, "a") as f:
+        f.write('{"set":{"subtemplates":[[')
+
+    new_db = DetectorDatabase.from_file(filepath)
+    assert len(new_db) == 1
+    new_db.add_situation(SUBTEMPLATES[:2], PLAQUETTE_COLLECTIONS[:2], DETECTORS[1])
+    new_db.to_file(filepath)
+    assert len(DetectorDatabase.from_file(filepath)) == 2
+
+
+def test_detector_database_journal_compaction(tmp_path: Path) -> None:
+    filepath = tmp_path / "database.journal"
+    db = DetectorDatabase()
+    db.to_file(filepath)
+    db = DetectorDatabase.from_file(filepath)
+    for _ in range(600):
+        db.add_situation(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1], DETECTORS[0])
+        db.remove_situation(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1])
+    db.add_situation(SUBTEMPLATES[:2], PLAQUETTE_COLLECTIONS[:2], DETECTORS[1])
+    db.to_file(filepath)
+    # Obsolete records have been dropped.
+    assert len(filepath.read_text().splitlines()) < 100
+
+    new_db = DetectorDatabase.from_file(filepath)
+    assert len(new_db) == 1
+    assert new_db.get_detectors(SUBTEMPLATES[:2], PLAQUETTE_COLLECTIONS[:2]) == DETECTORS[1]
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_load_database_journal_error(tmp_path: Path) -> None:
+    bad_database = tmp_path / "bad.journal"
+    bad_database.write_text("not a journal\n{}\n")
+    with pytest.warns(UserWarning, match="Error"):
+        db = DetectorDatabase.from_file(bad_database)
+    assert len(db) == 0
+    assert list(tmp_path.glob("faulty_database_*.journal"))
+
+
+@pytest.mark.parametrize("extension", ["pkl", "json", "sqlite", "journal"])
+def test_detector_database_merge_on_save(tmp_path: Path, extension: str) -> None:
+    filepath = tmp_path / f"database.{extension}"
+    db = DetectorDatabase()
+    db.add_situation(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1], DETECTORS[0])
+    db.to_file(filepath)
+
+    # Two processes load the same database and both add a different situation.
+    first = DetectorDatabase.from_file(filepath)
+    second = DetectorDatabase.from_file(filepath)
+    first.add_situation(SUBTEMPLATES[:2], PLAQUETTE_COLLECTIONS[:2], DETECTORS[1])
+    second.add_situation(SUBTEMPLATES[:3], PLAQUETTE_COLLECTIONS[:3], DETECTORS[1])
+    second.remove_situation(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1])
+    first.to_file(filepath)
+    second.to_file(filepath)
+
+    merged = DetectorDatabase.from_file(filepath)
+    assert len(merged) == 2
+    assert merged.get_detectors(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1]) is None
+    assert merged.get_detectors(SUBTEMPLATES[:2], PLAQUETTE_COLLECTIONS[:2]) == DETECTORS[1]
+    assert merged.get_detectors(SUBTEMPLATES[:3], PLAQUETTE_COLLECTIONS[:3]) == DETECTORS[1]
+
+
+@pytest.mark.parametrize("extension", ["pkl", "json", "sqlite", "journal"])
+def test_detector_database_prune(tmp_path: Path, extension: str) -> None:
+    filepath = tmp_path / f"database.{extension}"
+    db = DetectorDatabase()
+    for i in range(1, 4):
+        db.add_situation(SUBTEMPLATES[:i], PLAQUETTE_COLLECTIONS[:i], DETECTORS[i % 2])
+    db.to_file(filepath)
+
+    loaded = DetectorDatabase.from_file(filepath)
+    used_keys = {_DetectorDatabaseKey(SUBTEMPLATES[:2], PLAQUETTE_COLLECTIONS[:2])}
+    assert loaded.prune(used_keys) == 2
+    loaded.to_file(filepath)
+
+    pruned = DetectorDatabase.from_file(filepath)
+    assert len(pruned) == 1
+    assert pruned.get_detectors(SUBTEMPLATES[:2], PLAQUETTE_COLLECTIONS[:2]) == DETECTORS[0]
+
+    pruned.freeze()
+    with pytest.raises(TQECError, match=r"^Cannot remove a situation to a frozen database.$"):
+        pruned.prune(set())
+
+
+def test_detector_database_merge_on_save_incompatible(tmp_path: Path) -> None:
+    filepath = tmp_path / "database.pkl"
+    db = DetectorDatabase()
+    db.version = semver.Version(0, 1, 0)
+    db.add_situation(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1], DETECTORS[0])
+    db.to_file(filepath)
+    db = DetectorDatabase()
+    db.add_situation(SUBTEMPLATES[:2], PLAQUETTE_COLLECTIONS[:2], DETECTORS[1])
+    db.to_file(filepath)
+
+    new_db = DetectorDatabase.from_file(filepath)
+    assert new_db.version == CURRENT_DATABASE_VERSION
+    assert len(new_db) == 1
+
+
+def test_detector_database_journal_compacted_by_another_process(tmp_path: Path) -> None:
+    filepath = tmp_path / "database.journal"
+    db = DetectorDatabase()
+    db.add_situation(SUBTEMPLATES[:1], PLAQUETTE_COLLECTIONS[:1], DETECTORS[0])
+    db.to_file(filepath)
+
+    first = DetectorDatabase.from_file(filepath)
+    second = DetectorDatabase.from_file(filepath)
+    second.add_situation(SUBTEMPLATES[:2], PLAQUETTE_COLLECTIONS[:2], DETECTORS[1])
+    second.to_file(filepath)
+    assert isinstance(second.mapping, _JournalDetectorMapping)
+    second.mapping.compact()
+    first.add_situation(SUBTEMPLATES[:3], PLAQUETTE_COLLECTIONS[:3], DETECTORS[1])
+    first.to_file(filepath)
+
+    assert len(first) == 3
+    assert len(DetectorDatabase.from_file(filepath)) == 3
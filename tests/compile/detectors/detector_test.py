@@ -4,7 +4,7 @@ import stim
 from tqec.circuit.measurement import Measurement
 from tqec.circuit.measurement_map import MeasurementRecordsMap
 from tqec.circuit.qubit import GridQubit
-from tqec.compile.detectors.detector import Detector
+from tqec.compile.detectors.detector import Detector, detectors_from_bytes, detectors_to_bytes
 from tqec.utils.coordinates import StimCoordinates
 from tqec.utils.exceptions import TQECError
 
@@ -56,3 +56,27 @@ def test_detector_dict(measurement: Measurement) -> None:
     new_detector = Detector.from_dict(detector_dict)
     assert new_detector.measurements == frozenset([measurement])
     assert new_detector.coordinates == StimCoordinates(1, 1, 0)
+
+
+def test_detectors_bytes(measurement: Measurement) -> None:
+    detectors = frozenset(
+        [
+            Detector(frozenset([measurement]), StimCoordinates(1, 1)),
+            Detector(
+                frozenset([Measurement(GridQubit(-3, 4), -1), Measurement(GridQubit(-3, 4), -2)]),
+                StimCoordinates(-3, 4.5, 1),
+            ),
+        ]
+    )
+    data = detectors_to_bytes(detectors)
+    # 9 bytes of header, 26 bytes per detector and 6 bytes per measurement.
+    assert len(data) == 9 + 2 * 26 + 3 * 6
+    assert detectors_from_bytes(data) == detectors
+    assert detectors_from_bytes(detectors_to_bytes([])) == frozenset()
+
+    with pytest.raises(TQECError, match=r"^Invalid binary representation of detectors"):
+        detectors_from_bytes(data[:-1])
+    with pytest.raises(TQECError, match=r"^Cannot serialize detectors"):
+        detectors_to_bytes(
+            [Detector(frozenset([Measurement(GridQubit(40000, 0), -1)]), StimCoordinates(0, 0))]
+        )
@@ -1,9 +1,10 @@
 import stim
 
+from tqec.circuit.schedule import ScheduledCircuit
 from tqec.compile.generation import generate_circuit
 from tqec.plaquette._test_utils import make_surface_code_plaquette
 from tqec.plaquette.enums import PlaquetteOrientation
-from tqec.plaquette.plaquette import Plaquettes
+from tqec.plaquette.plaquette import Plaquette, Plaquettes
 from tqec.templates._testing import FixedTemplate
 from tqec.utils.enums import Basis
 from tqec.utils.frozendefaultdict import FrozenDefaultDict
@@ -74,3 +75,74 @@ CX 4 7 8 11
 TICK
 MX 3 4 8 9
 """)
+
+
+def test_generate_circuit_non_columnar_plaquette() -> None:
+    # Sweep bit targets cannot be tiled in a columnar representation, the
+    # circuit is generated by merging plaquette instances moment by moment.
+    qubits = make_surface_code_plaquette(Basis.Z).qubits
+    circuit = ScheduledCircuit.from_circuit(
+        stim.Circuit("""
+QUBIT_COORDS(-1, -1) 0
+QUBIT_COORDS(1, -1) 1
+QUBIT_COORDS(-1, 1) 2
+QUBIT_COORDS(1, 1) 3
+QUBIT_COORDS(0, 0) 4
+R 4
+TICK
+CX sweep[0] 4
+""")
+    )
+    plaquette = Plaquette("sweep", qubits, circuit)
+    circuit = generate_circuit(
+        FixedTemplate([[0, 0]]),
+        k=1,
+        plaquettes=Plaquettes(FrozenDefaultDict(default_value=plaquette)),
+    )
+    assert circuit.get_circuit() == stim.Circuit("""
+QUBIT_COORDS(-1, -1) 0
+QUBIT_COORDS(-1, 1) 1
+QUBIT_COORDS(0, 0) 2
+QUBIT_COORDS(1, -1) 3
+QUBIT_COORDS(1, 1) 4
+QUBIT_COORDS(2, 0) 5
+QUBIT_COORDS(3, -1) 6
+QUBIT_COORDS(3, 1) 7
+R 2 5
+TICK
+CX sweep[0] 2 sweep[0] 5
+""")
+
+
+def test_generate_circuit_tagged_plaquette() -> None:
+    # Tags cannot be represented in a columnar representation, and should be
+    # kept when merging plaquette instances moment by moment.
+    qubits = make_surface_code_plaquette(Basis.Z).qubits
+    circuit = ScheduledCircuit.from_circuit(
+        stim.Circuit("""
+QUBIT_COORDS(-1, -1) 0
+QUBIT_COORDS(0, 0) 1
+R[reset\\Ctag] 1
+TICK
+CX 0 1
+TICK
+M[measure] 1
+""")
+    )
+    plaquette = Plaquette("tagged", qubits, circuit)
+    circuit = generate_circuit(
+        FixedTemplate([[0, 0]]),
+        k=1,
+        plaquettes=Plaquettes(FrozenDefaultDict(default_value=plaquette)),
+    )
+    assert circuit.get_circuit() == stim.Circuit("""
+QUBIT_COORDS(-1, -1) 0
+QUBIT_COORDS(0, 0) 1
+QUBIT_COORDS(1, -1) 2
+QUBIT_COORDS(2, 0) 3
+R[reset\\Ctag] 1 3
+TICK
+CX 0 1 2 3
+TICK
+M[measure] 1 3
+""")
@@ -0,0 +1,22 @@
+import stim
+
+from tqec.compile.tree.annotations import DetectorAnnotation, DetectorAnnotations
+from tqec.utils.coordinates import StimCoordinates
+
+
+def test_detector_annotations() -> None:
+    annotations = [
+        DetectorAnnotation(StimCoordinates(1, 2.5, 0), [-3, -1]),
+        DetectorAnnotation(StimCoordinates(-0.1, 4), [-2]),
+        DetectorAnnotation(StimCoordinates(1e-7, 3, 1), []),
+    ]
+    detectors = DetectorAnnotations(annotations[:2])
+    detectors.append(annotations[2])
+    assert len(detectors) == 3
+    assert list(detectors) == annotations
+
+    expected = stim.Circuit()
+    for annotation in annotations:
+        expected.append(annotation.to_instruction())
+    assert detectors.to_circuit() == expected
+    assert DetectorAnnotations().to_circuit() == stim.Circuit()
@@ -1,12 +1,17 @@
 import pytest
 
 from tqec.circuit.measurement_map import MeasurementRecordsMap
-from tqec.compile.tree.annotators.detectors import LookbackStack
+from tqec.circuit.qubit import GridQubit
+from tqec.compile.compile import compile_block_graph
+from tqec.compile.detectors.database import DetectorDatabase
+from tqec.compile.tree.annotators.detectors import AnnotateDetectorsOnLayerNode, LookbackStack
+from tqec.gallery.memory import memory
 from tqec.plaquette.plaquette import Plaquettes
 from tqec.plaquette.rpng.rpng import RPNGDescription
 from tqec.plaquette.rpng.translators.default import DefaultRPNGTranslator
 from tqec.templates.base import Template
 from tqec.templates.qubit import QubitTemplate
+from tqec.utils.enums import Basis
 from tqec.utils.exceptions import TQECError
 from tqec.utils.frozendefaultdict import FrozenDefaultDict
 
@@ -157,3 +162,98 @@ def test_stack_lookback(
     ts, ps, _ = stack.lookback(7)
     assert len(ts) == 5
     assert len(ps) == 5
+
+
+def test_stack_bounded_window(plaquettes: Plaquettes) -> None:
+    with pytest.raises(TQECError, match=r"The lookback window should be strictly positive..*"):
+        LookbackStack(0)
+    templates = [QubitTemplate() for _ in range(4)]
+    records = [MeasurementRecordsMap({GridQubit(0, 0): [-1]}) for _ in range(4)]
+    bounded, unbounded = LookbackStack(3), LookbackStack()
+    for stack in (bounded, unbounded):
+        stack.append(templates[0], plaquettes, records[0])
+        stack.enter_repeat_block()
+        stack.append(templates[1], plaquettes, records[1])
+        stack.enter_repeat_block()
+        stack.append(templates[2], plaquettes, records[2])
+        stack.close_repeat_block(2)
+        stack.close_repeat_block(3)
+        stack.append(templates[3], plaquettes, records[3])
+    assert len(bounded) == len(unbounded) == 11
+    for n in range(4):
+        bounded_templates, _, bounded_records = bounded.lookback(n)
+        unbounded_templates, _, unbounded_records = unbounded.lookback(n)
+        assert [id(t) for t in bounded_templates] == [id(t) for t in unbounded_templates]
+        assert bounded_records == unbounded_records
+    with pytest.raises(TQECError, match=r"Cannot look back 4 rounds with a stack only keeping.*"):
+        bounded.lookback(4)
+
+    # Closing a REPEAT block does not materialise all the repetitions.
+    bounded.enter_repeat_block()
+    bounded.append(templates[0], plaquettes, records[0])
+    bounded.close_repeat_block(10**12)
+    assert len(bounded) == 11 + 10**12
+    assert len(bounded._stack[0].infos) == 3  # pyright: ignore[reportPrivateUsage]
+    _, _, bounded_records = bounded.lookback(3)
+    assert bounded_records[GridQubit(0, 0)] == [-3, -2, -1]
+
+
+def test_precompute_detectors() -> None:
+    tree = compile_block_graph(memory(Basis.Z)).to_layer_tree()
+    database = DetectorDatabase()
+    walker = AnnotateDetectorsOnLayerNode(1, detector_database=database)
+    root = tree._root  # pyright: ignore[reportPrivateUsage]
+    computed = walker.precompute_detectors(root)
+    assert computed > 0
+    assert computed == len(database)
+    # Situations are de-duplicated globally, so a second pass has nothing to compute.
+    assert walker.precompute_detectors(root) == 0
+
+    # Generating the circuit should only read from the database, which would
+    # raise if it tried to add a missing situation to the frozen database.
+    database.freeze()
+    circuit = tree.generate_circuit(1, detector_database=database, database_path=None)
+    assert circuit.num_detectors > 0
+
+
+def test_precompute_detectors_for_several_scaling_factors() -> None:
+    compiled_graph = compile_block_graph(memory(Basis.Z))
+    situation_counts: dict[int, int] = {}
+    for k in (1, 2):
+        walker = AnnotateDetectorsOnLayerNode(k, detector_database=DetectorDatabase())
+        situation_counts[k] = walker.precompute_detectors(compiled_graph.to_layer_tree()._root)  # pyright: ignore[reportPrivateUsage]
+
+    tree = compiled_graph.to_layer_tree()
+    database = DetectorDatabase()
+    walker = AnnotateDetectorsOnLayerNode(1, detector_database=database)
+    computed = walker.precompute_detectors(tree._root, ks=[1, 2])  # pyright: ignore[reportPrivateUsage]
+    assert computed == len(database)
+    # Most of the situations are shared by both scaling factors.
+    assert max(situation_counts.values()) <= computed < sum(situation_counts.values())
+
+    database.freeze()
+    circuits = tree.generate_circuits([1, 2], detector_database=database, database_path=None)
+    assert circuits == compiled_graph.generate_stim_circuits(
+        [1, 2], database_path=None, parallel_process_count=1
+    )
+    for k, circuit in circuits.items():
+        assert circuit == compiled_graph.generate_stim_circuit(
+            k, database_path=None, parallel_process_count=1
+        )
+
+
+def test_generate_circuit_precomputes_detectors_only_in_parallel(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    precomputed_ks: list[int] = []
+
+    def precompute_detectors(self: AnnotateDetectorsOnLayerNode, *args: object) -> int:
+        precomputed_ks.append(self._k)  # pyright: ignore[reportPrivateUsage]
+        return 0
+
+    monkeypatch.setattr(AnnotateDetectorsOnLayerNode, "precompute_detectors", precompute_detectors)
+    compiled_graph = compile_block_graph(memory(Basis.Z))
+    compiled_graph.generate_stim_circuit(1, database_path=None, parallel_process_count=1)
+    assert precomputed_ks == []
+    compiled_graph.generate_stim_circuit(2, database_path=None, parallel_process_count=2)
+    assert precomputed_ks == [2]
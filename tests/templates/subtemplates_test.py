@@ -6,10 +6,17 @@ import pytest
 
 from tqec.templates.base import Template
 from tqec.templates.layout import LayoutTemplate
-from tqec.templates.qubit import QubitSpatialCubeTemplate, QubitTemplate
+from tqec.templates.qubit import (
+    QubitHorizontalBorders,
+    QubitSpatialCubeTemplate,
+    QubitTemplate,
+    QubitVerticalBorders,
+)
 from tqec.templates.subtemplates import (
+    _unique_rows,
     get_spatially_distinct_3d_subtemplates,
     get_spatially_distinct_subtemplates,
+    get_spatially_distinct_subtemplates_from_signatures,
 )
 from tqec.utils.array import to2dlist
 from tqec.utils.position import BlockPosition2D
@@ -168,3 +175,66 @@ def test_get_spatially_distinct_3d_subtemplates(
     right_border = instantiation_reconstruction[:, r + m :, :]
     for border in [top_border, bottom_border, left_border, right_border]:
         numpy.testing.assert_array_equal(border, numpy.zeros_like(border))
+
+
+@pytest.mark.parametrize("shape", [(0, 4), (1, 1), (50, 3), (1000, 9)])
+def test_unique_rows_matches_numpy_unique(shape: tuple[int, int]) -> None:
+    rows = numpy.random.default_rng(42).integers(0, 3, size=shape)
+    unique_rows, inverse = _unique_rows(rows)
+    expected_unique_rows, expected_inverse = numpy.unique(rows, axis=0, return_inverse=True)
+    numpy.testing.assert_array_equal(unique_rows, expected_unique_rows)
+    numpy.testing.assert_array_equal(inverse, expected_inverse.reshape(-1))
+
+
+_TEMPLATES_WITH_SIGNATURES_TO_TEST = [
+    QubitTemplate(),
+    QubitSpatialCubeTemplate(),
+    QubitVerticalBorders(),
+    QubitHorizontalBorders(),
+    LayoutTemplate(
+        {
+            BlockPosition2D(0, 0): QubitTemplate(),
+            BlockPosition2D(1, 0): QubitTemplate(),
+            BlockPosition2D(1, 1): QubitSpatialCubeTemplate(),
+            BlockPosition2D(3, 1): QubitTemplate(),
+        }
+    ),
+]
+
+
+@pytest.mark.parametrize(
+    "template,r,avoid_zero_plaquettes",
+    tuple(itertools.product(_TEMPLATES_WITH_SIGNATURES_TO_TEST, [0, 1, 2], [True, False])),
+)
+def test_get_spatially_distinct_subtemplates_from_signatures(
+    template: Template, r: int, avoid_zero_plaquettes: bool
+) -> None:
+    reference_k = template.get_subtemplate_signatures_reference_k(r)
+    assert reference_k is not None
+    for k in range(reference_k + 1, reference_k + 4):
+        expected = get_spatially_distinct_subtemplates(
+            template.instantiate(k), r, avoid_zero_plaquettes
+        )
+        unique_subtemplates = template.get_spatially_distinct_subtemplates(
+            k, r, avoid_zero_plaquettes
+        )
+        numpy.testing.assert_array_equal(
+            unique_subtemplates.subtemplate_indices, expected.subtemplate_indices
+        )
+        assert unique_subtemplates.subtemplates.keys() == expected.subtemplates.keys()
+        for index, subtemplate in expected.subtemplates.items():
+            numpy.testing.assert_array_equal(unique_subtemplates.subtemplates[index], subtemplate)
+
+
+def test_get_spatially_distinct_subtemplates_from_signatures_missing_signature() -> None:
+    template = QubitTemplate()
+    reference = get_spatially_distinct_subtemplates(template.instantiate(2), 1)
+    reference_signatures = template.get_subtemplate_signatures(2, 1)
+    assert reference_signatures is not None
+    signatures = numpy.full((3, 3), reference_signatures.max() + 1)
+    assert (
+        get_spatially_distinct_subtemplates_from_signatures(
+            reference, reference_signatures, signatures
+        )
+        is None
+    )